@@ -6,9 +6,11 @@ Phát hiện bugs từ test results, extract stack traces, và phân tích root
 
 import re
 import json
+import itertools
+import hashlib
 import traceback
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Set, Tuple
 from datetime import datetime
 from collections import defaultdict, Counter
 import sys
@@ -17,11 +19,52 @@ import sys
 scripts_dir = Path(__file__).parent
 sys.path.insert(0, str(scripts_dir))
 
+from bug_history import BugHistory, history_summary, results_run_id
+from phase_planner import normalize_test_name
+from source_maps import SourceMapResolver
+
+
+MAX_TRACE_FRAMES = 50
+MAX_RAW_TRACE_LENGTH = 16 * 1024  # Jest snapshot diffs can be megabytes per failure
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Lines của text one at a time, as text.split('\\n') without building the list"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
 
 class StackTraceParser:
-    """Parse và format stack traces từ test failures"""
+    """Parse và format stack traces từ test failures
     
-    def __init__(self):
+    Traces are scanned line by line: only lines starting with "at" are
+    matched as frames, the first max_frames frames are kept (the rest are
+    counted in 'omitted_frames') và 'raw' keeps the first max_raw_length
+    characters ('raw_length' is the full length when it was cut). Frame
+    file paths are interned, so frames và file_info of every trace share
+    one string per file. With a SourceMapResolver, frames in compiled
+    JavaScript are mapped to their original sources before they are kept.
+    """
+    
+    def __init__(
+        self,
+        max_frames: int = MAX_TRACE_FRAMES,
+        max_raw_length: int = MAX_RAW_TRACE_LENGTH,
+        resolver: Optional[SourceMapResolver] = None
+    ):
+        if max_frames < 0:
+            raise ValueError(f"max_frames must be >= 0, got {max_frames}")
+        if max_raw_length < 0:
+            raise ValueError(f"max_raw_length must be >= 0, got {max_raw_length}")
+        self.max_frames = max_frames
+        self.max_raw_length = max_raw_length
+        self.resolver = resolver
         self.patterns = {
             'file_line': re.compile(r'at\s+(.+?)\s+\((.+?):(\d+):(\d+)\)'),
             'file_only': re.compile(r'at\s+(.+?)\s+\((.+?)\)'),
@@ -35,61 +78,77 @@ class StackTraceParser:
             return {}
         
         parsed = {
-            'raw': trace,
+            'raw': trace[:self.max_raw_length],
             'error_type': None,
             'error_message': None,
             'frames': [],
             'file_info': {}
         }
+        if len(trace) > self.max_raw_length:
+            parsed['raw_length'] = len(trace)
+        
+        frames = parsed['frames']
+        file_info = parsed['file_info']
+        omitted_frames = 0
+        file_line = self.patterns['file_line'].match
+        file_only = self.patterns['file_only'].match
         
-        lines = trace.split('\n')
+        lines = iter_lines(trace)
         
         # Extract error type and message from first line
-        if lines:
-            first_line = lines[0].strip()
-            error_match = self.patterns['error_type'].match(first_line)
-            if error_match:
-                parsed['error_type'] = error_match.group(1)
-                parsed['error_message'] = error_match.group(2)
+        first_line = next(lines).strip()
+        error_match = self.patterns['error_type'].match(first_line)
+        if error_match:
+            parsed['error_type'] = error_match.group(1)
+            parsed['error_message'] = error_match.group(2)
         
         # Extract stack frames
-        for line in lines:
-            line = line.strip()
-            if not line:
+        for line in itertools.chain((first_line,), lines):
+            # Both frame patterns start with "at": skip diff và message lines unmatched
+            if not line.lstrip().startswith('at'):
                 continue
+            line = line.strip()
             
-            # Match file:line:column pattern
-            match = self.patterns['file_line'].match(line)
+            # Match file:line:column pattern, else file only pattern
+            match = file_line(line)
             if match:
+                if len(frames) >= self.max_frames:
+                    omitted_frames += 1
+                    continue
                 frame = {
                     'function': match.group(1),
-                    'file': match.group(2),
+                    'file': sys.intern(match.group(2)),
                     'line': int(match.group(3)),
                     'column': int(match.group(4)),
                     'raw': line
                 }
-                parsed['frames'].append(frame)
+                if self.resolver is not None:
+                    frame = self.resolver.resolve_frame(frame)
+                frames.append(frame)
                 
                 # Track file info
                 file_path = frame['file']
-                if file_path not in parsed['file_info']:
-                    parsed['file_info'][file_path] = {
+                if file_path not in file_info:
+                    file_info[file_path] = {
                         'lines': [],
                         'functions': []
                     }
-                parsed['file_info'][file_path]['lines'].append(frame['line'])
-                parsed['file_info'][file_path]['functions'].append(frame['function'])
+                file_info[file_path]['lines'].append(frame['line'])
+                file_info[file_path]['functions'].append(frame['function'])
             else:
-                # Match file only pattern
-                match = self.patterns['file_only'].match(line)
+                match = file_only(line)
                 if match:
-                    frame = {
+                    if len(frames) >= self.max_frames:
+                        omitted_frames += 1
+                        continue
+                    frames.append({
                         'function': match.group(1),
-                        'file': match.group(2),
+                        'file': sys.intern(match.group(2)),
                         'raw': line
-                    }
-                    parsed['frames'].append(frame)
+                    })
         
+        if omitted_frames:
+            parsed['omitted_frames'] = omitted_frames
         return parsed
     
     def extract_file_info(self, trace: Dict[str, Any]) -> Dict[str, Any]:
@@ -128,16 +187,187 @@ class StackTraceParser:
             else:
                 formatted.append(f"  {i}. {frame['function']} at {frame['file']}")
         
-        if len(trace.get('frames', [])) > max_frames:
-            formatted.append(f"  ... ({len(trace['frames']) - max_frames} more frames)")
+        more_frames = len(trace.get('frames', [])) + trace.get('omitted_frames', 0) - len(frames)
+        if more_frames > 0:
+            formatted.append(f"  ... ({more_frames} more frames)")
         
         return '\n'.join(formatted)
 
 
+def bug_text(bug: Dict[str, Any]) -> str:
+    """Lowercased error message, error type và raw stack trace của bug, as one text to match patterns in"""
+    error_message = bug.get('error_message') or ''
+    error_type = bug.get('error_type') or ''
+    stack_trace = (bug.get('stack_trace') or {}).get('raw') or ''
+    return f"{error_message} {error_type} {stack_trace}".lower()
+
+
+
+def pattern_trie_regex(patterns: Iterable[str]) -> str:
+    """Regex matching any of patterns, the longest one at a position (e.g. 'time(?:d\\ out|out(?:error)?)')"""
+    trie: Dict[str, Any] = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = True  # a pattern ends here
+    
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy: a longer pattern through this node is tried before the one ending here
+        return f'(?:{body})?' if '' in node else body
+    
+    return build(trie)
+
+
+class PatternMatcher:
+    """Case-insensitive multi-pattern matcher shared by BugClassifier và RootCauseAnalyzer
+    
+    All added patterns are compiled into one regex, an alternation nested
+    as a trie (see pattern_trie_regex) so each position costs about one
+    branch per character and the longest pattern there matches. A single
+    left-to-right scan of a bug's lowercased text finds every
+    (position, pattern) hit. Patterns contained in a matched one (e.g.
+    'error' in 'typeerror') are reported from the match itself, and the scan
+    resumes inside a match only where another pattern could start there and
+    run past its end, so overlapping hits are kept without a lookahead.
+    """
+    
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: Dict[str, None] = {}  # ordered set of lowercased patterns
+        self._regex: Optional['re.Pattern'] = None
+        self._contained: Dict[str, List[Tuple[int, str]]] = {}
+        self._resume: Dict[str, int] = {}
+        self.add(patterns)
+    
+    def add(self, patterns: Iterable[str]):
+        """Add patterns (e.g. another class's pattern table); recompiled on the next scan"""
+        for pattern in patterns:
+            if pattern and pattern.lower() not in self.patterns:
+                self.patterns[pattern.lower()] = None
+                self._regex = None
+    
+    def compile(self):
+        """Build the regex và, per pattern, its contained patterns và resume offset"""
+        patterns = list(self.patterns)
+        self._contained = {
+            outer: [
+                (offset, inner)
+                for inner in patterns if inner != outer
+                for offset in range(len(outer) - len(inner) + 1)
+                if outer.startswith(inner, offset)
+            ]
+            for outer in patterns
+        }
+        self._resume = {
+            outer: next(
+                (offset for offset in range(1, len(outer))
+                 if any(len(other) > len(outer) - offset and other.startswith(outer[offset:]) for other in patterns)),
+                len(outer)
+            )
+            for outer in patterns
+        }
+        self._regex = re.compile(pattern_trie_regex(patterns)) if patterns else None
+    
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Every (position, pattern) hit in text (already lowercased, see bug_text), ordered by position"""
+        if self._regex is None:
+            self.compile()
+            if self._regex is None:
+                return []
+        search = self._regex.search
+        hits: Set[Tuple[int, str]] = set()
+        position = 0
+        match = search(text, position)
+        while match is not None:
+            start = match.start()
+            pattern = match.group()
+            hits.add((start, pattern))
+            hits.update((start + offset, inner) for offset, inner in self._contained[pattern])
+            match = search(text, start + self._resume[pattern])
+        return sorted(hits)
+
+
+class FailureFingerprinter:
+    """Stable fingerprint của a failure, to collapse duplicates across tests và runs
+    
+    The fingerprint hashes the error type, the error message with volatile
+    parts (temp paths, uuids, hex addresses và ids, numbers) replaced by
+    placeholders, và the function và project-relative file of the top
+    max_frames in-project frames. Frames in test files count only when no
+    other in-project frame exists, so one broken helper called from many
+    tests is one bug. Line numbers are left out so unrelated edits above a
+    failing line do not split a bug.
+    """
+    
+    VOLATILE_PATTERNS = [
+        (re.compile(r'(?:/private)?/var/folders/\S+|/tmp/\S+|[A-Za-z]:\\\S*\\Temp\\\S+', re.IGNORECASE), '<tmp>'),
+        (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE), '<uuid>'),
+        (re.compile(r'\b0x[0-9a-f]+\b', re.IGNORECASE), '<addr>'),
+        (re.compile(r'\b(?=[0-9a-f]*\d)[0-9a-f]{12,}\b', re.IGNORECASE), '<id>'),
+        (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+        (re.compile(r'\s+'), ' '),
+    ]
+    EXTERNAL_MARKERS = ('node_modules/', 'node:', 'internal/', '<anonymous>')
+    TEST_FILE_PATTERN = re.compile(r'(?:\.(?:test|spec)\.[jt]sx?$|(?:^|/)__tests__/)')
+    
+    def __init__(self, project_root: Optional[Path] = None, max_frames: int = 3):
+        if max_frames < 0:
+            raise ValueError(f"max_frames must be >= 0, got {max_frames}")
+        self.project_root = Path(project_root) if project_root is not None else None
+        self.max_frames = max_frames
+    
+    def normalize_message(self, message: str) -> str:
+        """Message với volatile parts replaced by placeholders"""
+        for pattern, placeholder in self.VOLATILE_PATTERNS:
+            message = pattern.sub(placeholder, message)
+        return message.strip()
+    
+    def project_file(self, file_path: str) -> Optional[str]:
+        """Project-relative path của a frame's file, None for dependencies và runtime frames"""
+        file_path = file_path.replace('\\', '/')
+        if any(marker in file_path for marker in self.EXTERNAL_MARKERS):
+            return None
+        if self.project_root is not None:
+            relative = normalize_test_name(file_path, self.project_root)
+            if relative == file_path and Path(file_path).is_absolute():
+                return None  # outside the project
+            return relative
+        return file_path
+    
+    def project_frames(self, frames: List[Dict[str, Any]]) -> List[str]:
+        """'function@file' của the top max_frames in-project frames (test files only as a fallback)"""
+        source_keys = []
+        test_keys = []
+        for frame in frames:
+            if len(source_keys) >= self.max_frames:
+                break
+            file_path = self.project_file(frame.get('file', ''))
+            if file_path:
+                keys = test_keys if self.TEST_FILE_PATTERN.search(file_path) else source_keys
+                keys.append(f"{frame.get('function', '')}@{file_path}")
+        return source_keys or test_keys[:self.max_frames]
+    
+    def fingerprint(self, bug: Dict[str, Any]) -> str:
+        """Fingerprint của a bug (hex, stable across processes và runs)"""
+        stack_trace = bug.get('stack_trace') or {}
+        # Traces whose first line is not "SomeError: message" have no parsed message
+        message = bug.get('error_message') or (stack_trace.get('raw') or '').strip().split('\n', 1)[0]
+        parts = [
+            str(bug.get('error_type') or ''),
+            self.normalize_message(str(message)),
+            *self.project_frames(stack_trace.get('frames', []))
+        ]
+        return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
 class BugClassifier:
     """Phân loại bugs theo type và severity"""
     
-    def __init__(self):
+    def __init__(self, matcher: Optional[PatternMatcher] = None):
         self.error_patterns = {
             'assertion': [
                 'AssertionError', 'expect', 'assert', 'toBe', 'toEqual', 'toMatch'
@@ -164,21 +394,27 @@ class BugClassifier:
                 'validation', 'invalid', 'required', 'missing'
             ]
         }
-    
-    def classify_bug(self, bug: Dict[str, Any]) -> str:
-        """Phân loại bug type"""
-        error_message = bug.get('error_message', '').lower()
-        error_type = bug.get('error_type', '').lower()
-        stack_trace = bug.get('stack_trace', {}).get('raw', '').lower()
-        
-        combined_text = f"{error_message} {error_type} {stack_trace}"
-        
-        for bug_type, patterns in self.error_patterns.items():
+        self._patterns = {
+            bug_type: [pattern.lower() for pattern in patterns]
+            for bug_type, patterns in self.error_patterns.items()
+        }
+        # Pattern -> index of the first bug type listing it (lower wins, as in the table's order)
+        self._bug_types = list(self._patterns)
+        self._priority: Dict[str, int] = {}
+        for index, patterns in enumerate(self._patterns.values()):
             for pattern in patterns:
-                if pattern.lower() in combined_text:
-                    return bug_type
-        
-        return 'unknown'
+                self._priority.setdefault(pattern, index)
+        self.matcher = matcher if matcher is not None else PatternMatcher()
+        self.matcher.add(self._priority)
+    
+    def classify_bug(self, bug: Dict[str, Any], hits: Optional[List[Tuple[int, str]]] = None) -> str:
+        """Phân loại bug type (hits: matcher.find_all(bug_text(bug)), when the caller already has them)"""
+        if hits is None:
+            hits = self.matcher.find_all(bug_text(bug))
+        
+        priority = self._priority
+        best = min((priority[pattern] for _, pattern in hits if pattern in priority), default=None)
+        return self._bug_types[best] if best is not None else 'unknown'
     
     def calculate_severity(
         self,
@@ -231,7 +467,7 @@ class BugClassifier:
 class RootCauseAnalyzer:
     """Phân tích root cause của bugs"""
     
-    def __init__(self):
+    def __init__(self, matcher: Optional[PatternMatcher] = None):
         self.common_causes = {
             'null_undefined': {
                 'patterns': ['null', 'undefined', 'Cannot read property'],
@@ -264,27 +500,31 @@ class RootCauseAnalyzer:
                 'recommendation': 'Verify authentication tokens and permissions'
             }
         }
+        self._patterns = {
+            cause_id: [pattern.lower() for pattern in cause_info['patterns']]
+            for cause_id, cause_info in self.common_causes.items()
+        }
+        self.matcher = matcher if matcher is not None else PatternMatcher()
+        self.matcher.add(p for patterns in self._patterns.values() for p in patterns)
     
-    def analyze_root_cause(self, bug: Dict[str, Any]) -> Dict[str, Any]:
-        """Phân tích root cause của bug"""
-        error_message = bug.get('error_message', '').lower()
+    def analyze_root_cause(self, bug: Dict[str, Any], hits: Optional[List[Tuple[int, str]]] = None) -> Dict[str, Any]:
+        """Phân tích root cause của bug (hits: matcher.find_all(bug_text(bug)), when the caller already has them)"""
         error_type = bug.get('error_type', '').lower()
-        stack_trace = bug.get('stack_trace', {}).get('raw', '').lower()
-        
-        combined_text = f"{error_message} {error_type} {stack_trace}"
+        if hits is None:
+            hits = self.matcher.find_all(bug_text(bug))
+        hit_patterns = {pattern for _, pattern in hits}
         
-        # Find matching common causes
+        # Find matching common causes (each by its first listed pattern that hit)
         matched_causes = []
         for cause_id, cause_info in self.common_causes.items():
-            for pattern in cause_info['patterns']:
-                if pattern.lower() in combined_text:
-                    matched_causes.append({
-                        'id': cause_id,
-                        'cause': cause_info['cause'],
-                        'recommendation': cause_info['recommendation'],
-                        'confidence': 'high' if pattern.lower() in error_type else 'medium'
-                    })
-                    break
+            pattern = next((p for p in self._patterns[cause_id] if p in hit_patterns), None)
+            if pattern is not None:
+                matched_causes.append({
+                    'id': cause_id,
+                    'cause': cause_info['cause'],
+                    'recommendation': cause_info['recommendation'],
+                    'confidence': 'high' if pattern in error_type else 'medium'
+                })
         
         # If no match, provide generic analysis
         if not matched_causes:
@@ -360,19 +600,40 @@ class RootCauseAnalyzer:
 
 
 class BugDetector:
-    """Detect bugs từ test results"""
+    """Detect bugs từ test results
     
-    def __init__(self):
-        self.stack_trace_parser = StackTraceParser()
-        self.bug_classifier = BugClassifier()
-        self.root_cause_analyzer = RootCauseAnalyzer()
+    Failures với the same fingerprint (see FailureFingerprinter) collapse
+    into one bug carrying an occurrence count và the affected tests, so
+    classification, root cause analysis và reports scale with distinct
+    failures rather than failing tests. With a BugHistory, each run's
+    bugs are recorded và annotated with their cross-run 'history'
+    (only for results with a run id, see results_run_id).
+    """
+    
+    def __init__(
+        self,
+        project_root: Optional[Path] = None,
+        history: Optional[BugHistory] = None,
+        resolver: Optional[SourceMapResolver] = None
+    ):
+        # Frames in compiled output are reported at their original src/*.ts positions
+        self.source_map_resolver = resolver if resolver is not None else SourceMapResolver(project_root)
+        self.stack_trace_parser = StackTraceParser(resolver=self.source_map_resolver)
+        self.fingerprinter = FailureFingerprinter(project_root)
+        self.history = history
+        # One compiled matcher for both pattern tables: each bug's text is scanned once
+        self.pattern_matcher = PatternMatcher()
+        self.bug_classifier = BugClassifier(self.pattern_matcher)
+        self.root_cause_analyzer = RootCauseAnalyzer(self.pattern_matcher)
     
     def detect_bugs_from_results(
         self,
         test_results: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Detect bugs từ test results"""
-        bugs = []
+        """Detect distinct bugs từ test results, in order of first occurrence"""
+        bugs: Dict[str, Dict[str, Any]] = {}  # fingerprint -> bug
+        affected: Dict[str, Dict[str, None]] = {}  # fingerprint -> affected tests (ordered set)
+        test_bugs = []
         
         # Extract failed tests from results
         phases = test_results.get('phases', [])
@@ -384,18 +645,68 @@ class BugDetector:
             # Check if phase failed
             if not phase_result.get('success', True):
                 # Extract bugs from phase
-                phase_bugs = self.extract_bugs_from_phase(phase_result, phase_number)
-                bugs.extend(phase_bugs)
+                for bug in self.extract_bugs_from_phase(phase_result, phase_number):
+                    self.add_occurrence(bugs, affected, bug)
             
-            # Extract bugs from individual test failures
+            # Extract bugs from individual test failures; tests attributed
+            # from another phase were already reported by the phase that ran them
             tests = phase_result.get('tests', [])
             for test in tests:
-                if test.get('status') == 'FAILED':
-                    bug = self.create_bug_from_test(test, phase_number, phase_name)
-                    if bug:
-                        bugs.append(bug)
-        
-        return bugs
+                if test.get('status') in ('FAILED', 'FLAKY') and 'attributed_from' not in test:
+                    bug = self.build_bug_from_test(test, phase_number, phase_name)
+                    if bug and self.add_occurrence(bugs, affected, bug):
+                        test_bugs.append(bug)
+        
+        distinct = list(bugs.values())
+        for bug in distinct:
+            bug['affected_tests'] = list(affected[bug['fingerprint']])
+        run_id = results_run_id(test_results)
+        if self.history is not None and run_id is not None:
+            histories = self.history.record_run(run_id, distinct, test_results.get('start_time'))
+            for bug in distinct:
+                bug['history'] = histories[bug['fingerprint']]
+        
+        # Analyze each distinct failure once, weighting severity by occurrences và history
+        for bug in test_bugs:
+            self.analyze_bug(bug)
+        
+        return distinct
+    
+    def add_occurrence(
+        self,
+        bugs: Dict[str, Dict[str, Any]],
+        affected: Dict[str, Dict[str, None]],
+        bug: Dict[str, Any]
+    ) -> bool:
+        """Add bug to bugs keyed by fingerprint; True if it is new, else it is counted on the existing one
+        
+        affected collects each fingerprint's affected tests as an ordered set;
+        the caller writes them back to affected_tests once all bugs are added.
+        """
+        fingerprint = bug['fingerprint']
+        tests = affected.setdefault(fingerprint, {})
+        tests.update(dict.fromkeys(bug['affected_tests']))
+        existing = bugs.get(fingerprint)
+        if existing is None:
+            bugs[fingerprint] = bug
+            return True
+        
+        existing['occurrences'] += bug['occurrences']
+        # Flaky only while every occurrence passed on retry
+        existing['flaky'] = existing.get('flaky', False) and bug.get('flaky', False)
+        return False
+    
+    def _identify(self, bug: Dict[str, Any], prefix: str) -> Dict[str, Any]:
+        """Set fingerprint, stable bug_id, trace_id và the occurrence fields of a new bug"""
+        fingerprint = self.fingerprinter.fingerprint(bug)
+        bug.update({
+            'bug_id': f"{prefix}_{fingerprint}",
+            'fingerprint': fingerprint,
+            'trace_id': f"trace_{prefix}_{fingerprint}" if bug['stack_trace'] else None,
+            'occurrences': 1,
+            'affected_tests': [bug['test_name']]
+        })
+        return bug
     
     def extract_bugs_from_phase(
         self,
@@ -408,7 +719,6 @@ class BugDetector:
         # Check for phase-level errors
         if phase_result.get('error'):
             bug = {
-                'bug_id': f"phase_{phase_number}_{datetime.utcnow().timestamp()}",
                 'test_name': f"Phase {phase_number}",
                 'phase': phase_number,
                 'phase_name': phase_result.get('name', 'Unknown'),
@@ -418,7 +728,7 @@ class BugDetector:
                 'severity': 'high',
                 'timestamp': datetime.utcnow().isoformat()
             }
-            bugs.append(bug)
+            bugs.append(self._identify(bug, 'phase'))
         
         # Check stderr for errors
         stderr = phase_result.get('stderr', '')
@@ -426,7 +736,6 @@ class BugDetector:
             parsed_trace = self.stack_trace_parser.parse_stack_trace(stderr)
             if parsed_trace:
                 bug = {
-                    'bug_id': f"phase_{phase_number}_stderr_{datetime.utcnow().timestamp()}",
                     'test_name': f"Phase {phase_number} (stderr)",
                     'phase': phase_number,
                     'phase_name': phase_result.get('name', 'Unknown'),
@@ -436,7 +745,7 @@ class BugDetector:
                     'severity': 'high',
                     'timestamp': datetime.utcnow().isoformat()
                 }
-                bugs.append(bug)
+                bugs.append(self._identify(bug, 'phase_stderr'))
         
         return bugs
     
@@ -446,7 +755,17 @@ class BugDetector:
         phase_number: int,
         phase_name: str
     ) -> Optional[Dict[str, Any]]:
-        """Create bug object từ failed test"""
+        """Create và analyze bug object từ failed test"""
+        bug = self.build_bug_from_test(test, phase_number, phase_name)
+        return self.analyze_bug(bug) if bug else None
+    
+    def build_bug_from_test(
+        self,
+        test: Dict[str, Any],
+        phase_number: int,
+        phase_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """Bug object (parsed và fingerprinted, not yet analyzed) từ failed test"""
         test_name = test.get('name', 'Unknown')
         error = test.get('error', '')
         
@@ -458,30 +777,47 @@ class BugDetector:
         
         # Create bug object
         bug = {
-            'bug_id': f"bug_{hash(test_name)}_{datetime.utcnow().timestamp()}",
             'test_name': test_name,
             'phase': phase_number,
             'phase_name': phase_name,
-            'error_message': parsed_trace.get('error_message', error[:200]) if parsed_trace else error[:200],
-            'error_type': parsed_trace.get('error_type', 'UnknownError') if parsed_trace else 'UnknownError',
+            'error_message': parsed_trace.get('error_message') or error[:200],
+            'error_type': parsed_trace.get('error_type') or 'UnknownError',
             'stack_trace': parsed_trace,
             'duration': test.get('duration', 0),
+            'flaky': test.get('status') == 'FLAKY',
             'timestamp': datetime.utcnow().isoformat()
         }
-        
-        # Classify bug
-        bug['bug_type'] = self.bug_classifier.classify_bug(bug)
-        
-        # Calculate severity
-        bug['severity'] = self.bug_classifier.calculate_severity(bug, phase_number)
+        if 'retry_statuses' in test:
+            bug['retry_statuses'] = test['retry_statuses']
+        return self._identify(bug, 'bug')
+    
+    def analyze_bug(self, bug: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify bug, calculate its severity và analyze its root cause
+        
+        Failures that passed on an isolated retry (status FLAKY) are
+        bug_type 'flaky' with low severity (medium when frequent).
+        """
+        # Calculate severity; frequency is failures this run or failing runs so far
+        history = bug.get('history') or {}
+        frequency = max(bug.get('occurrences', 1), history.get('run_count', 1))
+        # Classification và root cause read the hits of one scan
+        hits = self.pattern_matcher.find_all(bug_text(bug))
+        
+        if bug.get('flaky'):
+            bug['bug_type'] = 'flaky'
+            bug['severity'] = 'medium' if frequency > 5 else 'low'
+        else:
+            # Classify bug
+            bug['bug_type'] = self.bug_classifier.classify_bug(bug, hits)
+            bug['severity'] = self.bug_classifier.calculate_severity(bug, bug.get('phase', 0), frequency=frequency)
         
         # Analyze root cause
-        bug['root_cause'] = self.root_cause_analyzer.analyze_root_cause(bug)
+        bug['root_cause'] = self.root_cause_analyzer.analyze_root_cause(bug, hits)
         
         return bug
     
     def extract_stack_traces(self, bugs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract và format stack traces từ bugs"""
+        """Extract và format stack traces từ bugs (one per trace_id)"""
         formatted_traces = []
         
         for bug in bugs:
@@ -489,6 +825,7 @@ class BugDetector:
             if stack_trace:
                 formatted = self.stack_trace_parser.format_trace(stack_trace)
                 formatted_traces.append({
+                    'trace_id': bug.get('trace_id'),
                     'bug_id': bug.get('bug_id'),
                     'test_name': bug.get('test_name'),
                     'formatted_trace': formatted,
@@ -497,6 +834,10 @@ class BugDetector:
         
         return formatted_traces
     
+    def report_bug(self, bug: Dict[str, Any]) -> Dict[str, Any]:
+        """Bug as stored in the bug report: its stack trace is referenced by trace_id"""
+        return {key: value for key, value in bug.items() if key != 'stack_trace'}
+    
     def classify_bugs(self, bugs: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Group bugs by classification"""
         classified = defaultdict(list)
@@ -508,8 +849,17 @@ class BugDetector:
         return dict(classified)
 
 
-def analyze_test_results(test_results_file: str) -> Dict[str, Any]:
-    """Main function để analyze test results và generate bug report"""
+def analyze_test_results(
+    test_results_file: str,
+    project_root: Optional[str] = None,
+    history_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """Main function để analyze test results và generate bug report
+    
+    project_root makes frame paths project-relative in fingerprints, so
+    bug_ids match across checkouts. history_file (SQLite) is updated with
+    this run và gives each bug its cross-run history.
+    """
     results_path = Path(test_results_file)
     
     if not results_path.exists():
@@ -518,16 +868,25 @@ def analyze_test_results(test_results_file: str) -> Dict[str, Any]:
     with open(results_path, 'r') as f:
         test_results = json.load(f)
     
-    detector = BugDetector()
+    history = BugHistory(Path(history_file)) if history_file else None
+    detector = BugDetector(project_root, history)
     
     # Detect bugs
-    bugs = detector.detect_bugs_from_results(test_results)
+    try:
+        bugs = detector.detect_bugs_from_results(test_results)
+    finally:
+        if history is not None:
+            history.close()
     
-    # Extract stack traces
+    # Extract stack traces; the report stores each trace once, here, và
+    # bugs refer to it by trace_id
     stack_traces = detector.extract_stack_traces(bugs)
     
-    # Classify bugs
-    classified_bugs = detector.classify_bugs(bugs)
+    # Classify bugs (by bug_id)
+    classified_bugs = {
+        bug_type: [bug['bug_id'] for bug in typed_bugs]
+        for bug_type, typed_bugs in detector.classify_bugs(bugs).items()
+    }
     
     # Identify patterns
     patterns = detector.root_cause_analyzer.identify_patterns(bugs)
@@ -536,7 +895,10 @@ def analyze_test_results(test_results_file: str) -> Dict[str, Any]:
     bug_report = {
         'timestamp': datetime.utcnow().isoformat(),
         'total_bugs': len(bugs),
-        'bugs': bugs,
+        'total_occurrences': sum(b.get('occurrences', 1) for b in bugs),
+        'flaky_bugs': sum(1 for b in bugs if b.get('flaky')),
+        'history_summary': history_summary(bugs) if history is not None else None,
+        'bugs': [detector.report_bug(bug) for bug in bugs],
         'stack_traces': stack_traces,
         'classified_bugs': classified_bugs,
         'patterns': patterns,
@@ -557,11 +919,13 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Analyze test results and detect bugs')
     parser.add_argument('--results', type=str, required=True, help='Path to test results JSON file')
     parser.add_argument('--output', type=str, help='Output file for bug report')
+    parser.add_argument('--project-root', type=str, help='Project root, to fingerprint frames by project-relative path')
+    parser.add_argument('--history', type=str, help='Bug history database to update (e.g. reports/test_history/bugs.db)')
     
     args = parser.parse_args()
     
     try:
-        bug_report = analyze_test_results(args.results)
+        bug_report = analyze_test_results(args.results, args.project_root, args.history)
         
         if args.output:
             output_path = Path(args.output)
@@ -571,7 +935,7 @@ if __name__ == '__main__':
             print(f"Bug report saved to {args.output}")
         else:
             print(json.dumps(bug_report, indent=2))
-            
+    
     except Exception as e:
         print(f"Error analyzing test results: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Bug History
+Lưu failure fingerprints qua nhiều runs (SQLite): first/last seen, run count, flake rate và regressions
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+HISTORY_STATUSES = ('new', 'recurring', 'regressed')
+
+
+def results_run_id(test_results: Dict[str, Any]) -> Optional[str]:
+    """Run id của a results file (its correlation_id, else its start time)
+    
+    None when the file has neither: such a run cannot be recognized when it
+    is analyzed again, so it gets no history.
+    """
+    run_id = (
+        test_results.get('run_id') or test_results.get('correlation_id')
+        or test_results.get('start_time')
+    )
+    return str(run_id) if run_id else None
+
+
+def describe_history(history: Optional[Dict[str, Any]]) -> str:
+    """One-line history của a bug cho reports"""
+    if not history:
+        return 'No history'
+    if history['status'] == 'new':
+        return f"New since run {history['first_seen_run']}"
+    if history['status'] == 'regressed':
+        return (f"Regressed (last seen run {history['previous_seen_run']}, "
+                f"first seen run {history['first_seen_run']})")
+    return f"Known, recurring (first seen run {history['first_seen_run']}, {history['run_count']} runs)"
+
+
+def history_summary(bugs: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Count của bugs per history status (bugs without history are left out)"""
+    counts = {status: 0 for status in HISTORY_STATUSES}
+    for bug in bugs:
+        history = bug.get('history')
+        if history:
+            counts[history['status']] += 1
+    return counts
+
+
+class BugHistory:
+    """Persistent per-fingerprint failure history
+    
+    Each run is recorded once (by run id, so re-analyzing a results file
+    does not count it twice). Runs are ordered by started_at when known
+    (else by when they were recorded), so a run analyzed late still takes
+    its place among the others. Per fingerprint it keeps first/last seen run,
+    the number of runs và occurrences it failed in, và how often it came
+    back after a run without it: flake_rate = reappearances / (run_count - 1),
+    0 for a failure present in every run since it appeared.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL UNIQUE,
+                started_at TEXT,
+                recorded_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bugs (
+                fingerprint TEXT PRIMARY KEY,
+                bug_id TEXT,
+                error_type TEXT,
+                error_message TEXT,
+                first_seen_run INTEGER NOT NULL,
+                last_seen_run INTEGER NOT NULL,
+                run_count INTEGER NOT NULL,
+                occurrence_count INTEGER NOT NULL,
+                reappearances INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS bug_runs (
+                run INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                occurrences INTEGER NOT NULL,
+                PRIMARY KEY (fingerprint, run)
+            );
+            """
+        )
+        self._conn.commit()
+    
+    def record_run(
+        self,
+        run_id: str,
+        bugs: Iterable[Dict[str, Any]],
+        started_at: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Record the distinct bugs của a run; returns the history of each by fingerprint
+        
+        Recording the same run id again only adds bugs it did not have.
+        """
+        bugs = [bug for bug in bugs if bug.get('fingerprint')]
+        
+        with self._lock:
+            row = self._conn.execute('SELECT id FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            if row is not None:
+                run = row[0]
+            else:
+                run = self._conn.execute(
+                    'INSERT INTO runs (run_id, started_at, recorded_at) VALUES (?, ?, ?)',
+                    (run_id, started_at, datetime.utcnow().isoformat())
+                ).lastrowid
+            positions = self._run_positions()
+            for bug in bugs:
+                self._record_bug(run, bug, positions)
+            self._conn.commit()
+            
+            return {bug['fingerprint']: self._history(run, bug['fingerprint'], positions) for bug in bugs}
+    
+    def _run_positions(self) -> Dict[int, int]:
+        """Map run -> its position in run order (started_at, else recorded_at; then insertion)"""
+        rows = self._conn.execute('SELECT id FROM runs ORDER BY COALESCE(started_at, recorded_at), id')
+        return {run: position for position, (run,) in enumerate(rows)}
+    
+    def _seen_runs(self, fingerprint: str, positions: Dict[int, int]) -> List[Tuple[int, int]]:
+        """(run, occurrences) của every run fingerprint failed in, in run order"""
+        rows = self._conn.execute('SELECT run, occurrences FROM bug_runs WHERE fingerprint = ?', (fingerprint,))
+        return sorted(rows, key=lambda row: positions[row[0]])
+    
+    def _record_bug(self, run: int, bug: Dict[str, Any], positions: Dict[int, int]):
+        fingerprint = bug['fingerprint']
+        occurrences = bug.get('occurrences', 1)
+        inserted = self._conn.execute(
+            'INSERT OR IGNORE INTO bug_runs (run, fingerprint, occurrences) VALUES (?, ?, ?)',
+            (run, fingerprint, occurrences)
+        ).rowcount
+        if not inserted:
+            return  # already recorded for this run
+        
+        # Recomputed from bug_runs: a late run may fall between runs already counted
+        seen = self._seen_runs(fingerprint, positions)
+        reappearances = sum(
+            1 for (earlier, _), (later, _) in zip(seen, seen[1:])
+            if positions[later] - positions[earlier] > 1
+        )
+        self._conn.execute(
+            'INSERT INTO bugs (fingerprint, bug_id, error_type, error_message, first_seen_run, last_seen_run, '
+            'run_count, occurrence_count, reappearances) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(fingerprint) DO UPDATE SET first_seen_run = excluded.first_seen_run, '
+            'last_seen_run = excluded.last_seen_run, run_count = excluded.run_count, '
+            'occurrence_count = excluded.occurrence_count, reappearances = excluded.reappearances',
+            (fingerprint, bug.get('bug_id'), bug.get('error_type'), bug.get('error_message'), seen[0][0], seen[-1][0],
+             len(seen), sum(count for _, count in seen), reappearances)
+        )
+    
+    def _run_id(self, run: Optional[int]) -> Optional[str]:
+        return self._run(run)[0]
+    
+    def _run(self, run: Optional[int]) -> Tuple[Optional[str], Optional[str]]:
+        """(run_id, started_at or recorded_at) của a run"""
+        if run is None:
+            return None, None
+        run_id, started_at, recorded_at = self._conn.execute(
+            'SELECT run_id, started_at, recorded_at FROM runs WHERE id = ?', (run,)
+        ).fetchone()
+        return run_id, started_at or recorded_at
+    
+    def _history(self, run: int, fingerprint: str, positions: Dict[int, int]) -> Dict[str, Any]:
+        """History của fingerprint as of run (status relative to the runs before it in run order)"""
+        first_seen_run, last_seen_run, run_count, occurrence_count, reappearances = self._conn.execute(
+            'SELECT first_seen_run, last_seen_run, run_count, occurrence_count, reappearances '
+            'FROM bugs WHERE fingerprint = ?',
+            (fingerprint,)
+        ).fetchone()
+        position = positions[run]
+        seen_before = max(
+            (seen for seen, _ in self._seen_runs(fingerprint, positions) if positions[seen] < position),
+            key=positions.__getitem__,
+            default=None
+        )
+        
+        if seen_before is None:
+            status = 'new'
+        elif positions[seen_before] == position - 1:
+            status = 'recurring'
+        else:
+            status = 'regressed'
+        
+        first_seen = self._run(first_seen_run)
+        last_seen = self._run(last_seen_run)
+        return {
+            'status': status,
+            'first_seen_run': first_seen[0],
+            'first_seen': first_seen[1],
+            'last_seen_run': last_seen[0],
+            'last_seen': last_seen[1],
+            'previous_seen_run': self._run_id(seen_before),
+            'run_count': run_count,
+            'occurrence_count': occurrence_count,
+            'flake_rate': round(reappearances / (run_count - 1), 3) if run_count > 1 else 0.0
+        }
+    
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self._conn.close()
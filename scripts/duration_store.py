@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test Duration Store
+Lưu per-test-file durations qua nhiều runs (SQLite) và chia shards cân bằng theo thời gian
+"""
+
+import heapq
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+DEFAULT_DURATION = 1.0  # seconds, for files never seen before (and no history at all)
+
+
+class DurationStore:
+    """Persistent per-test-file duration history"""
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS test_durations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                test_file TEXT NOT NULL,
+                duration REAL NOT NULL,
+                status TEXT,
+                phase INTEGER,
+                run_id TEXT,
+                recorded_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_test_durations_file ON test_durations (test_file, id)'
+        )
+        self._conn.commit()
+    
+    def record(self, tests: Iterable[Dict[str, Any]], run_id: Optional[str] = None, phase: Optional[int] = None):
+        """Record durations của test files vừa chạy"""
+        recorded_at = datetime.utcnow().isoformat()
+        rows = [
+            (test['name'], test.get('duration', 0), test.get('status'), phase, run_id, recorded_at)
+            for test in tests
+            if test.get('name')
+        ]
+        if not rows:
+            return
+        
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO test_durations (test_file, duration, status, phase, run_id, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
+    
+    def expected_durations(self, test_files: List[str], window: int = 10) -> Dict[str, float]:
+        """Expected duration per file: mean of its last `window` runs
+        
+        Files without history get the median of the known files.
+        """
+        known: Dict[str, float] = {}
+        with self._lock:
+            for test_file in test_files:
+                row = self._conn.execute(
+                    'SELECT AVG(duration) FROM ('
+                    '  SELECT duration FROM test_durations WHERE test_file = ? ORDER BY id DESC LIMIT ?'
+                    ')',
+                    (test_file, window)
+                ).fetchone()
+                if row and row[0] is not None:
+                    known[test_file] = row[0]
+        
+        if known:
+            ordered = sorted(known.values())
+            fallback = ordered[len(ordered) // 2]
+        else:
+            fallback = DEFAULT_DURATION
+        
+        return {test_file: known.get(test_file, fallback) for test_file in test_files}
+    
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+def shard_files(
+    test_files: List[str],
+    shard_count: int,
+    expected: Dict[str, float]
+) -> List[List[str]]:
+    """Split files into shards of roughly equal expected time
+    
+    Longest-processing-time first: files are assigned, slowest first, to the
+    shard with the least expected time so far (ties: the one with fewest
+    files, so zero-duration files are still spread over all shards).
+    """
+    shard_count = max(1, shard_count)
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    heap = [(0.0, 0, index) for index in range(shard_count)]
+    
+    for test_file in sorted(test_files, key=lambda f: (-expected.get(f, DEFAULT_DURATION), f)):
+        total, count, index = heapq.heappop(heap)
+        shards[index].append(test_file)
+        heapq.heappush(heap, (total + expected.get(test_file, DEFAULT_DURATION), count + 1, index))
+    
+    return shards
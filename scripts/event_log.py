@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Compact Event Log
+Binary, length-prefixed, schema-versioned encoding cho high-volume log events
+"""
+
+import json
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Any, Iterator, Tuple
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+EVENT_MAGIC = b'TEV'
+SCHEMA_VERSION = 1
+READ_CHUNK_SIZE = 64 * 1024  # entries are decoded one batch per chunk; small batches stay in cache
+
+# Every record: payload length + kind; kinds below FIRST_SHAPE are control records
+RECORD_HEADER = struct.Struct('<IH')
+KIND_SEGMENT = 0  # payload: magic + schema version; resets strings và shapes
+KIND_STRING = 1   # payload: utf-8 text, gets the next string id
+KIND_SHAPE = 2    # payload: JSON [[key, tag], ...], gets the next shape id
+FIRST_SHAPE = 16
+
+# Value tags và their fixed-size struct codes (text/JSON store their byte length)
+TAG_CODES = {
+    'n': '',   # None
+    'b': '?',  # bool
+    'i': 'q',  # int
+    'f': 'd',  # float
+    's': 'I',  # interned string id
+    't': 'I',  # inline text
+    'j': 'I',  # inline JSON
+    'm': '',   # message derived from a test_result event
+}
+VARIABLE_TAGS = ('t', 'j')
+INTERN_MAX_LENGTH = 128
+INT64_RANGE = (-(2 ** 63), 2 ** 63 - 1)
+
+
+def test_result_message(entry: Dict[str, Any]) -> str:
+    """Message TestLogger.log_test_result writes for an entry"""
+    return f"Test {entry.get('test')}: {entry.get('status')} ({entry.get('duration'):.3f}s)"
+
+
+def _pack_record(kind: int, payload: bytes) -> bytes:
+    return RECORD_HEADER.pack(len(payload), kind) + payload
+
+
+class EventWriter:
+    """Encode log entries as compact binary records
+    
+    Strings up to INTERN_MAX_LENGTH (keys live in shapes) are written once
+    per segment and referenced by id; each distinct field layout (keys và
+    value types) becomes a shape decoded with one struct call. A segment
+    starts with segment_header(), which resets both tables.
+    """
+    
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.shapes: Dict[Tuple[Tuple[str, str], ...], Tuple[int, struct.Struct]] = {}
+    
+    def segment_header(self) -> bytes:
+        """Start a new segment (e.g. at the start of a file)"""
+        self.strings = {}
+        self.shapes = {}
+        return _pack_record(KIND_SEGMENT, EVENT_MAGIC + bytes([SCHEMA_VERSION]))
+    
+    def _intern(self, value: str, out: List[bytes]) -> int:
+        string_id = self.strings.get(value)
+        if string_id is None:
+            string_id = self.strings[value] = len(self.strings)
+            out.append(_pack_record(KIND_STRING, value.encode('utf-8')))
+        return string_id
+    
+    def encode(self, micros: int, entry: Dict[str, Any]) -> bytes:
+        """Records for one entry (string/shape definitions first, if new) stamped micros since epoch"""
+        out: List[bytes] = []
+        layout = []
+        fixed: List[Any] = [micros]
+        variable: List[bytes] = []
+        
+        derived = entry.get('event') == 'test_result'
+        if derived:
+            try:
+                derived = entry.get('message') == test_result_message(entry)
+            except (TypeError, ValueError):
+                derived = False
+        
+        for key, value in entry.items():
+            if key == 'message' and derived:
+                tag = 'm'
+            elif value is None:
+                tag = 'n'
+            elif isinstance(value, bool):
+                tag = 'b'
+                fixed.append(value)
+            elif isinstance(value, int) and INT64_RANGE[0] <= value <= INT64_RANGE[1]:
+                tag = 'i'
+                fixed.append(value)
+            elif isinstance(value, float):
+                tag = 'f'
+                fixed.append(value)
+            elif isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+                tag = 's'
+                fixed.append(self._intern(value, out))
+            else:
+                if isinstance(value, str):
+                    tag = 't'
+                    data = value.encode('utf-8')
+                else:
+                    tag = 'j'
+                    data = json.dumps(value, default=str).encode('utf-8')
+                fixed.append(len(data))
+                variable.append(data)
+            layout.append((key, tag))
+        
+        shape_key = tuple(layout)
+        shape = self.shapes.get(shape_key)
+        if shape is None:
+            shape_id = FIRST_SHAPE + len(self.shapes)
+            shape = self.shapes[shape_key] = (
+                shape_id,
+                struct.Struct('<q' + ''.join(TAG_CODES[tag] for _, tag in layout))
+            )
+            out.append(_pack_record(KIND_SHAPE, json.dumps(layout).encode('utf-8')))
+        
+        out.append(_pack_record(shape[0], shape[1].pack(*fixed) + b''.join(variable)))
+        return b''.join(out)
+
+
+class _Shape:
+    """Decoder of one shape: one struct unpack, then fields in layout order"""
+    
+    def __init__(self, layout: List[List[str]]):
+        self.struct = struct.Struct('<q' + ''.join(TAG_CODES[tag] for _, tag in layout))
+        self.unpack_from = self.struct.unpack_from
+        self.size = self.struct.size
+        # Unpacked values: micros at 0, then one slot per field that has a value
+        self.fields: List[Tuple[str, str, int]] = []
+        self.derived: List[str] = []
+        slot = 1
+        for key, tag in layout:
+            self.fields.append((key, tag, slot))
+            if tag == 'm':
+                self.derived.append(key)
+            if tag not in ('n', 'm'):
+                slot += 1
+    
+    def decode(self, buffer: bytes, start: int, strings: List[str], clock: List[Any]) -> Dict[str, Any]:
+        values = self.unpack_from(buffer, start)
+        second, fraction = divmod(values[0], 1000000)
+        if second != clock[0]:
+            clock[0] = second
+            clock[1] = datetime.utcfromtimestamp(second).isoformat()
+        entry: Dict[str, Any] = {'timestamp': f'{clock[1]}.{fraction:06d}' if fraction else clock[1]}
+        offset = start + self.size
+        
+        for key, tag, slot in self.fields:
+            if tag == 's':
+                entry[key] = strings[values[slot]]
+            elif tag in ('n', 'm'):
+                entry[key] = None  # keeps the key order
+            elif tag in VARIABLE_TAGS:
+                data = buffer[offset:offset + values[slot]]
+                offset += values[slot]
+                entry[key] = data.decode('utf-8') if tag == 't' else json.loads(data)
+            else:
+                entry[key] = values[slot]
+        for key in self.derived:
+            entry[key] = test_result_message(entry)
+        return entry
+
+
+def iter_event_batches(f: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Decode entries from a compact event file, in file order, one batch per chunk read
+    
+    A trailing partial record (still being written) is ignored. Raises
+    ValueError on a segment with an unknown schema version.
+    """
+    strings: List[str] = []
+    shapes: Dict[int, _Shape] = {}
+    clock: List[Any] = [None, '']  # last decoded second và its ISO text
+    header_size = RECORD_HEADER.size
+    unpack_header = RECORD_HEADER.unpack_from
+    buffer = b''
+    
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        entries = []
+        append = entries.append
+        pos = 0
+        end = len(buffer)
+        while pos + header_size <= end:
+            length, kind = unpack_header(buffer, pos)
+            start = pos + header_size
+            if start + length > end:
+                break
+            pos = start + length
+            
+            if kind >= FIRST_SHAPE:
+                append(shapes[kind].decode(buffer, start, strings, clock))
+            elif kind == KIND_STRING:
+                strings.append(buffer[start:pos].decode('utf-8'))
+            elif kind == KIND_SHAPE:
+                shapes[FIRST_SHAPE + len(shapes)] = _Shape(json.loads(buffer[start:pos]))
+            elif kind == KIND_SEGMENT:
+                payload = buffer[start:pos]
+                if payload[:len(EVENT_MAGIC)] != EVENT_MAGIC or payload[len(EVENT_MAGIC):] != bytes([SCHEMA_VERSION]):
+                    raise ValueError(f"Unsupported event log segment: {payload!r}")
+                strings = []
+                shapes = {}
+        buffer = buffer[pos:]
+        yield entries
+
+
+def iter_events(f: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Decode entries from a compact event file, in file order (see iter_event_batches)"""
+    for entries in iter_event_batches(f, chunk_size):
+        yield from entries
+
+
+def read_events(path: Path) -> List[Dict[str, Any]]:
+    """All entries of a compact event file"""
+    with open(path, 'rb') as f:
+        return list(iter_events(f))
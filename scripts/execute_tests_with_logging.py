@@ -13,21 +13,150 @@ import psutil
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Set
 import uuid
+import contextvars
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add scripts directory to path
 scripts_dir = Path(__file__).parent
 sys.path.insert(0, str(scripts_dir))
 
 from test_logger import setup_test_logging, TestLogger
+from phase_planner import PhasePlanner, attribute_shared_results, normalize_test_name
+from progress_bridge import JestProgressBridge, reporter_args
+from resource_sampler import ProcessTreeSampler
+from impact_analyzer import ImpactAnalyzer
+from duration_store import DurationStore, shard_files
+from result_cache import ContentHasher, ResultCache
+
+PHASE_TIMEOUT_SECONDS = 1800  # 30 minutes
+
+
+def jest_file_duration(test_result: Dict[str, Any]) -> float:
+    """Duration (seconds) của one file entry in Jest's --json testResults
+    
+    The entries carry startTime/endTime (epoch ms), not a duration;
+    perfStats.runtime is used when a reporter provides it instead.
+    """
+    if test_result.get('startTime') and test_result.get('endTime'):
+        return max(0.0, (test_result['endTime'] - test_result['startTime']) / 1000)
+    runtime = (test_result.get('perfStats') or {}).get('runtime')
+    if runtime is not None:
+        return runtime / 1000
+    return test_result.get('duration', 0) / 1000
+
+
+class StreamingOutputCapture:
+    """Tee child process output line by line vào phase log file
+    
+    Only a bounded tail of each stream is kept in memory; the full output
+    lives in the log file on disk.
+    """
+    
+    def __init__(self, log_file: Path, tail_lines: int = 200):
+        self.log_file = log_file
+        self.tails = {
+            'stdout': deque(maxlen=tail_lines),
+            'stderr': deque(maxlen=tail_lines)
+        }
+        self.line_counts = {'stdout': 0, 'stderr': 0}
+        self.progress = {
+            'files_passed': 0,
+            'files_failed': 0,
+            'jest_summary': None
+        }
+        self._lock = threading.Lock()
+        self._file = open(log_file, 'w', encoding='utf-8')
+    
+    def parse_progress_line(self, line: str):
+        """Update progress counters từ một dòng Jest output"""
+        stripped = line.strip()
+        if stripped.startswith('PASS '):
+            self.progress['files_passed'] += 1
+        elif stripped.startswith('FAIL '):
+            self.progress['files_failed'] += 1
+        elif stripped.startswith('Tests:'):
+            self.progress['jest_summary'] = stripped.split('Tests:', 1)[1].strip()
+    
+    def feed(self, stream_name: str, line: str):
+        """Write một dòng output và update tail/progress"""
+        with self._lock:
+            self._file.write(line)
+            self.tails[stream_name].append(line)
+            self.line_counts[stream_name] += 1
+            self.parse_progress_line(line)
+    
+    def pump(self, stream_name: str, pipe):
+        """Read a pipe until EOF (runs on a reader thread)"""
+        try:
+            for line in pipe:
+                self.feed(stream_name, line)
+        finally:
+            pipe.close()
+    
+    def tail(self, stream_name: str) -> str:
+        """Get bounded tail của một stream"""
+        with self._lock:
+            return ''.join(self.tails[stream_name])
+    
+    def truncated(self) -> bool:
+        """Whether any stream has more lines than the retained tail"""
+        return any(
+            self.line_counts[name] > len(self.tails[name])
+            for name in self.tails
+        )
+    
+    def close(self):
+        """Close the log file"""
+        with self._lock:
+            self._file.close()
 
 
 class EnhancedTestExecutor:
     """Enhanced test executor với detailed logging và bug capture"""
     
-    def __init__(self, project_root: Path, logger: Optional[TestLogger] = None):
+    def __init__(
+        self,
+        project_root: Path,
+        logger: Optional[TestLogger] = None,
+        workers: int = 1,
+        stream_output: bool = False,
+        output_tail_lines: int = 200,
+        live_progress: bool = False,
+        sample_interval: float = 1.0,
+        shards: int = 1,
+        shard_index: Optional[int] = None,
+        use_cache: bool = True,
+        retries: int = 0,
+        retry_workers: Optional[int] = None
+    ):
         self.project_root = project_root
+        self.workers = max(1, workers)
+        self.stream_output = stream_output
+        self.output_tail_lines = output_tail_lines
+        self.live_progress = live_progress
+        self.sample_interval = sample_interval
+        self.shards = max(1, shards)
+        if shard_index is not None and not 0 <= shard_index < self.shards:
+            raise ValueError(f"shard_index must be between 0 and {self.shards - 1}, got {shard_index}")
+        self.shard_index = shard_index
+        if retries < 0:
+            raise ValueError(f"retries must be >= 0, got {retries}")
+        self.retries = retries
+        self.retry_workers = max(1, retry_workers if retry_workers is not None else (os.cpu_count() or 1))
+        self._retry_ids = itertools.count()  # keeps output files of retries apart
+        self.duration_store = DurationStore(project_root / 'reports' / 'test_history' / 'durations.db')
+        self.result_cache = ResultCache(project_root / 'reports' / 'test_cache' / 'results.db') if use_cache else None
+        self._process = psutil.Process()
+        # Prime cpu_percent so later calls measure since the previous one without blocking
+        self._process.cpu_percent(interval=None)
+        self._concurrent_phases = 1
+        # Raw Jest output stays out of the structured log directory, which log_aggregator reads
+        self.output_dir = project_root / 'logs' / 'jest_output'
         self.logger = logger or setup_test_logging(
             log_dir=str(project_root / 'logs' / 'test_execution'),
             service_name='test_executor'
@@ -40,9 +169,9 @@ class EnhancedTestExecutor:
     
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Get current system performance metrics"""
-        process = psutil.Process()
+        process = self._process
         memory_info = process.memory_info()
-        cpu_percent = process.cpu_percent(interval=0.1)
+        cpu_percent = process.cpu_percent(interval=None)
         
         return {
             'memory_mb': memory_info.rss / 1024 / 1024,
@@ -52,6 +181,51 @@ class EnhancedTestExecutor:
             'open_files': len(process.open_files())
         }
     
+    def output_name(self, phase_number: int, shard: Optional[int] = None) -> str:
+        """Base name for per-phase output files (logs, Jest JSON, coverage)"""
+        if shard is None:
+            return f'phase_{phase_number}'
+        return f'phase_{phase_number}_shard_{shard}'
+    
+    def build_jest_command(
+        self,
+        phase_number: int,
+        test_path: str,
+        test_files: Optional[List[str]] = None,
+        shard: Optional[int] = None
+    ) -> List[str]:
+        """Build Jest command cho một phase"""
+        # Note: Jest doesn't have a direct phase concept, so we'll run tests matching the path
+        # unless the phase planner resolved an explicit file list
+        if test_files is not None:
+            selection = ['--runTestsByPath', *test_files]
+        else:
+            selection = ['--testPathPattern', test_path]
+        
+        cmd = [
+            'npm', 'test', '--',
+            *selection,
+            '--verbose',
+            '--coverage',
+            '--coverageReporters', 'json',
+            '--json',
+            '--outputFile', str(self.project_root / 'reports' / 'test_results' / f'{self.output_name(phase_number, shard)}_results.json')
+        ]
+        
+        if self.live_progress:
+            cmd.extend(reporter_args())
+        
+        if self._concurrent_phases > 1:
+            # Concurrent phases must not share the coverage directory, and each
+            # Jest instance only gets its share of the CPUs
+            jest_workers = max(1, (os.cpu_count() or 1) // self._concurrent_phases)
+            cmd.extend([
+                '--coverageDirectory', str(self.project_root / 'coverage' / self.output_name(phase_number, shard)),
+                '--maxWorkers', str(jest_workers)
+            ])
+        
+        return cmd
+    
     def capture_test_output(
         self,
         test_name: str,
@@ -87,13 +261,209 @@ class EnhancedTestExecutor:
         
         return output
     
+    def terminate_process_tree(self, process: subprocess.Popen):
+        """Terminate Jest và toàn bộ child processes (npm -> jest -> workers)"""
+        try:
+            children = psutil.Process(process.pid).children(recursive=True)
+        except psutil.Error:
+            children = []
+        
+        for child in children:
+            try:
+                child.terminate()
+            except psutil.Error:
+                pass
+        process.terminate()
+        
+        _, alive = psutil.wait_procs(children, timeout=5)
+        for child in alive:
+            try:
+                child.kill()
+            except psutil.Error:
+                pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    
+    def _start_sampler(self, process: subprocess.Popen) -> Optional[ProcessTreeSampler]:
+        """Start sampling the Jest process tree (disabled when interval <= 0)"""
+        if self.sample_interval <= 0:
+            return None
+        sampler = ProcessTreeSampler(process.pid, interval=self.sample_interval)
+        sampler.start()
+        return sampler
+    
+    def _wait_for_process(
+        self,
+        process: subprocess.Popen,
+        wait: Any,
+        abort_event: Optional[threading.Event]
+    ) -> Tuple[Any, bool]:
+        """Wait for process, polling abort_event
+        
+        wait(timeout) is process.wait or process.communicate. Returns its
+        result and whether the process was aborted. Raises
+        subprocess.TimeoutExpired when the phase exceeds the timeout.
+        """
+        deadline = time.time() + PHASE_TIMEOUT_SECONDS
+        aborted = False
+        
+        while True:
+            try:
+                return wait(timeout=0.5), aborted
+            except subprocess.TimeoutExpired:
+                if abort_event is not None and abort_event.is_set() and not aborted:
+                    aborted = True
+                    self.terminate_process_tree(process)
+                elif time.time() > deadline:
+                    self.terminate_process_tree(process)
+                    wait(timeout=None)
+                    raise subprocess.TimeoutExpired(process.args, PHASE_TIMEOUT_SECONDS)
+    
+    def run_jest_process(
+        self,
+        cmd: List[str],
+        log_file: Path,
+        extra_env: Optional[Dict[str, str]] = None,
+        abort_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """Run Jest và capture output
+        
+        In streaming mode, stdout/stderr are teed line by line to log_file and
+        only a bounded tail is returned. Setting abort_event terminates the
+        Jest process tree. Raises subprocess.TimeoutExpired when the phase
+        exceeds the timeout.
+        """
+        env = {**os.environ, 'NODE_ENV': 'test', **(extra_env or {})}
+        
+        if not self.stream_output:
+            process = subprocess.Popen(
+                cmd,
+                cwd=self.project_root,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                env=env
+            )
+            sampler = self._start_sampler(process)
+            try:
+                (stdout, stderr), aborted = self._wait_for_process(
+                    process, process.communicate, abort_event
+                )
+            finally:
+                process_tree = sampler.stop() if sampler else None
+            return {
+                'returncode': process.returncode,
+                'stdout': stdout,
+                'stderr': stderr,
+                'aborted': aborted,
+                'process_tree': process_tree
+            }
+        
+        capture = StreamingOutputCapture(log_file, self.output_tail_lines)
+        process = subprocess.Popen(
+            cmd,
+            cwd=self.project_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1,
+            env=env
+        )
+        readers = [
+            threading.Thread(target=capture.pump, args=(name, pipe), daemon=True)
+            for name, pipe in (('stdout', process.stdout), ('stderr', process.stderr))
+        ]
+        for reader in readers:
+            reader.start()
+        sampler = self._start_sampler(process)
+        
+        try:
+            returncode, aborted = self._wait_for_process(process, process.wait, abort_event)
+        finally:
+            process_tree = sampler.stop() if sampler else None
+            for reader in readers:
+                reader.join()
+            capture.close()
+        
+        return {
+            'returncode': returncode,
+            'stdout': capture.tail('stdout'),
+            'stderr': capture.tail('stderr'),
+            'aborted': aborted,
+            'process_tree': process_tree,
+            'output_log': str(log_file),
+            'output_truncated': capture.truncated(),
+            'progress': capture.progress
+        }
+    
+    def handle_progress_event(
+        self,
+        event: Dict[str, Any],
+        phase_number: int,
+        live_tests: Dict[str, Dict[str, Any]],
+        abort_event: Optional[threading.Event] = None
+    ):
+        """Handle một live event từ Jest progress reporter
+        
+        Finished test files are logged immediately. When abort_event is given,
+        the first failure sets it so the phase can be stopped early.
+        """
+        if event.get('event') == 'test_file_start':
+            self.logger.get_logger().debug(
+                f"Test file started: {event.get('path')}",
+                extra={'extra_fields': {'phase': phase_number, 'event': 'test_file_start', 'test': event.get('path')}}
+            )
+            return
+        if event.get('event') != 'test_file_result':
+            return
+        
+        test_name = event.get('path', 'Unknown')
+        status = 'PASSED' if event.get('status') == 'passed' else 'FAILED'
+        duration = (event.get('duration') or 0) / 1000  # Convert ms to seconds
+        error = event.get('failureMessage') if status == 'FAILED' else None
+        
+        self.logger.log_test_result(
+            test_name=test_name,
+            status=status,
+            duration=duration,
+            phase=phase_number,
+            error=error
+        )
+        live_tests[test_name] = {
+            'name': test_name,
+            'status': status,
+            'duration': duration,
+            'error': error
+        }
+        
+        if status == 'FAILED' and abort_event is not None and not abort_event.is_set():
+            self.logger.get_logger().error(
+                f"Aborting Phase {phase_number} after first failure: {test_name} (fail-fast mode)",
+                extra={'extra_fields': {'phase': phase_number, 'event': 'fail_fast', 'test': test_name}}
+            )
+            abort_event.set()
+    
     def execute_phase_with_logging(
         self,
         phase_number: int,
         phase_name: str,
-        test_path: str
+        test_path: str,
+        test_files: Optional[List[str]] = None,
+        abort_on_failure: bool = False,
+        shard: Optional[int] = None,
+        abort_event: Optional[threading.Event] = None
     ) -> Dict[str, Any]:
-        """Execute a test phase với comprehensive logging"""
+        """Execute a test phase với comprehensive logging
+        
+        test_files, when given, runs exactly those files instead of test_path.
+        With live progress, abort_on_failure stops the phase at the first
+        failed test file. Setting abort_event (e.g. another phase failed in
+        fail-fast mode) stops it too. shard keeps output files of a phase's
+        shards apart.
+        """
         phase_start_time = time.time()
         phase_start_datetime = datetime.utcnow()
         
@@ -104,20 +474,11 @@ class EnhancedTestExecutor:
         initial_metrics = self.get_performance_metrics()
         
         # Create log file for this phase
-        log_file = self.project_root / 'logs' / 'test_execution' / f'phase_{phase_number}.log'
+        log_file = self.output_dir / f'{self.output_name(phase_number, shard)}.log'
         log_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Prepare Jest command
-        # Note: Jest doesn't have a direct phase concept, so we'll run tests matching the path
-        cmd = [
-            'npm', 'test', '--',
-            '--testPathPattern', test_path,
-            '--verbose',
-            '--coverage',
-            '--coverageReporters', 'json',
-            '--json',
-            '--outputFile', str(self.project_root / 'reports' / 'test_results' / f'phase_{phase_number}_results.json')
-        ]
+        cmd = self.build_jest_command(phase_number, test_path, test_files, shard)
         
         # Ensure reports directory exists
         reports_dir = self.project_root / 'reports' / 'test_results'
@@ -125,23 +486,40 @@ class EnhancedTestExecutor:
         
         test_results = []
         phase_output = {
-            'stdout': '',
-            'stderr': '',
             'tests': []
         }
         
+        # Never pick up a results file left over from an earlier run
+        json_output_file = reports_dir / f'{self.output_name(phase_number, shard)}_results.json'
+        if json_output_file.exists():
+            json_output_file.unlink()
+        
+        live_tests: Dict[str, Dict[str, Any]] = {}
+        # Only live progress events can report a failure while Jest runs
+        failure_event = None
+        if abort_on_failure and self.live_progress:
+            abort_event = failure_event = abort_event or threading.Event()
+        bridge = None
+        if self.live_progress:
+            bridge = JestProgressBridge(
+                lambda event: self.handle_progress_event(event, phase_number, live_tests, failure_event)
+            )
+            bridge.start()
+        
         try:
             self.logger.get_logger().info(f"Executing command: {' '.join(cmd)}")
             
             # Run Jest tests
-            result = subprocess.run(
-                cmd,
-                cwd=self.project_root,
-                capture_output=True,
-                text=True,
-                timeout=1800,  # 30 minutes timeout
-                env={**os.environ, 'NODE_ENV': 'test'}
-            )
+            try:
+                result = self.run_jest_process(
+                    cmd,
+                    log_file,
+                    extra_env=bridge.env() if bridge else None,
+                    abort_event=abort_event
+                )
+            finally:
+                if bridge:
+                    bridge.close()
             
             phase_end_time = time.time()
             phase_duration = phase_end_time - phase_start_time
@@ -150,7 +528,6 @@ class EnhancedTestExecutor:
             final_metrics = self.get_performance_metrics()
             
             # Parse Jest JSON output if available
-            json_output_file = reports_dir / f'phase_{phase_number}_results.json'
             jest_results = None
             if json_output_file.exists():
                 try:
@@ -159,18 +536,13 @@ class EnhancedTestExecutor:
                 except Exception as e:
                     self.logger.get_logger().warning(f"Failed to parse Jest JSON output: {e}")
             
-            # Capture output
-            phase_output['stdout'] = result.stdout
-            phase_output['stderr'] = result.stderr
-            phase_output['returncode'] = result.returncode
-            
             # Extract test information from Jest output
             if jest_results:
                 test_results = jest_results.get('testResults', [])
                 for test_result in test_results:
                     test_name = test_result.get('name', 'Unknown')
                     status = 'PASSED' if test_result.get('status') == 'passed' else 'FAILED'
-                    duration = test_result.get('duration', 0) / 1000  # Convert ms to seconds
+                    duration = jest_file_duration(test_result)
                     
                     error = None
                     if test_result.get('status') == 'failed':
@@ -178,14 +550,15 @@ class EnhancedTestExecutor:
                         if failure_messages:
                             error = '\n'.join(failure_messages)
                     
-                    # Log individual test result
-                    self.logger.log_test_result(
-                        test_name=test_name,
-                        status=status,
-                        duration=duration,
-                        phase=phase_number,
-                        error=error
-                    )
+                    # Log individual test result (unless already logged live)
+                    if test_name not in live_tests:
+                        self.logger.log_test_result(
+                            test_name=test_name,
+                            status=status,
+                            duration=duration,
+                            phase=phase_number,
+                            error=error
+                        )
                     
                     phase_output['tests'].append({
                         'name': test_name,
@@ -193,6 +566,10 @@ class EnhancedTestExecutor:
                         'duration': duration,
                         'error': error
                     })
+            elif live_tests:
+                # Aborted runs write no JSON output; fall back to live events
+                test_results = list(live_tests.values())
+                phase_output['tests'].extend(test_results)
             
             # Calculate performance metrics
             performance_metrics = {
@@ -201,6 +578,10 @@ class EnhancedTestExecutor:
                 'duration': phase_duration,
                 'memory_delta_mb': final_metrics['memory_mb'] - initial_metrics['memory_mb']
             }
+            if result['process_tree']:
+                # Time series of the Jest process tree (the driver metrics above
+                # only describe this Python process)
+                performance_metrics['process_tree'] = result['process_tree']
             
             # Log performance metrics
             self.logger.log_performance_metrics(phase_number, performance_metrics)
@@ -209,16 +590,39 @@ class EnhancedTestExecutor:
             phase_result = {
                 'phase': phase_number,
                 'name': phase_name,
-                'success': result.returncode == 0,
+                'success': result['returncode'] == 0,
                 'duration': phase_duration,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'returncode': result.returncode,
+                'stdout': result['stdout'],
+                'stderr': result['stderr'],
+                'returncode': result['returncode'],
                 'test_count': len(test_results),
                 'performance_metrics': performance_metrics,
                 'tests': phase_output['tests']
             }
             
+            if result['aborted']:
+                phase_result['success'] = False
+                phase_result['aborted'] = True
+            
+            if shard is not None:
+                phase_result['shard'] = shard
+            
+            # Keep per-file durations for duration-balanced sharding
+            self.duration_store.record(
+                (
+                    {**test, 'name': normalize_test_name(test['name'], self.project_root)}
+                    for test in phase_output['tests']
+                ),
+                run_id=self.correlation_id,
+                phase=phase_number
+            )
+            
+            # Streaming mode keeps only a tail in the result; full output is on disk
+            if 'output_log' in result:
+                phase_result['output_log'] = result['output_log']
+                phase_result['output_truncated'] = result['output_truncated']
+                phase_result['jest_summary'] = result['progress']['jest_summary']
+            
             # Log phase end
             self.logger.log_phase_end(
                 phase_number,
@@ -236,7 +640,7 @@ class EnhancedTestExecutor:
             self.generate_junit_xml(phase_number, phase_result)
             
             return phase_result
-            
+        
         except subprocess.TimeoutExpired:
             phase_end_time = time.time()
             phase_duration = phase_end_time - phase_start_time
@@ -250,11 +654,11 @@ class EnhancedTestExecutor:
                 'phase': phase_number,
                 'name': phase_name,
                 'success': False,
-                'duration': 1800,
+                'duration': PHASE_TIMEOUT_SECONDS,
                 'error': 'Timeout after 30 minutes',
                 'tests': []
             }
-            
+        
         except Exception as e:
             phase_end_time = time.time()
             phase_duration = phase_end_time - phase_start_time
@@ -302,7 +706,7 @@ class EnhancedTestExecutor:
             
             with open(junit_file, 'w', encoding='utf-8') as f:
                 f.write('\n'.join(xml_content))
-                
+        
         except Exception as e:
             self.logger.get_logger().warning(f"Failed to generate JUnit XML: {e}")
     
@@ -324,12 +728,562 @@ class EnhancedTestExecutor:
             'timestamp': datetime.utcnow().isoformat()
         })
     
+    def classify_failure(self, test_name: str, phase: Optional[int] = None) -> str:
+        """'flaky' if the tracked status history of a test (in phase) has both passes và failures, else 'deterministic'"""
+        statuses = {
+            entry['status'] for entry in self.results.get(test_name, [])
+            if phase is None or entry['phase'] == phase
+        }
+        return 'flaky' if {'PASSED', 'FAILED'} <= statuses else 'deterministic'
+    
+    def run_isolated_test(self, test_name: str, attempt: int, index: int) -> Dict[str, Any]:
+        """Run one test file alone (without coverage); returns its status, duration và error"""
+        output_name = f'retry_{index}_{attempt}'
+        output_file = self.project_root / 'reports' / 'test_results' / f'{output_name}_results.json'
+        log_file = self.output_dir / f'{output_name}.log'
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        if output_file.exists():
+            output_file.unlink()
+        # package.json's test script enables coverage; retries run side by side,
+        # so each is one in-band Jest process that writes no coverage
+        cmd = [
+            'npm', 'test', '--', '--runTestsByPath', test_name,
+            '--coverage=false', '--runInBand',
+            '--json', '--outputFile', str(output_file)
+        ]
+        
+        started = time.time()
+        try:
+            result = self.run_jest_process(cmd, log_file)
+        except subprocess.TimeoutExpired:
+            return {'status': 'FAILED', 'duration': PHASE_TIMEOUT_SECONDS, 'error': 'Timeout after 30 minutes'}
+        duration = time.time() - started
+        
+        jest_results = None
+        try:
+            with open(output_file, 'r') as f:
+                jest_results = json.load(f)
+            output_file.unlink()
+        except (OSError, ValueError):
+            pass
+        
+        test_results = (jest_results or {}).get('testResults', [])
+        if not test_results:
+            return {
+                'status': 'PASSED' if result['returncode'] == 0 else 'FAILED',
+                'duration': duration,
+                'error': None if result['returncode'] == 0 else (result['stderr'] or 'Test run failed')[-2000:]
+            }
+        test_result = test_results[0]
+        if test_result.get('status') == 'passed':
+            status, error = 'PASSED', None
+        else:
+            status, error = 'FAILED', '\n'.join(test_result.get('failureMessages', [])) or 'Test failed'
+        return {
+            'status': status,
+            'duration': jest_file_duration(test_result) or duration,
+            'error': error
+        }
+    
+    def retry_failed_tests(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Re-run each failed test file alone, in parallel, up to `retries` times
+        
+        A file stops being retried at its first pass. Every attempt is kept
+        in the track_test_status history, which classify_failure reads: a
+        failure that also passed becomes status FLAKY, otherwise it stays
+        FAILED (deterministic). Each test gets its 'retry_statuses'. A phase
+        whose failed tests all turned out flaky (và that was not aborted or
+        errored) counts as successful, with 'flaky_tests' set.
+        """
+        if self.retries <= 0:
+            return results
+        # Tests already retried (before fail-fast acted on their phase) are not retried again
+        failed = [
+            (result, test)
+            for result in results
+            for test in result.get('tests', [])
+            if test.get('status') == 'FAILED' and test.get('name')
+            and not test.get('cached') and 'retry_statuses' not in test
+        ]
+        if failed:
+            self._retry(failed)
+        
+        for result in results:
+            flaky = sum(1 for test in result.get('tests', []) if test.get('status') == 'FLAKY')
+            if not flaky:
+                continue
+            still_failing = any(test.get('status') == 'FAILED' for test in result.get('tests', []))
+            if not result.get('success') and not still_failing and not result.get('aborted') and not result.get('error'):
+                result['success'] = True
+                result['passed_on_retry'] = True
+            if result.get('flaky_tests') == flaky:
+                continue  # already reported
+            result['flaky_tests'] = flaky
+            self.logger.get_logger().warning(
+                f"Phase {result.get('phase')}: {flaky} flaky test files passed on retry",
+                extra={'extra_fields': {'phase': result.get('phase'), 'event': 'flaky_tests', 'flaky_tests': flaky}}
+            )
+        
+        return results
+    
+    def _retry(self, failed: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        """Retry (phase result, failed test) pairs và set each test's retry_statuses và status"""
+        workers = min(self.retry_workers, len(failed))
+        self.logger.get_logger().info(
+            f"Retrying {len(failed)} failed test files in isolation, up to {self.retries} times each",
+            extra={'extra_fields': {'event': 'test_retry', 'files': len(failed), 'retries': self.retries, 'workers': workers}}
+        )
+        
+        def retry(index: int, test_name: str) -> List[Dict[str, Any]]:
+            attempts = []
+            for attempt in range(1, self.retries + 1):
+                attempts.append(self.run_isolated_test(test_name, attempt, index))
+                if attempts[-1]['status'] == 'PASSED':
+                    break
+            return attempts
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='retry') as pool:
+            # Copy context so worker threads keep the correlation ID
+            futures = [
+                pool.submit(contextvars.copy_context().run, retry, next(self._retry_ids), test['name'])
+                for _, test in failed
+            ]
+            all_attempts = [future.result() for future in futures]
+        
+        for (result, test), attempts in zip(failed, all_attempts):
+            phase = result.get('phase')
+            self.track_test_status(test['name'], test['status'], test.get('duration', 0), phase)
+            for number, attempt in enumerate(attempts, 1):
+                self.track_test_status(test['name'], attempt['status'], attempt['duration'], phase)
+                self.logger.log_test_result(
+                    test_name=test['name'],
+                    status=attempt['status'],
+                    duration=attempt['duration'],
+                    phase=phase,
+                    error=attempt['error'],
+                    metrics={'retry': number}
+                )
+            test['retry_statuses'] = [attempt['status'] for attempt in attempts]
+            if self.classify_failure(test['name'], phase) == 'flaky':
+                test['status'] = 'FLAKY'
+    
+    def _log_fail_fast(self, phase_num: int):
+        """Log fail-fast stop"""
+        self.logger.get_logger().error(
+            f"Stopping execution due to Phase {phase_num} failure (fail-fast mode)",
+            extra={'extra_fields': {'phase': phase_num, 'event': 'fail_fast'}}
+        )
+    
+    def _execute_planned_phase(
+        self,
+        phase_info: Dict[str, Any],
+        fail_fast: bool,
+        abort_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """Execute one phase (or one shard of a phase) from the run list
+        
+        With fail_fast và retries, the phase is not aborted at its first
+        failed file; its failures are retried right away instead, so
+        fail-fast only acts on a phase that still fails without its flaky tests.
+        A phase stopped through abort_event is not retried.
+        """
+        retry_first = fail_fast and self.retries > 0
+        result = self.execute_phase_with_logging(
+            phase_info['number'],
+            phase_info['name'],
+            phase_info['path'],
+            phase_info.get('files'),
+            abort_on_failure=fail_fast and not retry_first,
+            shard=phase_info.get('shard'),
+            abort_event=abort_event
+        )
+        if retry_first and not result['success'] and not (abort_event is not None and abort_event.is_set()):
+            self.retry_failed_tests([result])
+        return result
+    
+    def _run_phases_sequentially(
+        self,
+        phases: List[Dict[str, Any]],
+        fail_fast: bool
+    ) -> List[Dict[str, Any]]:
+        """Run phases one after another"""
+        all_results = []
+        
+        for phase_info in phases:
+            result = self._execute_planned_phase(phase_info, fail_fast)
+            all_results.append(result)
+            
+            if not result['success'] and fail_fast:
+                self._log_fail_fast(phase_info['number'])
+                break
+        
+        return all_results
+    
+    def _run_phases_concurrently(
+        self,
+        phases: List[Dict[str, Any]],
+        fail_fast: bool,
+        workers: int
+    ) -> List[Dict[str, Any]]:
+        """Run phases trên worker pool
+        
+        Results are returned in phase order. With fail_fast, the first phase
+        that fails stops the others: phases that have not started yet are
+        skipped và running ones are aborted (their Jest process tree is
+        terminated, the result has aborted: true).
+        """
+        workers = min(workers, len(phases))
+        self._concurrent_phases = workers
+        results_by_index: Dict[int, Dict[str, Any]] = {}
+        
+        self.logger.get_logger().info(
+            f"Running {len(phases)} phases with {workers} workers",
+            extra={'extra_fields': {'event': 'concurrent_execution', 'workers': workers}}
+        )
+        
+        stop_event = threading.Event()
+        running: Set[threading.Event] = set()  # abort events of the running phases
+        running_lock = threading.Lock()
+        
+        def run_phase(phase_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if not fail_fast:
+                return self._execute_planned_phase(phase_info, fail_fast)
+            
+            abort_event = threading.Event()
+            with running_lock:
+                # Phases queued behind a fail-fast failure are skipped
+                if stop_event.is_set():
+                    return None
+                running.add(abort_event)
+            try:
+                result = self._execute_planned_phase(phase_info, fail_fast, abort_event)
+            finally:
+                with running_lock:
+                    running.discard(abort_event)
+            
+            if not result['success']:
+                with running_lock:
+                    first = not stop_event.is_set()
+                    stop_event.set()
+                    # Abort the phases still running
+                    for other in running:
+                        other.set()
+                if first:
+                    self._log_fail_fast(phase_info['number'])
+            return result
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='phase') as pool:
+                futures = {}
+                for index, phase_info in enumerate(phases):
+                    # Copy context so worker threads keep the correlation ID
+                    ctx = contextvars.copy_context()
+                    futures[pool.submit(ctx.run, run_phase, phase_info)] = index
+                
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is not None:
+                        results_by_index[futures[future]] = result
+        finally:
+            self._concurrent_phases = 1
+        
+        return [results_by_index[index] for index in sorted(results_by_index)]
+    
+    def shard_phases(self, phases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Split each planned phase's files into duration-balanced shards
+        
+        With shard_index set (CI matrix job), each phase keeps only that
+        shard. Otherwise every non-empty shard becomes its own run entry, to
+        be spread over the worker pool and merged back by merge_shard_results.
+        """
+        sharded = []
+        for phase in phases:
+            expected = self.duration_store.expected_durations(phase['files'])
+            shards = shard_files(phase['files'], self.shards, expected)
+            
+            self.logger.get_logger().info(
+                f"Phase {phase['number']} sharded into {self.shards} shards",
+                extra={
+                    'extra_fields': {
+                        'phase': phase['number'],
+                        'event': 'phase_sharding',
+                        'expected_durations': [
+                            round(sum(expected[f] for f in shard), 3) for shard in shards
+                        ]
+                    }
+                }
+            )
+            
+            if self.shard_index is not None:
+                if shards[self.shard_index]:
+                    sharded.append({**phase, 'files': shards[self.shard_index]})
+                continue
+            
+            for index, shard in enumerate(shards):
+                if shard:
+                    sharded.append({
+                        **phase,
+                        'name': f"{phase['name']} [shard {index + 1}/{self.shards}]",
+                        'files': shard,
+                        'shard': index
+                    })
+        
+        return sharded
+    
+    def merge_shard_results(
+        self,
+        phases: List[Dict[str, Any]],
+        results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Merge results of a phase's shards into one phase result"""
+        names = {p['number']: p['name'] for p in phases}
+        merged: Dict[int, Dict[str, Any]] = {}
+        
+        for result in results:
+            if 'shard' not in result:
+                merged[result['phase']] = result
+                continue
+            
+            phase_num = result['phase']
+            shard_summary = {
+                'shard': result['shard'],
+                'success': result.get('success', False),
+                'duration': result.get('duration', 0),
+                'test_count': result.get('test_count', 0),
+                'performance_metrics': result.get('performance_metrics')
+            }
+            for key in ('aborted', 'output_log', 'output_truncated'):
+                if key in result:
+                    shard_summary[key] = result[key]
+            if phase_num not in merged:
+                merged[phase_num] = {
+                    'phase': phase_num,
+                    'name': names.get(phase_num, result.get('name')),
+                    'success': True,
+                    'duration': 0,
+                    'stdout': '',
+                    'stderr': '',
+                    'returncode': 0,
+                    'test_count': 0,
+                    'tests': [],
+                    'shards': []
+                }
+            phase_result = merged[phase_num]
+            phase_result['success'] = phase_result['success'] and shard_summary['success']
+            # Shards run side by side, so the phase takes as long as its slowest shard
+            if shard_summary['duration'] >= phase_result['duration']:
+                phase_result['duration'] = shard_summary['duration']
+                phase_result['performance_metrics'] = shard_summary['performance_metrics']
+            phase_result['stdout'] += result.get('stdout', '')
+            phase_result['stderr'] += result.get('stderr', '')
+            if not phase_result['returncode']:
+                phase_result['returncode'] = result.get('returncode', 0)
+            if result.get('error'):
+                phase_result['error'] = result['error']
+            if result.get('aborted'):
+                phase_result['aborted'] = True
+            if 'output_log' in result:
+                # Each shard streamed its own log file
+                phase_result.setdefault('output_logs', []).append(result['output_log'])
+                phase_result['output_truncated'] = phase_result.get('output_truncated', False) or result['output_truncated']
+            phase_result['tests'].extend(result.get('tests', []))
+            phase_result['test_count'] = len(phase_result['tests'])
+            phase_result['shards'].append(shard_summary)
+        
+        ordered = []
+        for phase_num in dict.fromkeys(r['phase'] for r in results):
+            phase_result = merged[phase_num]
+            if 'shards' in phase_result:
+                self.generate_junit_xml(phase_num, phase_result)
+            ordered.append(phase_result)
+        return ordered
+    
+    def plan_phases(
+        self,
+        phases: List[Dict[str, str]],
+        selected_files: Optional[Set[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Resolve phase patterns thành per-phase file manifests
+        
+        selected_files restricts every phase to those test files. Returns
+        None (run by pattern) when no test files can be resolved.
+        """
+        planned = PhasePlanner(self.project_root).plan(phases)
+        if not any(p['claims'] for p in planned):
+            return None
+        
+        if selected_files is not None:
+            for phase in planned:
+                phase['claims'] = [f for f in phase['claims'] if f in selected_files]
+                phase['files'] = [f for f in phase['files'] if f in selected_files]
+                phase['owners'] = {f: phase['owners'][f] for f in phase['claims']}
+        
+        for phase in planned:
+            self.logger.get_logger().info(
+                f"Phase {phase['number']} plan: runs {len(phase['files'])} of {len(phase['claims'])} claimed files",
+                extra={
+                    'extra_fields': {
+                        'phase': phase['number'],
+                        'event': 'phase_plan',
+                        'files': phase['files'],
+                        'claimed_files': len(phase['claims'])
+                    }
+                }
+            )
+        
+        return planned
+    
+    def _add_skipped_phases(
+        self,
+        planned_phases: List[Dict[str, Any]],
+        results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Add results for phases with no selected test files, in phase order"""
+        results_by_phase = {r['phase']: r for r in results}
+        ordered = []
+        for phase in planned_phases:
+            if phase['number'] in results_by_phase:
+                ordered.append(results_by_phase[phase['number']])
+            elif not phase['claims']:
+                ordered.append({
+                    'phase': phase['number'],
+                    'name': phase['name'],
+                    'success': True,
+                    'skipped': True,
+                    'duration': 0,
+                    'returncode': 0,
+                    'test_count': 0,
+                    'tests': []
+                })
+        return ordered
+    
+    def lookup_cached_results(
+        self,
+        planned_phases: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+        """Content hashes of planned test files and the cached PASSED results matching them"""
+        hasher = ContentHasher(self.project_root)
+        hashes = {
+            test_file: hasher.hash_test_file(test_file)
+            for phase in planned_phases
+            for test_file in phase['files']
+        }
+        cached = self.result_cache.lookup(hashes)
+        
+        self.logger.get_logger().info(
+            f"Result cache: {len(cached)} of {len(hashes)} test files unchanged since a passing run",
+            extra={
+                'extra_fields': {
+                    'event': 'result_cache',
+                    'cached_files': sorted(cached),
+                    'hashed_files': len(hashes)
+                }
+            }
+        )
+        return hashes, cached
+    
+    def store_cached_results(self, results: List[Dict[str, Any]], hashes: Dict[str, str]):
+        """Cache PASSED results of test files executed in this run"""
+        entries = []
+        for result in results:
+            for test in result.get('tests', []):
+                test_file = normalize_test_name(test.get('name', ''), self.project_root)
+                if test_file in hashes:
+                    entries.append((test_file, hashes[test_file], test))
+        self.result_cache.store(entries, run_id=self.correlation_id)
+    
+    def replay_cached_results(
+        self,
+        planned_phases: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        cached: Dict[str, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Add cached results to their owning phase and log them to TestLogger
+        
+        Phases whose files were all cached get a result without running Jest.
+        Phases that did not run (fail-fast) stay out, even if partly cached.
+        """
+        results_by_phase = {r['phase']: r for r in results}
+        root = self.project_root.resolve()
+        replayed = []
+        
+        for phase in planned_phases:
+            result = results_by_phase.get(phase['number'])
+            cached_files = [f for f in phase['files'] if f in cached]
+            if not cached_files:
+                if result is not None:
+                    replayed.append(result)
+                continue
+            if result is None and len(cached_files) < len(phase['files']):
+                continue
+            
+            cached_tests = []
+            for test_file in cached_files:
+                test = {**cached[test_file], 'name': str(root / test_file), 'cached': True}
+                self.logger.log_test_result(
+                    test_name=test['name'],
+                    status=test['status'],
+                    duration=test.get('duration', 0),
+                    phase=phase['number'],
+                    metrics={'cached': True, 'cached_run_id': test.get('cached_run_id')}
+                )
+                cached_tests.append(test)
+            
+            if result is None:
+                result = {
+                    'phase': phase['number'],
+                    'name': phase['name'],
+                    'success': True,
+                    'duration': 0,
+                    'returncode': 0,
+                    'tests': []
+                }
+            result = dict(result)
+            result['tests'] = result.get('tests', []) + cached_tests
+            result['test_count'] = len(result['tests'])
+            result['cached_tests'] = len(cached_tests)
+            replayed.append(result)
+        
+        return replayed
+    
+    def select_impacted_tests(self, diff_range: str) -> Optional[Set[str]]:
+        """Test files affected by a git diff range (None means all tests)"""
+        selected = ImpactAnalyzer(self.project_root).select_for_diff(diff_range)
+        
+        self.logger.get_logger().info(
+            f"Test impact analysis for {diff_range}: "
+            + ('all tests affected' if selected is None else f'{len(selected)} test files selected'),
+            extra={
+                'extra_fields': {
+                    'event': 'impact_analysis',
+                    'diff_range': diff_range,
+                    'selected_files': sorted(selected) if selected is not None else None
+                }
+            }
+        )
+        return selected
+    
     def run_all_phases(
         self,
         phases: List[Dict[str, str]],
-        fail_fast: bool = False
+        fail_fast: bool = False,
+        workers: Optional[int] = None,
+        dedupe: bool = True,
+        selected_files: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
-        """Run all test phases"""
+        """Run all test phases
+        
+        With workers > 1, independent phases run in parallel on a worker pool.
+        With dedupe, overlapping phase patterns are resolved up front so every
+        test file runs once; results are attributed to every claiming phase.
+        selected_files (e.g. from test impact analysis) limits the run to
+        those test files; phases left with nothing to run are skipped.
+        With shards > 1, each phase's files are split into duration-balanced
+        shards (see shard_phases) whose results are merged back per phase.
+        Planned test files whose content hash matches a cached PASSED result
+        are not run; the cached result is replayed instead. With retries > 0,
+        failed test files are re-run in isolation (see retry_failed_tests).
+        """
         self.start_time = time.time()
         start_datetime = datetime.fromtimestamp(self.start_time)
         
@@ -348,22 +1302,46 @@ class EnhancedTestExecutor:
         reports_dir = self.project_root / 'reports' / 'test_results'
         reports_dir.mkdir(parents=True, exist_ok=True)
         
-        all_results = []
+        workers = self.workers if workers is None else max(1, workers)
         
-        for phase_info in phases:
-            phase_num = phase_info['number']
-            phase_name = phase_info['name']
-            test_path = phase_info['path']
-            
-            result = self.execute_phase_with_logging(phase_num, phase_name, test_path)
-            all_results.append(result)
-            
-            if not result['success'] and fail_fast:
-                self.logger.get_logger().error(
-                    f"Stopping execution due to Phase {phase_num} failure (fail-fast mode)",
-                    extra={'extra_fields': {'phase': phase_num, 'event': 'fail_fast'}}
-                )
-                break
+        # Sharding needs concrete file lists, so it implies planning
+        if dedupe or selected_files is not None or self.shards > 1:
+            planned_phases = self.plan_phases(phases, selected_files)
+        else:
+            planned_phases = None
+        hashes: Dict[str, str] = {}
+        cached: Dict[str, Dict[str, Any]] = {}
+        if planned_phases is not None:
+            if self.result_cache is not None:
+                hashes, cached = self.lookup_cached_results(planned_phases)
+            run_phases = [
+                {**p, 'files': [f for f in p['files'] if f not in cached]}
+                for p in planned_phases
+            ]
+            run_phases = [p for p in run_phases if p['files']]
+            if self.shards > 1:
+                run_phases = self.shard_phases(run_phases)
+        else:
+            run_phases = phases
+        
+        if workers > 1 and len(run_phases) > 1:
+            all_results = self._run_phases_concurrently(run_phases, fail_fast, workers)
+        else:
+            all_results = self._run_phases_sequentially(run_phases, fail_fast)
+        
+        if planned_phases is not None and self.shards > 1:
+            all_results = self.merge_shard_results(planned_phases, all_results)
+        
+        all_results = self.retry_failed_tests(all_results)
+        
+        executed_tests = sum(r.get('test_count', 0) for r in all_results)
+        if planned_phases is not None:
+            if self.result_cache is not None:
+                self.store_cached_results(all_results, hashes)
+                all_results = self.replay_cached_results(planned_phases, all_results, cached)
+            all_results = attribute_shared_results(planned_phases, all_results, self.project_root)
+            if selected_files is not None:
+                all_results = self._add_skipped_phases(planned_phases, all_results)
         
         self.end_time = time.time()
         total_duration = self.end_time - self.start_time
@@ -373,6 +1351,7 @@ class EnhancedTestExecutor:
         passed = sum(1 for r in all_results if r.get('success', False))
         failed = len(all_results) - passed
         total_tests = sum(r.get('test_count', 0) for r in all_results)
+        flaky_tests = sum(r.get('flaky_tests', 0) for r in all_results)
         
         # Log summary
         self.logger.get_logger().info(
@@ -403,17 +1382,25 @@ class EnhancedTestExecutor:
                     'total': len(all_results),
                     'passed': passed,
                     'failed': failed,
-                    'total_tests': total_tests
+                    'total_tests': total_tests,
+                    'executed_tests': executed_tests,
+                    'cached_tests': len(cached),
+                    'flaky_tests': flaky_tests
                 }
             }, f, indent=2)
         
         return {
+            'start_time': start_datetime.isoformat(),
+            'correlation_id': self.correlation_id,
             'phases': all_results,
             'summary': {
                 'total': len(all_results),
                 'passed': passed,
                 'failed': failed,
                 'total_tests': total_tests,
+                'executed_tests': executed_tests,
+                'cached_tests': len(cached),
+                'flaky_tests': flaky_tests,
                 'duration': total_duration
             }
         }
@@ -426,6 +1413,23 @@ def main():
     parser.add_argument('--all', action='store_true', help='Run all phases')
     parser.add_argument('--coverage', action='store_true', help='Generate coverage report')
     parser.add_argument('--fail-fast', action='store_true', help='Stop on first failure')
+    parser.add_argument('--workers', type=int, default=1, help='Number of phases to run in parallel')
+    parser.add_argument('--stream-output', action='store_true', help='Stream Jest output to phase log files, keep only a tail in results')
+    parser.add_argument('--output-tail-lines', type=int, default=200, help='Lines of output kept per stream in streaming mode')
+    parser.add_argument('--live-progress', action='store_true', help='Stream per-test-file results from Jest while a phase runs')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between Jest process tree samples (0 disables)')
+    parser.add_argument('--changed-since', type=str, help='Only run test files affected by this git diff range (e.g. origin/main...HEAD)')
+    parser.add_argument('--shards', type=int, default=1, help='Split each phase into N duration-balanced shards')
+    parser.add_argument('--shard-index', type=int, help='Run only this shard (0-based), e.g. one CI matrix job')
+    parser.add_argument('--no-cache', action='store_true', help='Run every test file, ignoring cached passing results')
+    parser.add_argument('--no-dedupe', action='store_true', help='Run each phase by pattern, even if phases overlap')
+    parser.add_argument('--retries', type=int, default=0, help='Re-run failed test files alone up to N times to detect flaky tests')
+    parser.add_argument('--retry-workers', type=int, help='Failed test files retried in parallel (default: CPU count)')
+    parser.add_argument('--async-logging', action='store_true', help='Write logs from a background thread instead of the test loop')
+    parser.add_argument('--fast-log-format', action='store_true', help='Serialize structured logs once per record, with orjson when installed')
+    parser.add_argument('--compact-events', action='store_true', help='Write test_result events to a compact binary .events log instead of JSON')
+    parser.add_argument('--log-compression', choices=['gzip', 'zstd'], help='Compress rotated log files in the background')
+    parser.add_argument('--log-rollover-interval', type=int, help='Also rotate log files every N seconds (e.g. 3600)')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
     parser.add_argument('--log-dir', type=str, default='./logs/test_execution', help='Log directory')
     
@@ -447,10 +1451,28 @@ def main():
     
     logger = setup_test_logging(
         log_dir=str(project_root / args.log_dir),
-        log_level='DEBUG' if args.verbose else 'INFO'
+        log_level='DEBUG' if args.verbose else 'INFO',
+        async_logging=args.async_logging,
+        fast_format=args.fast_log_format,
+        compact_events=args.compact_events,
+        compression=args.log_compression,
+        rollover_interval=args.log_rollover_interval
     )
     
-    executor = EnhancedTestExecutor(project_root, logger)
+    executor = EnhancedTestExecutor(
+        project_root,
+        logger,
+        workers=args.workers,
+        stream_output=args.stream_output,
+        output_tail_lines=args.output_tail_lines,
+        live_progress=args.live_progress,
+        sample_interval=args.sample_interval,
+        shards=args.shards,
+        shard_index=args.shard_index,
+        use_cache=not args.no_cache,
+        retries=args.retries,
+        retry_workers=args.retry_workers
+    )
     
     if args.phase:
         # Run specific phase
@@ -461,13 +1483,28 @@ def main():
                 phase_info['name'],
                 phase_info['path']
             )
+            result = executor.retry_failed_tests([result])[0]
             sys.exit(0 if result['success'] else 1)
         else:
             print(f"Error: Phase {args.phase} not found")
             sys.exit(1)
     elif args.all:
         # Run all phases
-        results = executor.run_all_phases(phases, fail_fast=args.fail_fast)
+        selected_files = None
+        if args.changed_since:
+            try:
+                selected_files = executor.select_impacted_tests(args.changed_since)
+            except subprocess.CalledProcessError as e:
+                message = (e.stderr or '').strip() or f'git exited with status {e.returncode}'
+                print(f"Error: invalid --changed-since range {args.changed_since!r}: {message}", file=sys.stderr)
+                sys.exit(1)
+        
+        results = executor.run_all_phases(
+            phases,
+            fail_fast=args.fail_fast,
+            dedupe=not args.no_dedupe,
+            selected_files=selected_files
+        )
         
         # Exit with error code if any phase failed
         sys.exit(0 if results['summary']['failed'] == 0 else 1)
@@ -16,6 +16,7 @@ scripts_dir = Path(__file__).parent
 sys.path.insert(0, str(scripts_dir))
 
 from bug_analyzer import analyze_test_results
+from bug_history import describe_history
 from log_aggregator import aggregate_logs
 
 
@@ -74,6 +75,8 @@ class ComprehensiveReportGenerator:
             'pass_rate': f'{pass_rate:.1f}%',
             'total_tests': total_tests,
             'total_bugs': total_bugs,
+            'total_occurrences': bug_report.get('total_occurrences', total_bugs),
+            'history_summary': bug_report.get('history_summary'),
             'critical_bugs': critical_bugs,
             'high_bugs': high_bugs,
             'medium_bugs': severity_dist.get('medium', 0),
@@ -140,26 +143,40 @@ class ComprehensiveReportGenerator:
             
             phase_durations.append(duration)
             
+            # Prefer the sampled Jest process tree over the driver process snapshot
+            process_tree = metrics.get('process_tree')
+            if process_tree:
+                memory_mb = process_tree['memory_mb']['peak']
+                cpu_percent = process_tree['cpu_percent']['avg']
+            else:
+                memory_mb = metrics.get('final', {}).get('memory_mb', 0)
+                cpu_percent = metrics.get('final', {}).get('cpu_percent', 0)
+            
             phase_perf = {
                 'phase': phase_num,
                 'name': phase.get('name', 'Unknown'),
                 'duration': duration,
                 'test_count': phase.get('test_count', 0),
-                'memory_mb': metrics.get('final', {}).get('memory_mb', 0),
-                'cpu_percent': metrics.get('final', {}).get('cpu_percent', 0)
+                'memory_mb': memory_mb,
+                'cpu_percent': cpu_percent
             }
+            if process_tree:
+                phase_perf['process_tree'] = {
+                    metric: process_tree[metric]
+                    for metric in ('cpu_percent', 'memory_mb', 'threads', 'open_files')
+                }
             
             performance_data['phase_performance'].append(phase_perf)
             
             # Track memory and CPU
-            if metrics.get('final'):
+            if process_tree or metrics.get('final'):
                 performance_data['memory_usage'].append({
                     'phase': phase_num,
-                    'memory_mb': metrics['final'].get('memory_mb', 0)
+                    'memory_mb': memory_mb
                 })
                 performance_data['cpu_usage'].append({
                     'phase': phase_num,
-                    'cpu_percent': metrics['final'].get('cpu_percent', 0)
+                    'cpu_percent': cpu_percent
                 })
         
         if phase_durations:
@@ -495,6 +512,8 @@ class ComprehensiveReportGenerator:
                 <th>Test Name</th>
                 <th>Phase</th>
                 <th>Error Type</th>
+                <th>Occurrences</th>
+                <th>History</th>
                 <th>Root Cause</th>
             </tr>
 """
@@ -506,6 +525,8 @@ class ComprehensiveReportGenerator:
                 <td>{bug.get('test_name', 'Unknown')}</td>
                 <td>{bug.get('phase', 'N/A')}</td>
                 <td>{bug.get('error_type', 'Unknown')}</td>
+                <td>{bug.get('occurrences', 1)}</td>
+                <td>{describe_history(bug.get('history'))}</td>
                 <td>{root_cause.get('cause', 'Unknown')}</td>
             </tr>
 """
@@ -586,11 +607,18 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 - **Failed Phases:** {executive_summary.get('failed_phases', 0)}
 - **Pass Rate:** {executive_summary.get('pass_rate', '0%')}
 - **Total Tests:** {executive_summary.get('total_tests', 0)}
-- **Total Bugs:** {executive_summary.get('total_bugs', 0)}
+- **Total Bugs:** {executive_summary.get('total_bugs', 0)} ({executive_summary.get('total_occurrences', 0)} failures)
 - **Critical Bugs:** {executive_summary.get('critical_bugs', 0)}
 - **High Bugs:** {executive_summary.get('high_bugs', 0)}
 - **Execution Time:** {executive_summary.get('execution_time', 0):.2f}s
-
+"""
+        
+        history = executive_summary.get('history_summary')
+        if history:
+            md += (f"- **Bug History:** {history['new']} new, {history['recurring']} known, recurring, "
+                   f"{history['regressed']} regressed\n")
+        
+        md += f"""
 ## Bug Analysis
 
 ### Severity Distribution
@@ -611,6 +639,8 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 - **Phase:** {bug.get('phase', 'N/A')}
 - **Error Type:** {bug.get('error_type', 'Unknown')}
+- **Occurrences:** {bug.get('occurrences', 1)} ({len(bug.get('affected_tests', []))} tests)
+- **History:** {describe_history(bug.get('history'))}
 - **Root Cause:** {root_cause.get('cause', 'Unknown')}
 - **Recommendation:** {root_cause.get('recommendation', 'N/A')}
 
@@ -671,7 +701,7 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 bug_report = json.load(f)
         else:
             # Generate bug report from test results
-            bug_report = analyze_test_results(test_results_file)
+            bug_report = analyze_test_results(test_results_file, str(self.project_root))
         
         # Load log summary if available
         log_summary = None
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Test Impact Analyzer
+Build dependency graph từ TypeScript imports và chọn test files bị ảnh hưởng bởi changes
+"""
+
+import json
+import re
+import subprocess
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Set, Iterable
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+IMPORT_PATTERN = re.compile(
+    r"""(?:import|export)\s[^'";]*?\sfrom\s*['"]([^'"]+)['"]"""
+    r"""|import\s*['"]([^'"]+)['"]"""
+    r"""|(?:import|require|jest\.mock|jest\.requireActual)\s*\(\s*['"]([^'"]+)['"]"""
+)
+
+# Mirrors moduleNameMapper in jest.config.js / paths in tsconfig.json
+DEFAULT_ALIASES = {
+    '@/': 'src/',
+    '@config/': 'src/config/',
+    '@controllers/': 'src/controllers/',
+    '@middleware/': 'src/middleware/',
+    '@models/': 'src/models/',
+    '@routes/': 'src/routes/',
+    '@services/': 'src/services/',
+    '@utils/': 'src/utils/',
+    '@types/': 'src/types/',
+}
+
+RESOLVE_SUFFIXES = ['', '.ts', '.tsx', '.js', '.json', '/index.ts', '/index.js']
+
+# Changes to these files can affect every test
+GLOBAL_FILES = {
+    'package.json',
+    'package-lock.json',
+    'jest.config.js',
+    'tsconfig.json',
+    'tests/setup.ts',
+}
+
+
+class DependencyGraph:
+    """Import graph of TypeScript sources and tests, cached on disk by mtime"""
+    
+    def __init__(
+        self,
+        project_root: Path,
+        source_roots: Optional[List[str]] = None,
+        cache_file: Optional[Path] = None,
+        aliases: Optional[Dict[str, str]] = None
+    ):
+        self.project_root = Path(project_root)
+        self.source_roots = source_roots or ['src', 'tests', 'scripts']
+        self.cache_file = cache_file or self.project_root / 'reports' / 'test_impact' / 'dependency_graph.json'
+        self.aliases = aliases or self.load_aliases()
+        self.imports: Dict[str, List[str]] = {}
+        self.previous_imports: Dict[str, List[str]] = {}
+        self._reverse: Optional[Dict[str, Set[str]]] = None
+    
+    def load_aliases(self) -> Dict[str, str]:
+        """Read moduleNameMapper prefixes from jest.config.js"""
+        config_file = self.project_root / 'jest.config.js'
+        if not config_file.exists():
+            return dict(DEFAULT_ALIASES)
+        
+        mapper = re.compile(r"""['"]\^(@[\w-]*/)\(\.\*\)\$['"]\s*:\s*['"]<rootDir>/([^'"]*?)\$1['"]""")
+        aliases = {prefix: target for prefix, target in mapper.findall(config_file.read_text(encoding='utf-8'))}
+        return aliases or dict(DEFAULT_ALIASES)
+    
+    def source_files(self) -> Iterable[Path]:
+        """All TypeScript files under the source roots"""
+        for root in self.source_roots:
+            root_dir = self.project_root / root
+            if not root_dir.exists():
+                continue
+            for source_file in root_dir.rglob('*.ts'):
+                if 'node_modules' in source_file.parts or source_file.name.endswith('.d.ts'):
+                    continue
+                yield source_file
+    
+    def resolve_import(self, importer: str, specifier: str) -> Optional[str]:
+        """Resolve import specifier thành project-relative path (None for packages)"""
+        if specifier.startswith('.'):
+            base = (Path(importer).parent / specifier).as_posix()
+        else:
+            prefix = next((p for p in self.aliases if specifier.startswith(p)), None)
+            if prefix is None:
+                return None
+            base = self.aliases[prefix] + specifier[len(prefix):]
+        
+        # Normalize '..' segments without touching the filesystem
+        parts: List[str] = []
+        for part in base.split('/'):
+            if part == '..':
+                if parts:
+                    parts.pop()
+            elif part not in ('', '.'):
+                parts.append(part)
+        base = '/'.join(parts)
+        
+        for suffix in RESOLVE_SUFFIXES:
+            candidate = base + suffix
+            if (self.project_root / candidate).is_file():
+                return candidate
+        return None
+    
+    def parse_imports(self, rel_path: str) -> List[str]:
+        """Parse và resolve imports của một file"""
+        try:
+            content = (self.project_root / rel_path).read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            return []
+        
+        resolved = set()
+        for match in IMPORT_PATTERN.finditer(content):
+            specifier = next(group for group in match.groups() if group)
+            target = self.resolve_import(rel_path, specifier)
+            if target and target != rel_path:
+                resolved.add(target)
+        return sorted(resolved)
+    
+    def build(self) -> 'DependencyGraph':
+        """Build graph, re-parsing only files whose mtime/size changed since the cache
+        
+        The cached imports are kept as previous_imports, so files deleted since
+        the last build can still be traced to their former importers.
+        """
+        cached: Dict[str, Any] = {}
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    cached = json.load(f).get('files', {})
+            except (OSError, json.JSONDecodeError):
+                cached = {}
+        self.previous_imports = {path: entry.get('imports', []) for path, entry in cached.items()}
+        
+        files: Dict[str, Any] = {}
+        for source_file in self.source_files():
+            rel_path = source_file.relative_to(self.project_root).as_posix()
+            stat = source_file.stat()
+            entry = cached.get(rel_path)
+            if not entry or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                entry = {
+                    'mtime': stat.st_mtime,
+                    'size': stat.st_size,
+                    'imports': self.parse_imports(rel_path)
+                }
+            files[rel_path] = entry
+        
+        self.imports = {path: entry['imports'] for path, entry in files.items()}
+        self._reverse = None
+        
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump({'files': files}, f)
+        
+        return self
+    
+    def reverse(self) -> Dict[str, Set[str]]:
+        """Map file -> files that import it"""
+        if self._reverse is None:
+            reverse: Dict[str, Set[str]] = defaultdict(set)
+            for importer, targets in self.imports.items():
+                for target in targets:
+                    reverse[target].add(importer)
+            self._reverse = reverse
+        return self._reverse
+    
+    def transitive_dependencies(self, rel_path: str) -> Set[str]:
+        """All files rel_path imports, directly or indirectly"""
+        seen: Set[str] = set()
+        queue = deque([rel_path])
+        while queue:
+            for target in self.imports.get(queue.popleft(), []):
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+    
+    def dependents(self, changed: Iterable[str]) -> Set[str]:
+        """Changed files plus every file that transitively imports them"""
+        reverse = self.reverse()
+        seen = set(changed)
+        queue = deque(seen)
+        while queue:
+            for importer in reverse.get(queue.popleft(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    queue.append(importer)
+        return seen
+    
+    def former_importers(self, deleted: str) -> Optional[Set[str]]:
+        """Files that imported deleted in the cached graph (None if it never saw deleted)"""
+        importers = {
+            importer for importer, targets in self.previous_imports.items()
+            if deleted in targets and importer in self.imports
+        }
+        if not importers and deleted not in self.previous_imports:
+            return None
+        return importers
+
+
+class ImpactAnalyzer:
+    """Select test files affected by changed source files"""
+    
+    def __init__(self, project_root: Path, graph: Optional[DependencyGraph] = None):
+        self.project_root = Path(project_root)
+        self.graph = graph or DependencyGraph(self.project_root)
+    
+    def diff_status(self, diff_range: str) -> Dict[str, str]:
+        """Map changed file -> git status letter (A, M, D, ...) từ git diff
+        
+        diff_range is e.g. 'origin/main...HEAD', or a ref to compare with the
+        working tree. Renames are reported as a deletion plus an addition.
+        Raises subprocess.CalledProcessError for an invalid range.
+        """
+        result = subprocess.run(
+            ['git', 'diff', '--name-status', '--no-renames', diff_range],
+            cwd=self.project_root,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        status: Dict[str, str] = {}
+        for line in result.stdout.splitlines():
+            letter, _, path = line.partition('\t')
+            if path.strip():
+                status[path.strip()] = letter[:1]
+        return status
+    
+    def changed_files(self, diff_range: str) -> List[str]:
+        """Changed files từ git diff, deleted ones included"""
+        return list(self.diff_status(diff_range))
+    
+    def is_test_file(self, rel_path: str) -> bool:
+        """Whether rel_path is a Jest test file"""
+        return rel_path.startswith('tests/') and rel_path.endswith('.test.ts')
+    
+    def select_tests(self, changed: List[str], deleted: Iterable[str] = ()) -> Optional[Set[str]]:
+        """Test files affected by changed files
+        
+        Deleted files no longer appear in the graph, so they are traced through
+        the cached graph's importers instead. Returns None when a change affects
+        every test (package manifests, Jest/TypeScript config, the Jest setup
+        file or anything it imports, or a deleted source file the cached graph
+        never saw).
+        """
+        if not self.graph.imports:
+            self.graph.build()
+        
+        changed_set = set(changed)
+        deleted_set = set(deleted)
+        global_files = set(GLOBAL_FILES)
+        for setup_file in list(global_files):
+            global_files |= self.graph.transitive_dependencies(setup_file)
+            global_files |= set(self.graph.previous_imports.get(setup_file, []))
+        if (changed_set | deleted_set) & global_files:
+            return None
+        
+        roots = changed_set - deleted_set
+        for path in deleted_set:
+            if self.is_test_file(path):
+                continue  # a deleted test simply no longer runs
+            importers = self.graph.former_importers(path)
+            if importers is None:
+                if path.endswith('.ts'):
+                    return None
+                continue
+            roots |= importers
+        
+        return {path for path in self.graph.dependents(roots) if self.is_test_file(path)}
+    
+    def select_for_diff(self, diff_range: str) -> Optional[Set[str]]:
+        """Test files affected by a git diff range"""
+        status = self.diff_status(diff_range)
+        deleted = [path for path, letter in status.items() if letter == 'D']
+        return self.select_tests(list(status), deleted)
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Select test files affected by a git diff')
+    parser.add_argument('--changed-since', type=str, required=True, help='Git diff range, e.g. origin/main...HEAD')
+    
+    args = parser.parse_args()
+    
+    project_root = Path(__file__).parent.parent
+    try:
+        selected = ImpactAnalyzer(project_root).select_for_diff(args.changed_since)
+    except subprocess.CalledProcessError as e:
+        print(f"Error running git diff: {e.stderr}", file=sys.stderr)
+        sys.exit(1)
+    
+    if selected is None:
+        print("All tests affected")
+    else:
+        print('\n'.join(sorted(selected)))
@@ -0,0 +1,64 @@
+/**
+ * Jest reporter that streams per-test-file progress events to the Python
+ * test executor (scripts/execute_tests_with_logging.py --live-progress).
+ * Events are JSON lines sent over a local TCP socket on JEST_PROGRESS_PORT.
+ * Without that variable the reporter does nothing.
+ */
+
+const net = require('net');
+
+class JestProgressReporter {
+  constructor() {
+    this.socket = null;
+
+    const port = Number(process.env.JEST_PROGRESS_PORT);
+    if (port) {
+      this.socket = net.createConnection({ host: '127.0.0.1', port });
+      // Progress is best effort: never fail the test run because the bridge is gone
+      this.socket.on('error', () => {
+        this.socket = null;
+      });
+    }
+  }
+
+  send(event) {
+    if (this.socket) {
+      this.socket.write(`${JSON.stringify({ ...event, timestamp: Date.now() })}\n`);
+    }
+  }
+
+  onTestFileStart(test) {
+    this.send({ event: 'test_file_start', path: test.path });
+  }
+
+  onTestFileResult(test, testResult) {
+    const failed = testResult.numFailingTests > 0 || Boolean(testResult.testExecError);
+    const { start, end } = testResult.perfStats || {};
+
+    this.send({
+      event: 'test_file_result',
+      path: test.path,
+      status: failed ? 'failed' : 'passed',
+      duration: start && end ? end - start : 0,
+      passed: testResult.numPassingTests,
+      failed: testResult.numFailingTests,
+      failureMessage: failed
+        ? testResult.failureMessage || (testResult.testExecError && testResult.testExecError.message)
+        : null,
+    });
+  }
+
+  onRunComplete() {
+    const socket = this.socket;
+    if (!socket) {
+      return undefined;
+    }
+
+    this.socket = null;
+    return new Promise((resolve) => {
+      socket.end(resolve);
+    });
+  }
+}
+
+module.exports = JestProgressReporter;
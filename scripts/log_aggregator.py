@@ -3,259 +3,534 @@
 Log Aggregator để aggregate và analyze logs từ multiple sources
 """
 
+import heapq
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from typing import BinaryIO, Dict, List, Optional, Any, Iterable, Iterator, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict, deque
 import sys
 
 # Add scripts directory to path
 scripts_dir = Path(__file__).parent
 sys.path.insert(0, str(scripts_dir))
 
+from event_log import iter_event_batches
+from log_archive import LogArchive
+from log_compression import COMPRESSION_SUFFIXES, compression_of, open_log_file
+from log_store import LogStore
 
-class LogAggregator:
-    """Aggregate logs từ multiple sources và analyze patterns"""
+try:
+    import orjson  # Optional fast JSON backend
+except ImportError:
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+PARALLEL_CHUNK_BYTES = 64 * 1024 * 1024  # byte range per worker task
+TIMESTAMP_LOOKBACK_BYTES = 64 * 1024
+READ_CHUNK_SIZE = 128 * 1024  # 128KB; bigger chunks keep more parsed entries alive and run slower
+
+DEFAULT_MAX_SAMPLES = 500  # errors/warnings kept in streaming mode
+
+# service.log, service.error.log, compact service.events và their rotations service.log.1 ... service.log.N
+# (compressed rotations: service.log.1.gz, service.log.1.zst)
+LOG_FILE_PATTERN = re.compile(r'\.(?:log|events)(?:\.\d+(?:\.gz|\.zst)?)?$')
+EVENT_FILE_PATTERN = re.compile(r'\.events(?:\.\d+(?:\.gz|\.zst)?)?$')
+ROTATION_SUFFIX = re.compile(r'\.(\d+)(?:\.gz|\.zst)?$')
+
+# Copies of one record in the combined và error logs are formatted within this window
+DEDUPE_WINDOW_SECONDS = 1.0
+# Only records at these levels reach more than one handler (the error log's level)
+DEDUPE_LEVELS = frozenset({'ERROR', 'CRITICAL'})
+DEDUPE_FIELDS = ['level', 'logger', 'message', 'correlation_id', 'module', 'function', 'line', 'exception']
+
+# Archive columns LogStatistics (and the family dedupe) read; skips the bulky extra column
+ARCHIVE_STAT_COLUMNS = [
+    'timestamp', 'level', 'logger', 'message', 'correlation_id',
+    'module', 'function', 'line', 'exception', 'extra_fields'
+]
+
+STAT_COUNTERS = [
+    'level_distribution',
+    'phase_distribution',
+    'event_distribution',
+    'error_types',
+    'error_modules',
+    'error_functions',
+    'warning_types',
+    'phase_errors',
+    'common_messages',
+    'correlation_ids',
+    'error_messages',
+    'hourly_errors',
+]
+
+
+def in_time_range(log: Dict[str, Any], start_time: Optional[datetime], end_time: Optional[datetime]) -> bool:
+    """Whether log falls in the time range (logs whose timestamp cannot be parsed are included)"""
+    try:
+        log_time = datetime.fromisoformat(log.get('timestamp', '').replace('Z', '+00:00'))
+        if start_time and log_time < start_time:
+            return False
+        if end_time and log_time > end_time:
+            return False
+    except Exception:
+        pass
+    return True
+
+
+def iter_line_batches(
+    f: BinaryIO,
+    chunk_size: int = READ_CHUNK_SIZE,
+    limit: Optional[int] = None
+) -> Iterator[List[str]]:
+    """Read a binary file in large chunks, yielding its complete lines one batch per chunk
     
-    def __init__(self, log_dir: str = './logs/test_execution'):
-        self.log_dir = Path(log_dir)
-        self.logs: List[Dict[str, Any]] = []
-        self.errors: List[Dict[str, Any]] = []
-        self.warnings: List[Dict[str, Any]] = []
+    Chunks are cut at the last newline, so multi-byte characters are never
+    split, and each chunk is decoded once. limit stops after that many bytes.
+    """
+    tail = b''
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            tail += chunk
+            continue
+        lines = (tail + chunk[:end]).decode('utf-8', errors='replace').split('\n')
+        tail = chunk[end + 1:]
+        yield lines
+    if tail:
+        yield [tail.decode('utf-8', errors='replace')]
+
+
+def is_event_file(log_file: Path) -> bool:
+    """Whether log_file is a compact binary event log (see event_log)"""
+    return bool(EVENT_FILE_PATTERN.search(Path(log_file).name))
+
+
+def is_sequential_file(log_file: Path) -> bool:
+    """Whether log_file can only be read from the start (compact event or compressed log)"""
+    return is_event_file(log_file) or compression_of(log_file) is not None
+
+
+def iter_event_file(log_file: Path) -> Iterator[Dict[str, Any]]:
+    """Decode entries của một compact event file"""
+    with open_log_file(log_file) as f:
+        for entries in iter_event_batches(f):
+            yield from entries
+
+
+def file_timestamp(log_file: Path) -> str:
+    """Modification time of a file as naive UTC ISO string ('' if unavailable)"""
+    try:
+        mtime = log_file.stat().st_mtime
+    except OSError:
+        return ''
+    return datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class LogLineParser:
+    """Parse lines of one log file, carrying the last real timestamp to plain-text lines
     
-    def load_logs_from_file(self, log_file: Path) -> List[Dict[str, Any]]:
-        """Load logs từ một file"""
-        logs = []
+    Plain-text lines (e.g. continuation lines of a multi-line traceback) get
+    the timestamp of the preceding structured entry, or fallback_timestamp
+    before the first one.
+    """
+    
+    def __init__(self, fallback_timestamp: str = ''):
+        self.last_timestamp = fallback_timestamp
+    
+    def __call__(self, line: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        entries = self.parse_batch([line])
+        return entries[0] if entries else None
+    
+    def parse_batch(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """Parse a batch of lines (blank lines are skipped)"""
+        loads = json_loads
+        last_timestamp = self.last_timestamp
+        entries = []
+        append = entries.append
         
-        if not log_file.exists():
-            return logs
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] == '{':
+                try:
+                    # Try to parse as JSON (structured log)
+                    log_entry = loads(line)
+                except ValueError:
+                    log_entry = None
+                if type(log_entry) is dict:
+                    timestamp = log_entry.get('timestamp')
+                    if timestamp:
+                        last_timestamp = timestamp
+                    append(log_entry)
+                    continue
+            # If not JSON, treat as plain text log
+            append({
+                'timestamp': last_timestamp,
+                'level': 'INFO',
+                'message': line,
+                'raw': True
+            })
         
+        self.last_timestamp = last_timestamp
+        return entries
+
+
+def split_byte_ranges(log_file: Path, chunk_bytes: int = PARALLEL_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Split a file into (start, end) byte ranges of about chunk_bytes cut at line boundaries
+    
+    Event và compressed files are read whole (see is_sequential_file).
+    """
+    size = log_file.stat().st_size
+    if is_sequential_file(log_file):
+        return [(0, size)]
+    ranges = []
+    start = 0
+    with open(log_file, 'rb') as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def last_timestamp_before(f: BinaryIO, offset: int) -> Optional[str]:
+    """Timestamp of the last structured entry shortly before offset"""
+    lookback = min(offset, TIMESTAMP_LOOKBACK_BYTES)
+    f.seek(offset - lookback)
+    lines = f.read(lookback).decode('utf-8', errors='replace').split('\n')
+    for line in reversed(lines):
+        line = line.strip()
+        if not line.startswith('{'):
+            continue
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        # Try to parse as JSON (structured log)
-                        log_entry = json.loads(line)
-                        logs.append(log_entry)
-                    except json.JSONDecodeError:
-                        # If not JSON, treat as plain text log
-                        logs.append({
-                            'timestamp': datetime.utcnow().isoformat(),
-                            'level': 'INFO',
-                            'message': line,
-                            'raw': True
-                        })
-        except Exception as e:
-            print(f"Error loading log file {log_file}: {e}", file=sys.stderr)
-        
-        return logs
+            log_entry = json_loads(line)
+        except ValueError:
+            continue
+        if type(log_entry) is dict and log_entry.get('timestamp'):
+            return log_entry['timestamp']
+    return None
+
+
+def aggregate_byte_range(
+    log_file: str,
+    start: int,
+    end: int,
+    time_range: Optional[Dict[str, datetime]] = None,
+    max_samples: Optional[int] = None
+) -> Tuple['LogStatistics', List[Tuple[str, str, Dict[str, Any]]]]:
+    """Statistics for the lines in [start, end) of a log file (process pool task)
     
-    def aggregate_logs(
-        self,
-        log_files: Optional[List[Path]] = None,
-        time_range: Optional[Dict[str, datetime]] = None
-    ) -> Dict[str, Any]:
-        """Aggregate logs từ multiple files"""
-        if log_files is None:
-            # Find all log files in log directory
-            log_files = list(self.log_dir.glob('*.log'))
-            log_files.extend(self.log_dir.glob('*.error.log'))
+    Entries that may be copies of another family's (see is_dedupe_candidate)
+    are not counted but returned keyed as (timestamp, family, entry), so the
+    caller dedupes them with dedupe_families like the sequential path does.
+    Event và compressed files are always read whole.
+    """
+    path = Path(log_file)
+    family = log_family(path)
+    stats = LogStatistics(max_samples)
+    candidates: List[Tuple[str, str, Dict[str, Any]]] = []
+    time_range = time_range or {}
+    start_time = time_range.get('start')
+    end_time = time_range.get('end')
+    
+    def add_batch(logs: Iterable[Dict[str, Any]]):
+        for log in logs:
+            if (start_time or end_time) and not in_time_range(log, start_time, end_time):
+                continue
+            if is_dedupe_candidate(log):
+                candidates.append((timestamp_key(log), family, log))
+            else:
+                stats.add(log)
+    
+    if is_event_file(path):
+        add_batch(iter_event_file(path))
+        return stats, candidates
+    
+    if is_sequential_file(path):
+        parser = LogLineParser(file_timestamp(path))
+        with open_log_file(path) as f:
+            for lines in iter_line_batches(f):
+                add_batch(parser.parse_batch(lines))
+        return stats, candidates
+    
+    with open(path, 'rb') as f:
+        # Plain-text lines at the start of the range belong to the entry before it
+        fallback = (last_timestamp_before(f, start) if start else None) or file_timestamp(path)
+        parser = LogLineParser(fallback)
+        f.seek(start)
+        for lines in iter_line_batches(f, limit=end - start):
+            add_batch(parser.parse_batch(lines))
+    
+    return stats, candidates
+
+
+def discover_log_files(log_dir: Path) -> List[Path]:
+    """Log files in log_dir including numbered rotations, oldest rotation first
+    
+    A plain rotation whose compressed copy is already written (compression
+    is about to remove it) is skipped, so its entries are read once.
+    """
+    if not log_dir.exists():
+        return []
+    
+    def rotation_order(path: Path):
+        match = ROTATION_SUFFIX.search(path.name)
+        return (log_family(path), -int(match.group(1)) if match else 0)
+    
+    files = [p for p in log_dir.iterdir() if p.is_file() and LOG_FILE_PATTERN.search(p.name)]
+    names = {p.name for p in files}
+    files = [
+        p for p in files
+        if not (ROTATION_SUFFIX.search(p.name) and any(p.name + suffix in names for suffix in COMPRESSION_SUFFIXES.values()))
+    ]
+    return sorted(files, key=rotation_order)
+
+
+def log_family(path: Path) -> str:
+    """Name shared by a log file and its rotations (service.log for service.log.3 và service.log.3.gz)"""
+    return ROTATION_SUFFIX.sub('', Path(path).name)
+
+
+def timestamp_key(entry: Dict[str, Any]) -> str:
+    """Sort key of a log entry (its ISO timestamp string)"""
+    timestamp = entry.get('timestamp', '')
+    return timestamp if isinstance(timestamp, str) else str(timestamp)
+
+
+def entry_identity(entry: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Fields shared by every handler's copy of one log record (timestamps differ)"""
+    return tuple(str(entry.get(field)) for field in DEDUPE_FIELDS)
+
+
+def is_dedupe_candidate(entry: Dict[str, Any]) -> bool:
+    """Whether entry may have a copy in another log family (see DEDUPE_LEVELS)"""
+    return entry.get('level') in DEDUPE_LEVELS
+
+
+def dedupe_families(
+    items: Iterable[Tuple[str, str, Dict[str, Any]]],
+    window: float = DEDUPE_WINDOW_SECONDS
+) -> Iterator[Dict[str, Any]]:
+    """Drop entries repeated across log families, e.g. an error written to both
+    service.log and service.error.log
+    
+    items are (timestamp, family, entry) in timestamp order. Each handler
+    formats its own timestamp, so an entry is a copy when an identical entry
+    from another family was yielded less than window seconds earlier and has
+    not been matched yet. Entries that cannot have copies (see
+    is_dedupe_candidate) or have no parseable timestamp pass through.
+    """
+    pending: Dict[Tuple[Any, ...], deque] = {}
+    recent: deque = deque()  # (time, identity, record) in arrival order
+    
+    for timestamp, family, entry in items:
+        if not is_dedupe_candidate(entry):
+            yield entry
+            continue
+        try:
+            now = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+        except (ValueError, TypeError):
+            yield entry
+            continue
         
-        all_logs = []
+        # Forget records too old to have a copy still coming
+        while recent and recent[0][0] < now - window:
+            _, identity, record = recent.popleft()
+            record[1] = False
+            records = pending.get(identity)
+            while records and not records[0][1]:
+                records.popleft()
+            if not records:
+                pending.pop(identity, None)
         
-        for log_file in log_files:
-            file_logs = self.load_logs_from_file(log_file)
-            all_logs.extend(file_logs)
+        identity = entry_identity(entry)
+        records = pending.setdefault(identity, deque())
+        match = next((r for r in records if r[1] and r[0] != family), None)
+        if match is not None:
+            match[1] = False
+            continue
         
-        # Filter by time range if specified
-        if time_range:
-            start_time = time_range.get('start')
-            end_time = time_range.get('end')
-            
-            filtered_logs = []
-            for log in all_logs:
-                try:
-                    log_time = datetime.fromisoformat(log.get('timestamp', '').replace('Z', '+00:00'))
-                    if start_time and log_time < start_time:
-                        continue
-                    if end_time and log_time > end_time:
-                        continue
-                    filtered_logs.append(log)
-                except Exception:
-                    # If timestamp parsing fails, include the log
-                    filtered_logs.append(log)
-            
-            all_logs = filtered_logs
+        record = [family, True]
+        records.append(record)
+        recent.append((now, identity, record))
+        yield entry
+
+
+class LogStatistics:
+    """Single-pass accumulator for log counters, distributions, time range và insights
+    
+    Memory grows with the number of distinct keys, not with the number of
+    entries. Only the max_samples most recent errors and warnings are kept
+    (all of them when max_samples is None).
+    """
+    
+    def __init__(self, max_samples: Optional[int] = None):
+        self.max_samples = max_samples
+        self.total = 0
+        self.error_count = 0
+        self.warning_count = 0
+        self.start_time: Optional[str] = None
+        self.end_time: Optional[str] = None
+        self.counters: Dict[str, Counter] = {name: Counter() for name in STAT_COUNTERS}
+        self._error_samples: List[Any] = []
+        self._warning_samples: List[Any] = []
+        self._seq = 0
+    
+    def add(self, log: Dict[str, Any]):
+        """Account for one log entry"""
+        self.total += 1
+        counters = self.counters
         
-        # Sort by timestamp
-        all_logs.sort(key=lambda x: x.get('timestamp', ''))
+        timestamp = log.get('timestamp', '')
+        if timestamp:
+            if self.start_time is None or timestamp < self.start_time:
+                self.start_time = timestamp
+            if self.end_time is None or timestamp > self.end_time:
+                self.end_time = timestamp
         
-        # Categorize logs
-        self.logs = all_logs
-        self.errors = [log for log in all_logs if log.get('level') in ['ERROR', 'CRITICAL']]
-        self.warnings = [log for log in all_logs if log.get('level') == 'WARNING']
+        counters['level_distribution'][log.get('level', 'UNKNOWN')] += 1
         
-        return {
-            'total_logs': len(all_logs),
-            'errors': len(self.errors),
-            'warnings': len(self.warnings),
-            'logs': all_logs
-        }
-    
-    def extract_errors(self) -> List[Dict[str, Any]]:
-        """Extract errors từ logs"""
-        errors = []
+        extra = log.get('extra_fields', {})
+        phase = extra.get('phase')
+        if phase:
+            counters['phase_distribution'][phase] += 1
+        event = extra.get('event')
+        if event:
+            counters['event_distribution'][event] += 1
         
-        for log in self.errors:
-            error = {
-                'timestamp': log.get('timestamp'),
-                'level': log.get('level'),
-                'message': log.get('message'),
-                'module': log.get('module'),
-                'function': log.get('function'),
-                'line': log.get('line'),
-                'exception': log.get('exception'),
-                'correlation_id': log.get('correlation_id'),
-                'extra_fields': log.get('extra_fields', {})
-            }
-            errors.append(error)
+        message = log.get('message', '')
+        if message:
+            # Extract key part of message
+            key_part = message.split(':')[0] if ':' in message else message[:50]
+            counters['common_messages'][key_part] += 1
         
-        return errors
+        level = log.get('level')
+        if level in ('ERROR', 'CRITICAL'):
+            self._add_error(log, extra)
+        elif level == 'WARNING':
+            self.warning_count += 1
+            counters['warning_types'][log.get('message', 'Unknown').split(':')[0]] += 1
+            self._keep_sample(self._warning_samples, log)
     
-    def extract_warnings(self) -> List[Dict[str, Any]]:
-        """Extract warnings từ logs"""
-        warnings = []
+    def _add_error(self, log: Dict[str, Any], extra: Dict[str, Any]):
+        self.error_count += 1
+        counters = self.counters
         
-        for log in self.warnings:
-            warning = {
-                'timestamp': log.get('timestamp'),
-                'level': log.get('level'),
-                'message': log.get('message'),
-                'module': log.get('module'),
-                'function': log.get('function'),
-                'line': log.get('line'),
-                'correlation_id': log.get('correlation_id'),
-                'extra_fields': log.get('extra_fields', {})
-            }
-            warnings.append(warning)
+        error_type = log.get('exception', '').split('\n')[0] if log.get('exception') else 'Unknown'
+        counters['error_types'][error_type] += 1
+        counters['error_modules'][log.get('module', 'Unknown')] += 1
+        counters['error_functions'][log.get('function', 'Unknown')] += 1
+        counters['error_messages'][log.get('message', '')] += 1
         
-        return warnings
-    
-    def identify_patterns(self) -> Dict[str, Any]:
-        """Identify patterns trong logs"""
-        patterns = {
-            'error_types': Counter(),
-            'error_modules': Counter(),
-            'error_functions': Counter(),
-            'warning_types': Counter(),
-            'phase_errors': Counter(),
-            'common_messages': Counter(),
-            'correlation_ids': Counter()
-        }
+        phase = extra.get('phase')
+        if phase:
+            counters['phase_errors'][phase] += 1
         
-        # Analyze errors
-        for error in self.errors:
-            error_type = error.get('exception', '').split('\n')[0] if error.get('exception') else 'Unknown'
-            patterns['error_types'][error_type] += 1
-            
-            module = error.get('module', 'Unknown')
-            patterns['error_modules'][module] += 1
-            
-            function = error.get('function', 'Unknown')
-            patterns['error_functions'][function] += 1
-            
-            # Extract phase from extra_fields
-            extra = error.get('extra_fields', {})
-            phase = extra.get('phase')
-            if phase:
-                patterns['phase_errors'][phase] += 1
-            
-            # Track correlation IDs
-            corr_id = error.get('correlation_id')
-            if corr_id and corr_id != 'N/A':
-                patterns['correlation_ids'][corr_id] += 1
-        
-        # Analyze warnings
-        for warning in self.warnings:
-            warning_type = warning.get('message', 'Unknown').split(':')[0]
-            patterns['warning_types'][warning_type] += 1
-        
-        # Common messages
-        for log in self.logs:
-            message = log.get('message', '')
-            if message:
-                # Extract key part of message
-                key_part = message.split(':')[0] if ':' in message else message[:50]
-                patterns['common_messages'][key_part] += 1
+        corr_id = log.get('correlation_id')
+        if corr_id and corr_id != 'N/A':
+            counters['correlation_ids'][corr_id] += 1
+        
+        try:
+            timestamp = log.get('timestamp', '')
+            if timestamp:
+                counters['hourly_errors'][datetime.fromisoformat(timestamp.replace('Z', '+00:00')).hour] += 1
+        except Exception:
+            pass
         
+        self._keep_sample(self._error_samples, log)
+    
+    def _keep_sample(self, samples: List[Any], log: Dict[str, Any]):
+        """Keep log in a min-heap by timestamp, evicting the oldest beyond max_samples"""
+        item = (str(log.get('timestamp', '')), self._seq, log)
+        self._seq += 1
+        if self.max_samples is None or len(samples) < self.max_samples:
+            heapq.heappush(samples, item)
+        else:
+            heapq.heappushpop(samples, item)
+    
+    def merge(self, other: 'LogStatistics'):
+        """Merge partial statistics (e.g. from another worker) into these"""
+        self.total += other.total
+        self.error_count += other.error_count
+        self.warning_count += other.warning_count
+        for timestamp in (other.start_time, other.end_time):
+            if timestamp:
+                if self.start_time is None or timestamp < self.start_time:
+                    self.start_time = timestamp
+                if self.end_time is None or timestamp > self.end_time:
+                    self.end_time = timestamp
+        for name, counter in other.counters.items():
+            self.counters[name].update(counter)
+        for item in sorted(other._error_samples):
+            self._keep_sample(self._error_samples, item[2])
+        for item in sorted(other._warning_samples):
+            self._keep_sample(self._warning_samples, item[2])
+    
+    def errors(self) -> List[Dict[str, Any]]:
+        """Kept error entries ordered by timestamp"""
+        return [item[2] for item in sorted(self._error_samples)]
+    
+    def warnings(self) -> List[Dict[str, Any]]:
+        """Kept warning entries ordered by timestamp"""
+        return [item[2] for item in sorted(self._warning_samples)]
+    
+    def patterns(self) -> Dict[str, Any]:
+        """Error/warning patterns (top entries of each counter)"""
+        counters = self.counters
         return {
-            'error_types': dict(patterns['error_types'].most_common(10)),
-            'error_modules': dict(patterns['error_modules'].most_common(10)),
-            'error_functions': dict(patterns['error_functions'].most_common(10)),
-            'warning_types': dict(patterns['warning_types'].most_common(10)),
-            'phase_errors': dict(patterns['phase_errors']),
-            'common_messages': dict(patterns['common_messages'].most_common(20)),
-            'correlation_ids': dict(patterns['correlation_ids'].most_common(10))
+            'error_types': dict(counters['error_types'].most_common(10)),
+            'error_modules': dict(counters['error_modules'].most_common(10)),
+            'error_functions': dict(counters['error_functions'].most_common(10)),
+            'warning_types': dict(counters['warning_types'].most_common(10)),
+            'phase_errors': dict(counters['phase_errors']),
+            'common_messages': dict(counters['common_messages'].most_common(20)),
+            'correlation_ids': dict(counters['correlation_ids'].most_common(10))
         }
     
-    def generate_log_summary(self) -> Dict[str, Any]:
-        """Generate summary của logs"""
-        if not self.logs:
+    def summary(self) -> Dict[str, Any]:
+        """Summary của accumulated logs"""
+        if not self.total:
             return {
                 'total_logs': 0,
                 'summary': 'No logs found'
             }
         
-        # Time range
-        timestamps = [log.get('timestamp', '') for log in self.logs if log.get('timestamp')]
-        if timestamps:
-            start_time = min(timestamps)
-            end_time = max(timestamps)
-        else:
-            start_time = None
-            end_time = None
-        
-        # Level distribution
-        level_distribution = Counter(log.get('level', 'UNKNOWN') for log in self.logs)
-        
-        # Phase distribution
-        phase_distribution = Counter()
-        for log in self.logs:
-            extra = log.get('extra_fields', {})
-            phase = extra.get('phase')
-            if phase:
-                phase_distribution[phase] += 1
-        
-        # Event distribution
-        event_distribution = Counter()
-        for log in self.logs:
-            extra = log.get('extra_fields', {})
-            event = extra.get('event')
-            if event:
-                event_distribution[event] += 1
-        
         return {
-            'total_logs': len(self.logs),
+            'total_logs': self.total,
             'time_range': {
-                'start': start_time,
-                'end': end_time
+                'start': self.start_time,
+                'end': self.end_time
             },
-            'level_distribution': dict(level_distribution),
-            'phase_distribution': dict(phase_distribution),
-            'event_distribution': dict(event_distribution),
-            'errors': len(self.errors),
-            'warnings': len(self.warnings),
-            'patterns': self.identify_patterns()
+            'level_distribution': dict(self.counters['level_distribution']),
+            'phase_distribution': dict(self.counters['phase_distribution']),
+            'event_distribution': dict(self.counters['event_distribution']),
+            'errors': self.error_count,
+            'warnings': self.warning_count,
+            'patterns': self.patterns()
         }
     
-    def create_log_insights(self) -> Dict[str, Any]:
-        """Create insights từ log analysis"""
+    def insights(self) -> Dict[str, Any]:
+        """Insights từ accumulated counters"""
         insights = {
             'critical_issues': [],
             'recommendations': [],
@@ -264,16 +539,15 @@ class LogAggregator:
         }
         
         # Identify critical issues
-        if len(self.errors) > 100:
+        if self.error_count > 100:
             insights['critical_issues'].append({
                 'type': 'high_error_count',
-                'message': f'High number of errors detected: {len(self.errors)}',
+                'message': f'High number of errors detected: {self.error_count}',
                 'severity': 'high'
             })
         
         # Check for repeated errors
-        error_messages = Counter(error.get('message', '') for error in self.errors)
-        repeated_errors = [(msg, count) for msg, count in error_messages.items() if count > 5]
+        repeated_errors = [(msg, count) for msg, count in self.counters['error_messages'].items() if count > 5]
         
         if repeated_errors:
             insights['critical_issues'].append({
@@ -284,13 +558,7 @@ class LogAggregator:
             })
         
         # Phase-specific issues
-        phase_errors = defaultdict(int)
-        for error in self.errors:
-            extra = error.get('extra_fields', {})
-            phase = extra.get('phase')
-            if phase:
-                phase_errors[phase] += 1
-        
+        phase_errors = self.counters['phase_errors']
         if phase_errors:
             worst_phase = max(phase_errors.items(), key=lambda x: x[1])
             insights['critical_issues'].append({
@@ -300,14 +568,14 @@ class LogAggregator:
             })
         
         # Recommendations
-        if len(self.errors) > 0:
+        if self.error_count > 0:
             insights['recommendations'].append({
                 'type': 'error_review',
                 'message': 'Review error logs to identify root causes',
                 'priority': 'high'
             })
         
-        if len(self.warnings) > 50:
+        if self.warning_count > 50:
             insights['recommendations'].append({
                 'type': 'warning_review',
                 'message': 'Review warnings to prevent potential issues',
@@ -315,39 +583,376 @@ class LogAggregator:
             })
         
         # Trends
-        if len(self.logs) > 0:
+        if self.total > 0:
             # Calculate error rate over time
-            error_rate = len(self.errors) / len(self.logs) * 100
+            error_rate = self.error_count / self.total * 100
             insights['trends']['error_rate'] = f'{error_rate:.2f}%'
             
             # Time-based distribution
-            hourly_errors = defaultdict(int)
-            for error in self.errors:
-                try:
-                    timestamp = error.get('timestamp', '')
-                    if timestamp:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        hour = dt.hour
-                        hourly_errors[hour] += 1
-                except Exception:
-                    pass
-            
+            hourly_errors = self.counters['hourly_errors']
             if hourly_errors:
                 insights['trends']['peak_error_hour'] = max(hourly_errors.items(), key=lambda x: x[1])[0]
         
         return insights
 
 
+class LogAggregator:
+    """Aggregate logs từ multiple sources và analyze patterns
+    
+    With incremental, entries are kept in an indexed store (see LogStore)
+    and each aggregation only parses lines appended since the last one.
+    With archive_dir, rotated files compacted by compact_logs are read from
+    the columnar archive (see LogArchive) together with the live files.
+    """
+    
+    def __init__(
+        self,
+        log_dir: str = './logs/test_execution',
+        incremental: bool = False,
+        index_file: Optional[str] = None,
+        archive_dir: Optional[str] = None
+    ):
+        self.log_dir = Path(log_dir)
+        self.logs: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.warnings: List[Dict[str, Any]] = []
+        self.stats = LogStatistics()
+        self.store: Optional[LogStore] = None
+        if incremental:
+            self.store = LogStore(Path(index_file) if index_file else self.log_dir / 'log_index.db')
+        self.archive: Optional[LogArchive] = LogArchive(Path(archive_dir)) if archive_dir else None
+    
+    def parse_log_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Parse một log line (None for blank lines; plain text has no timestamp)"""
+        return LogLineParser()(line)
+    
+    def iter_logs_from_file(self, log_file: Path) -> Iterator[Dict[str, Any]]:
+        """Stream logs từ một file
+        
+        Reads the file in large chunks and decodes each chunk's lines in a
+        batch, using orjson when installed. Plain-text lines carry the last
+        structured timestamp (the file's mtime before the first one).
+        Compact event files are decoded with event_log; gzip/zstd
+        compressed rotations are decompressed while streaming.
+        """
+        if not log_file.exists():
+            return
+        
+        parser = LogLineParser(file_timestamp(log_file))
+        try:
+            if is_event_file(log_file):
+                yield from iter_event_file(log_file)
+                return
+            with open_log_file(log_file) as f:
+                for lines in iter_line_batches(f):
+                    yield from parser.parse_batch(lines)
+        except Exception as e:
+            print(f"Error loading log file {log_file}: {e}", file=sys.stderr)
+    
+    def iter_merged_logs(
+        self,
+        log_files: List[Path],
+        archived: Optional[Iterable[Tuple[str, str, Dict[str, Any]]]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream logs of several files (plus archived entries) in global time order
+        
+        Each file is already in time order, so a lazy k-way heap merge
+        replaces concatenating and sorting everything. The same file listed
+        twice is read once, and entries duplicated between families
+        (combined và error logs) are yielded once. Entries outside the time
+        range are dropped before the dedupe, as in the store và archive.
+        """
+        unique_files = list(dict.fromkeys(Path(f) for f in log_files))
+        streams = [self._keyed_file(f, start_time, end_time) for f in unique_files]
+        if archived is not None:
+            streams.append(archived)
+        merged = heapq.merge(*streams, key=lambda item: item[0])
+        return dedupe_families(merged)
+    
+    def load_logs_from_file(self, log_file: Path) -> List[Dict[str, Any]]:
+        """Load logs từ một file"""
+        return list(self.iter_logs_from_file(log_file))
+    
+    def ingest_logs(self, log_files: List[Path], prune: bool = False) -> List[int]:
+        """Ingest new lines of text log_files into the store; returns their store file ids
+        
+        With prune, files no longer present (e.g. removed by retention) are
+        dropped from the store. Compressed segments keep the entries ingested
+        while they were plain (see LogStore). Event files are not ingested:
+        they are cheap to decode, so iter_logs streams them directly.
+        """
+        log_files = [f for f in log_files if not is_event_file(f)]
+        for log_file in log_files:
+            try:
+                self.store.ingest_file(log_file, LogLineParser(file_timestamp(log_file)))
+            except Exception as e:
+                print(f"Error ingesting log file {log_file}: {e}", file=sys.stderr)
+        
+        file_ids = self.store.file_ids(log_files)
+        if prune:
+            self.store.prune(file_ids)
+        return file_ids
+    
+    def compact_logs(self, log_files: Optional[List[Path]] = None, keep_source: bool = True) -> Dict[str, int]:
+        """Compact closed (rotated) log files into the archive
+        
+        Compacted files are kept (recognized by inode and skipped when
+        aggregating) unless keep_source=False, which removes them.
+        """
+        if self.archive is None:
+            raise ValueError("compact_logs requires an archive_dir")
+        if log_files is None:
+            log_files = [f for f in discover_log_files(self.log_dir) if ROTATION_SUFFIX.search(f.name)]
+        
+        compacted = {'files': 0, 'rows': 0}
+        for log_file in log_files:
+            if self.archive.is_archived(log_file):
+                continue
+            try:
+                rows = self.archive.add_file(log_file, self.iter_logs_from_file(log_file), log_family(log_file))
+                if not keep_source:
+                    log_file.unlink()
+            except Exception as e:
+                print(f"Error compacting log file {log_file}: {e}", file=sys.stderr)
+                continue
+            compacted['files'] += 1
+            compacted['rows'] += rows
+        return compacted
+    
+    def _keyed_file(
+        self,
+        log_file: Path,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        family = log_family(log_file)
+        for log in self.iter_logs_from_file(log_file):
+            if (start_time or end_time) and not in_time_range(log, start_time, end_time):
+                continue
+            yield timestamp_key(log), family, log
+    
+    def iter_logs(
+        self,
+        log_files: Optional[List[Path]] = None,
+        time_range: Optional[Dict[str, datetime]] = None,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream log entries in the time range, in time order (from the store in incremental mode)
+        
+        When scanning the log directory, archived entries are merged in; of
+        an explicit log_files list, compacted files are read from the archive.
+        columns limits the archive columns read (all by default).
+        """
+        scan_dir = log_files is None
+        if log_files is None:
+            # Find all log files (and rotations) in log directory
+            log_files = discover_log_files(self.log_dir)
+        
+        time_range = time_range or {}
+        start_time = time_range.get('start')
+        end_time = time_range.get('end')
+        
+        archived = None
+        if self.archive is not None:
+            if scan_dir:
+                log_files = [f for f in log_files if not self.archive.is_archived(f)]
+                archived = self.archive.iter_keyed(start_time, end_time, columns)
+            else:
+                # Explicitly listed files that were compacted are read from their segments
+                remaining = []
+                segment_paths = []
+                for log_file in log_files:
+                    segments = self.archive.source_segments(Path(log_file))
+                    if segments is None:
+                        remaining.append(log_file)
+                    else:
+                        segment_paths.extend(segments)
+                log_files = remaining
+                if segment_paths:
+                    archived = self.archive.iter_keyed(start_time, end_time, columns, segment_paths)
+        
+        if self.store is not None:
+            file_ids = self.ingest_logs(log_files, prune=scan_dir)
+            families = {file_id: log_family(Path(path)) for file_id, path in self.store.paths(file_ids).items()}
+            streams = [(
+                (timestamp_key(log), families[file_id], log)
+                for file_id, log in self.store.iter_query(file_ids, start=start_time, end=end_time, with_file_id=True)
+            )]
+            for log_file in dict.fromkeys(Path(f) for f in log_files if is_event_file(f)):
+                streams.append(self._keyed_file(log_file, start_time, end_time))
+            if archived is not None:
+                streams.append(archived)
+            yield from dedupe_families(heapq.merge(*streams, key=lambda item: item[0]))
+            return
+        
+        yield from self.iter_merged_logs(log_files, archived, start_time, end_time)
+    
+    def aggregate_logs(
+        self,
+        log_files: Optional[List[Path]] = None,
+        time_range: Optional[Dict[str, datetime]] = None,
+        keep_logs: bool = True,
+        max_samples: Optional[int] = None,
+        workers: int = 1
+    ) -> Dict[str, Any]:
+        """Aggregate logs từ multiple files trong một pass
+        
+        Every counter is computed while the entries stream by. With
+        keep_logs=False no raw entries are kept (only the max_samples most
+        recent errors and warnings), so memory does not grow with log volume;
+        workers > 1 then parses files in parallel (see aggregate_parallel),
+        and only ARCHIVE_STAT_COLUMNS are read from the archive.
+        In incremental mode the time range is an index range scan over the
+        store instead of a filter over every parsed entry.
+        """
+        all_logs = []
+        
+        if workers > 1 and not keep_logs and self.store is None and self.archive is None:
+            stats = self.aggregate_parallel(log_files, time_range, workers, max_samples)
+        else:
+            stats = LogStatistics(max_samples)
+            columns = None if keep_logs else ARCHIVE_STAT_COLUMNS
+            for log in self.iter_logs(log_files, time_range, columns):
+                stats.add(log)
+                if keep_logs:
+                    all_logs.append(log)
+        
+        self.stats = stats
+        self.logs = all_logs
+        self.errors = stats.errors()
+        self.warnings = stats.warnings()
+        
+        result = {
+            'total_logs': stats.total,
+            'errors': stats.error_count,
+            'warnings': stats.warning_count
+        }
+        if keep_logs:
+            result['logs'] = all_logs
+        return result
+    
+    def aggregate_parallel(
+        self,
+        log_files: Optional[List[Path]],
+        time_range: Optional[Dict[str, datetime]],
+        workers: int,
+        max_samples: Optional[int] = None
+    ) -> LogStatistics:
+        """Statistics computed by a process pool, merged from per-task partials
+        
+        Each file, or each newline-aligned byte range of a large file, is one
+        task. Entries that may be copies (errors) come back to this process
+        and go through the same time-ordered dedupe_families as iter_logs.
+        """
+        if log_files is None:
+            log_files = discover_log_files(self.log_dir)
+        log_files = [f for f in dict.fromkeys(Path(f) for f in log_files) if f.exists()]
+        
+        tasks = []
+        for log_file in log_files:
+            for start, end in split_byte_ranges(log_file):
+                tasks.append((str(log_file), start, end, time_range, max_samples))
+        
+        stats = LogStatistics(max_samples)
+        if not tasks:
+            return stats
+        candidate_streams = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            for partial, candidates in pool.map(aggregate_byte_range, *zip(*tasks)):
+                stats.merge(partial)
+                candidate_streams.append(candidates)
+        for log in dedupe_families(heapq.merge(*candidate_streams, key=lambda item: item[0])):
+            stats.add(log)
+        return stats
+    
+    def extract_errors(self) -> List[Dict[str, Any]]:
+        """Extract errors từ logs"""
+        errors = []
+        
+        for log in self.errors:
+            error = {
+                'timestamp': log.get('timestamp'),
+                'level': log.get('level'),
+                'message': log.get('message'),
+                'module': log.get('module'),
+                'function': log.get('function'),
+                'line': log.get('line'),
+                'exception': log.get('exception'),
+                'correlation_id': log.get('correlation_id'),
+                'extra_fields': log.get('extra_fields', {})
+            }
+            errors.append(error)
+        
+        return errors
+    
+    def extract_warnings(self) -> List[Dict[str, Any]]:
+        """Extract warnings từ logs"""
+        warnings = []
+        
+        for log in self.warnings:
+            warning = {
+                'timestamp': log.get('timestamp'),
+                'level': log.get('level'),
+                'message': log.get('message'),
+                'module': log.get('module'),
+                'function': log.get('function'),
+                'line': log.get('line'),
+                'correlation_id': log.get('correlation_id'),
+                'extra_fields': log.get('extra_fields', {})
+            }
+            warnings.append(warning)
+        
+        return warnings
+    
+    def identify_patterns(self) -> Dict[str, Any]:
+        """Identify patterns trong logs"""
+        return self.stats.patterns()
+    
+    def generate_log_summary(self) -> Dict[str, Any]:
+        """Generate summary của logs"""
+        return self.stats.summary()
+    
+    def create_log_insights(self) -> Dict[str, Any]:
+        """Create insights từ log analysis"""
+        return self.stats.insights()
+
+
 def aggregate_logs(
     log_dir: str = './logs/test_execution',
     output_file: Optional[str] = None,
-    time_range: Optional[Dict[str, datetime]] = None
+    time_range: Optional[Dict[str, datetime]] = None,
+    incremental: bool = False,
+    include_logs: bool = False,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+    workers: int = 1,
+    archive_dir: Optional[str] = None,
+    compact: bool = False,
+    delete_compacted: bool = False
 ) -> Dict[str, Any]:
-    """Main function để aggregate logs"""
-    aggregator = LogAggregator(log_dir)
+    """Main function để aggregate logs
+    
+    Streams the logs once. Raw entries are only included with include_logs;
+    otherwise errors/warnings list the max_samples most recent ones (counts
+    in the summary cover every entry). With compact, rotated log files are
+    first compacted into archive_dir (default <log_dir>/archive); the
+    compacted files are only removed with delete_compacted.
+    """
+    if compact and archive_dir is None:
+        archive_dir = str(Path(log_dir) / 'archive')
+    aggregator = LogAggregator(log_dir, incremental=incremental, archive_dir=archive_dir)
+    if compact:
+        compacted = aggregator.compact_logs(keep_source=not delete_compacted)
+        print(f"Compacted {compacted['files']} rotated log files ({compacted['rows']} entries) into {archive_dir}")
     
     # Aggregate logs
-    aggregated = aggregator.aggregate_logs(time_range=time_range)
+    aggregated = aggregator.aggregate_logs(
+        time_range=time_range,
+        keep_logs=include_logs,
+        max_samples=None if include_logs else max_samples,
+        workers=workers
+    )
     
     # Generate summary
     summary = aggregator.generate_log_summary()
@@ -388,6 +993,12 @@ if __name__ == '__main__':
     parser.add_argument('--output', type=str, help='Output file for aggregated logs')
     parser.add_argument('--start-time', type=str, help='Start time (ISO format)')
     parser.add_argument('--end-time', type=str, help='End time (ISO format)')
+    parser.add_argument('--workers', type=int, default=1, help='Parse log files in parallel with N processes')
+    parser.add_argument('--include-logs', action='store_true', help='Include every raw log entry in the output')
+    parser.add_argument('--incremental', action='store_true', help='Only parse lines appended since the last run (indexed store in the log directory)')
+    parser.add_argument('--archive-dir', type=str, help='Also read compacted logs from this columnar archive')
+    parser.add_argument('--compact', action='store_true', help='Compact rotated log files into the archive first (default <log-dir>/archive)')
+    parser.add_argument('--delete-compacted', action='store_true', help='Remove rotated log files once compacted into the archive')
     
     args = parser.parse_args()
     
@@ -403,12 +1014,18 @@ if __name__ == '__main__':
         result = aggregate_logs(
             log_dir=args.log_dir,
             output_file=args.output,
-            time_range=time_range
+            time_range=time_range,
+            incremental=args.incremental,
+            include_logs=args.include_logs,
+            workers=args.workers,
+            archive_dir=args.archive_dir,
+            compact=args.compact,
+            delete_compacted=args.delete_compacted
         )
         
         if not args.output:
             print(json.dumps(result, indent=2, default=str))
-            
+    
     except Exception as e:
         print(f"Error aggregating logs: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Log Archive
+Compressed, columnar, time-partitioned archive của closed (rotated) log files
+"""
+
+import heapq
+import json
+import os
+import struct
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+from log_store import normalize_timestamp
+
+ARCHIVE_MAGIC = b'LCA1'
+ARCHIVE_VERSION = 1
+COMPRESSION_LEVEL = 6
+EPOCH = datetime(1970, 1, 1)
+NULL_TIMESTAMP = -(2 ** 63)  # rows whose timestamp cannot be parsed
+UNDATED_PARTITION = 'undated'
+
+# Column name -> encoding; every other top-level field goes to the 'extra' column
+DICTIONARY_COLUMNS = ['level', 'logger', 'module', 'function', 'event', 'correlation_id', 'phase', 'line']
+PLAIN_COLUMNS = ['message', 'exception', 'extra_fields', 'extra']
+COLUMNS = ['timestamp'] + DICTIONARY_COLUMNS + PLAIN_COLUMNS
+FIELD_COLUMNS = set(COLUMNS) - {'timestamp', 'extra'}
+
+
+def timestamp_to_micros(value: Any) -> int:
+    """ISO timestamp thành microseconds since epoch (naive UTC), NULL_TIMESTAMP if unparseable"""
+    normalized = normalize_timestamp(value) if value else None
+    if normalized is None:
+        return NULL_TIMESTAMP
+    delta = datetime.fromisoformat(normalized) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def micros_to_timestamp(micros: int) -> str:
+    """Inverse of timestamp_to_micros (same format as datetime.isoformat())"""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def partition_name(micros: int) -> str:
+    """Daily partition of a timestamp"""
+    if micros == NULL_TIMESTAMP:
+        return UNDATED_PARTITION
+    return (EPOCH + timedelta(microseconds=micros)).date().isoformat()
+
+
+def encode_columns(entries: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bytes, List[int]]:
+    """Encode entries column by column; returns (column headers, concatenated blobs, timestamps)"""
+    values: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+    for entry in entries:
+        timestamp = timestamp_to_micros(entry.get('timestamp'))
+        values['timestamp'].append(timestamp)
+        extra = {
+            key: value for key, value in entry.items()
+            if key not in FIELD_COLUMNS and (key != 'timestamp' or timestamp == NULL_TIMESTAMP)
+        }
+        values['extra'].append(extra or None)
+        for name in FIELD_COLUMNS:
+            values[name].append(entry.get(name))
+    
+    headers: Dict[str, Any] = {}
+    blobs = []
+    offset = 0
+    for name in COLUMNS:
+        header: Dict[str, Any]
+        if name == 'timestamp':
+            header = {'encoding': 'int64'}
+            raw = array('q', values[name]).tobytes()
+        elif name in DICTIONARY_COLUMNS:
+            dictionary: Dict[str, int] = {}
+            codes = array('I', (
+                dictionary.setdefault(json.dumps(value, default=str), len(dictionary)) for value in values[name]
+            ))
+            header = {'encoding': 'dictionary', 'dictionary': [json.loads(key) for key in dictionary]}
+            raw = codes.tobytes()
+        else:
+            header = {'encoding': 'plain'}
+            raw = json.dumps(values[name], default=str).encode('utf-8')
+        blob = zlib.compress(raw, COMPRESSION_LEVEL)
+        header.update({'offset': offset, 'length': len(blob)})
+        headers[name] = header
+        blobs.append(blob)
+        offset += len(blob)
+    
+    return headers, b''.join(blobs), values['timestamp']
+
+
+def decode_column(header: Dict[str, Any], blob: bytes) -> List[Any]:
+    """Decode one column blob"""
+    raw = zlib.decompress(blob)
+    if header['encoding'] == 'int64':
+        return array('q', raw).tolist()
+    if header['encoding'] == 'dictionary':
+        dictionary = header['dictionary']
+        return [dictionary[code] for code in array('I', raw)]
+    return json.loads(raw)
+
+
+def write_segment(segment_file: Path, entries: List[Dict[str, Any]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Write one segment file; returns its header (without column offsets)"""
+    columns, body, timestamps = encode_columns(entries)
+    timestamps = [t for t in timestamps if t != NULL_TIMESTAMP]
+    header = {
+        'version': ARCHIVE_VERSION,
+        'rows': len(entries),
+        'min_timestamp': min(timestamps) if timestamps else None,
+        'max_timestamp': max(timestamps) if timestamps else None,
+        **meta,
+        'columns': columns
+    }
+    encoded = json.dumps(header).encode('utf-8')
+    
+    segment_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = segment_file.with_suffix('.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(ARCHIVE_MAGIC + struct.pack('<I', len(encoded)) + encoded + body)
+    os.replace(tmp_file, segment_file)
+    return {key: value for key, value in header.items() if key != 'columns'}
+
+
+def read_segment(segment_file: Path, columns: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """Read the header and only the requested columns (all by default) of a segment"""
+    with open(segment_file, 'rb') as f:
+        if f.read(4) != ARCHIVE_MAGIC:
+            raise ValueError(f"Not a log archive segment: {segment_file}")
+        header_length, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length))
+        body_start = 8 + header_length
+        
+        data = {}
+        for name in (columns if columns is not None else header['columns']):
+            column = header['columns'].get(name)
+            if column is None:
+                continue
+            f.seek(body_start + column['offset'])
+            data[name] = decode_column(column, f.read(column['length']))
+    return header, data
+
+
+class LogArchive:
+    """Columnar archive of closed log files, partitioned by day
+    
+    Each source file becomes one segment per day it covers, under
+    <archive_dir>/<YYYY-MM-DD>/. A segment stores timestamps as int64
+    microseconds, level/logger/module/function/event/correlation_id/phase/line
+    dictionary-encoded, and message/exception/remaining fields as JSON
+    columns, each zlib-compressed separately. manifest.json indexes segments
+    by time range, so a query opens only segments in range and decodes only
+    the columns it asks for.
+    """
+    
+    def __init__(self, archive_dir: Path):
+        self.archive_dir = Path(archive_dir)
+        self.manifest_file = self.archive_dir / 'manifest.json'
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            manifest = {}
+        manifest.setdefault('sources', {})
+        manifest.setdefault('segments', [])
+        return manifest
+    
+    def _save_manifest(self):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+    
+    def _source_key(self, log_file: Path) -> Optional[str]:
+        try:
+            stat = log_file.stat()
+        except OSError:
+            return None
+        return f'{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'
+    
+    def is_archived(self, log_file: Path) -> bool:
+        """Whether this physical file (same inode, size và mtime) was already compacted"""
+        key = self._source_key(Path(log_file))
+        return key is not None and key in self.manifest['sources']
+    
+    def source_segments(self, log_file: Path) -> Optional[List[str]]:
+        """Segments compacted from log_file, None if it was not compacted
+        
+        A file removed after compaction is matched by its original path.
+        """
+        log_file = Path(log_file)
+        key = self._source_key(log_file)
+        if key is not None:
+            source = self.manifest['sources'].get(key)
+            return source['segments'] if source is not None else None
+        
+        matches = [s for s in self.manifest['sources'].values() if s['path'] == str(log_file)]
+        return max(matches, key=lambda s: s['archived_at'])['segments'] if matches else None
+    
+    def add_file(self, log_file: Path, entries: Iterable[Dict[str, Any]], family: str) -> int:
+        """Compact one closed log file's parsed entries into daily segments; returns row count"""
+        log_file = Path(log_file)
+        key = self._source_key(log_file)
+        if key is None or key in self.manifest['sources']:
+            return 0
+        
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            partitions.setdefault(partition_name(timestamp_to_micros(entry.get('timestamp'))), []).append(entry)
+        
+        rows = 0
+        segment_names = []
+        for partition, partition_entries in sorted(partitions.items()):
+            name = f"{partition}/{log_file.name}-{key.replace(':', '-')}.lca"
+            meta = write_segment(
+                self.archive_dir / name,
+                partition_entries,
+                {'family': family, 'source': log_file.name, 'partition': partition}
+            )
+            self.manifest['segments'].append({'path': name, **meta})
+            segment_names.append(name)
+            rows += len(partition_entries)
+        
+        self.manifest['sources'][key] = {
+            'path': str(log_file),
+            'archived_at': datetime.utcnow().isoformat(),
+            'segments': segment_names
+        }
+        self._save_manifest()
+        return rows
+    
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Segments overlapping the time range (undated segments always match)"""
+        start_us = timestamp_to_micros(start) if start else None
+        end_us = timestamp_to_micros(end) if end else None
+        
+        matching = []
+        for segment in self.manifest['segments']:
+            if segment['min_timestamp'] is not None:
+                if start_us is not None and segment['max_timestamp'] < start_us:
+                    continue
+                if end_us is not None and segment['min_timestamp'] > end_us:
+                    continue
+            matching.append(segment)
+        return matching
+    
+    def iter_segment(
+        self,
+        segment: Dict[str, Any],
+        columns: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Rebuild entries of one segment from the requested columns, filtered by time range
+        
+        Null values are left out, so rebuilt entries only have the fields
+        the original had (with timezone-aware timestamps normalized to UTC).
+        """
+        wanted = ['timestamp'] + [c for c in (columns if columns is not None else COLUMNS) if c != 'timestamp']
+        _, data = read_segment(self.archive_dir / segment['path'], wanted)
+        start_us = timestamp_to_micros(start) if start else None
+        end_us = timestamp_to_micros(end) if end else None
+        
+        names = [name for name in wanted if name in data and name not in ('timestamp', 'extra')]
+        extras = data.get('extra')
+        for index, micros in enumerate(data['timestamp']):
+            if micros != NULL_TIMESTAMP:
+                if (start_us is not None and micros < start_us) or (end_us is not None and micros > end_us):
+                    continue
+                entry = {'timestamp': micros_to_timestamp(micros)}
+            else:
+                entry = {}
+            for name in names:
+                value = data[name][index]
+                if value is not None:
+                    entry[name] = value
+            if extras is not None and extras[index]:
+                entry.update(extras[index])
+            yield entry
+    
+    def iter_keyed(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        segment_paths: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """(timestamp, family, entry) of every archived entry in range, merged in time order
+        
+        segment_paths limits the entries to those segments (e.g. of some source files).
+        """
+        def keyed(segment: Dict[str, Any]):
+            family = segment['family']
+            for entry in self.iter_segment(segment, columns, start, end):
+                yield entry.get('timestamp', ''), family, entry
+        
+        segments = self.segments(start, end)
+        if segment_paths is not None:
+            wanted = set(segment_paths)
+            segments = [s for s in segments if s['path'] in wanted]
+        return heapq.merge(*(keyed(s) for s in segments), key=lambda item: item[0])
+    
+    def iter_entries(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Archived entries in range in time order, with only the requested columns"""
+        for _, _, entry in self.iter_keyed(start, end, columns):
+            yield entry
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Log Benchmarks
+Đo throughput (lines/second) của log parsing trên synthetic log files,
+records/second của StructuredFormatter và size/parse cost của compact event logs
+"""
+
+import json
+import logging
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+import log_aggregator
+from log_aggregator import LogAggregator
+import test_logger
+from test_logger import CompactEventHandler, StructuredFormatter
+
+TRACEBACK_LINES = [
+    'Traceback (most recent call last):',
+    '  File "/app/scripts/execute_tests_with_logging.py", line 412, in execute_phase_with_logging',
+    '    result = self.run_jest_process(cmd, log_file)',
+    'TimeoutError: Jest did not exit within 1800 seconds',
+]
+
+
+def generate_synthetic_log(log_file: Path, size_mb: int, traceback_every: int = 50) -> int:
+    """Write a StructuredFormatter-style log of about size_mb; returns the line count
+    
+    Every traceback_every-th entry is an ERROR followed by plain-text
+    traceback continuation lines.
+    """
+    target = size_mb * 1024 * 1024
+    start = datetime(2026, 1, 1)
+    written = 0
+    lines = 0
+    index = 0
+    
+    with open(log_file, 'w', encoding='utf-8') as f:
+        while written < target:
+            batch = []
+            for _ in range(1000):
+                is_error = index % traceback_every == 0
+                batch.append(json.dumps({
+                    'timestamp': (start + timedelta(milliseconds=index)).isoformat(),
+                    'level': 'ERROR' if is_error else 'INFO',
+                    'logger': 'test_executor',
+                    'message': f'Test tests/unit/services/service_{index % 97}.test.ts: '
+                               f"{'FAILED' if is_error else 'PASSED'} (0.{index % 1000:03d}s)",
+                    'correlation_id': 'c0ffee00-0000-4000-8000-000000000000',
+                    'module': 'test_logger',
+                    'function': 'log_test_result',
+                    'line': 216,
+                    'test': f'tests/unit/services/service_{index % 97}.test.ts',
+                    'status': 'FAILED' if is_error else 'PASSED',
+                    'duration': (index % 1000) / 1000,
+                    'event': 'test_result',
+                    'phase': index % 8 + 1
+                }))
+                if is_error:
+                    batch.extend(TRACEBACK_LINES)
+                index += 1
+            chunk = '\n'.join(batch) + '\n'
+            f.write(chunk)
+            written += len(chunk)
+            lines += len(batch)
+    
+    return lines
+
+
+def baseline_parse(log_file: Path) -> int:
+    """Line-by-line stdlib parsing (the previous load_logs_from_file loop)"""
+    count = 0
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                json.loads(line)
+            except json.JSONDecodeError:
+                datetime.utcnow().isoformat()
+            count += 1
+    return count
+
+
+def bulk_parse(log_file: Path) -> int:
+    """Chunked bulk parsing path of LogAggregator"""
+    return sum(1 for _ in LogAggregator(str(log_file.parent)).iter_logs_from_file(log_file))
+
+
+def measure(name: str, parse: Callable[[Path], int], log_file: Path, size_bytes: int) -> Dict[str, Any]:
+    """Time one parser over the whole file"""
+    started = time.perf_counter()
+    lines = parse(log_file)
+    elapsed = time.perf_counter() - started
+    result = {
+        'name': name,
+        'lines': lines,
+        'seconds': round(elapsed, 3),
+        'lines_per_second': round(lines / elapsed) if elapsed else 0,
+        'mb_per_second': round(size_bytes / 1024 / 1024 / elapsed, 1) if elapsed else 0
+    }
+    print(f"{name:<24} {result['lines']:>12,} lines {result['seconds']:>9.2f}s "
+          f"{result['lines_per_second']:>12,} lines/s {result['mb_per_second']:>8.1f} MB/s")
+    return result
+
+
+def run_log_parsing_benchmark(size_mb: int = 1024, log_file: Optional[Path] = None) -> Dict[str, Any]:
+    """Benchmark baseline vs bulk parsing (stdlib and, if installed, orjson)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if log_file is None:
+            log_file = Path(tmp_dir) / 'synthetic.log'
+            print(f"Generating {size_mb}MB synthetic log...")
+            generate_synthetic_log(log_file, size_mb)
+        size_bytes = log_file.stat().st_size
+        
+        results = [measure('baseline (line by line)', baseline_parse, log_file, size_bytes)]
+        
+        backend = log_aggregator.json_loads
+        try:
+            log_aggregator.json_loads = json.loads
+            results.append(measure('bulk (json)', bulk_parse, log_file, size_bytes))
+            if log_aggregator.orjson is not None:
+                log_aggregator.json_loads = log_aggregator.orjson.loads
+                results.append(measure('bulk (orjson)', bulk_parse, log_file, size_bytes))
+        finally:
+            log_aggregator.json_loads = backend
+    
+    return {
+        'benchmark': 'log_parsing',
+        'timestamp': datetime.utcnow().isoformat(),
+        'file_size_mb': round(size_bytes / 1024 / 1024, 1),
+        'json_backend': log_aggregator.JSON_BACKEND,
+        'results': results
+    }
+
+
+def make_log_records(count: int, error_every: int = 10) -> List[logging.LogRecord]:
+    """LogRecords as TestLogger.log_test_result creates them (every error_every-th one FAILED)"""
+    records = []
+    for index in range(count):
+        failed = index % error_every == 0
+        status = 'FAILED' if failed else 'PASSED'
+        test = f'tests/unit/services/service_{index % 97}.test.ts'
+        record = logging.LogRecord(
+            'test_executor', logging.ERROR if failed else logging.INFO, test_logger.__file__, 216,
+            f'Test {test}: {status} ({(index % 1000) / 1000:.3f}s)', None, None, 'log_test_result'
+        )
+        record.correlation_id = 'c0ffee00-0000-4000-8000-000000000000'
+        record.extra_fields = {
+            'test': test,
+            'status': status,
+            'duration': (index % 1000) / 1000,
+            'event': 'test_result',
+            'phase': index % 8 + 1
+        }
+        records.append(record)
+    return records
+
+
+def measure_formatter(
+    name: str,
+    formatter: StructuredFormatter,
+    count: int,
+    batch_size: int = 1000
+) -> Dict[str, Any]:
+    """Time formatting records for the combined log, and errors again for the error log
+    
+    Records are created (untimed) in small batches and dropped after
+    formatting, as in a running logger.
+    """
+    elapsed = 0.0
+    for offset in range(0, count, batch_size):
+        records = make_log_records(min(batch_size, count - offset))
+        started = time.perf_counter()
+        for record in records:
+            formatter.format(record)
+            if record.levelno >= logging.ERROR:
+                formatter.format(record)
+        elapsed += time.perf_counter() - started
+    result = {
+        'name': name,
+        'records': count,
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(count / elapsed) if elapsed else 0
+    }
+    print(f"{name:<24} {result['records']:>12,} records {result['seconds']:>9.2f}s "
+          f"{result['records_per_second']:>12,} records/s")
+    return result
+
+
+def run_formatter_benchmark(records: int = 200000) -> Dict[str, Any]:
+    """Benchmark StructuredFormatter default vs fast mode (stdlib json and, if installed, orjson)"""
+    results = [
+        measure_formatter('default (json)', StructuredFormatter(), records),
+        measure_formatter('fast (json)', StructuredFormatter(fast=True, encoder=json.dumps), records)
+    ]
+    if test_logger.orjson is not None:
+        results.append(measure_formatter('fast (orjson)', StructuredFormatter(fast=True), records))
+    
+    return {
+        'benchmark': 'structured_formatter',
+        'timestamp': datetime.utcnow().isoformat(),
+        'json_backend': 'orjson' if test_logger.orjson is not None else 'json',
+        'results': results
+    }
+
+
+def run_event_log_benchmark(records: int = 200000) -> Dict[str, Any]:
+    """Compare file size and parse throughput of test_result events as JSON lines vs compact events"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / 'events.log'
+        event_file = Path(tmp_dir) / 'events.events'
+        formatter = StructuredFormatter(fast=True)
+        handler = CompactEventHandler(str(event_file), max_bytes=0)
+        with open(json_file, 'w', encoding='utf-8') as f:
+            for offset in range(0, records, 1000):
+                batch = make_log_records(min(1000, records - offset))
+                f.write(''.join(formatter.format(record) + '\n' for record in batch))
+                handler.emit_batch(batch)
+        handler.close()
+        
+        def parse(log_file: Path) -> int:
+            return sum(1 for _ in LogAggregator(tmp_dir).iter_logs_from_file(log_file))
+        
+        runs = [('json lines (json)', json.loads, json_file)]
+        if log_aggregator.orjson is not None:
+            runs.append(('json lines (orjson)', log_aggregator.orjson.loads, json_file))
+        runs.append(('compact events', log_aggregator.json_loads, event_file))
+        
+        results = []
+        backend = log_aggregator.json_loads
+        try:
+            for name, loads, log_file in runs:
+                log_aggregator.json_loads = loads
+                size_bytes = log_file.stat().st_size
+                result = measure(name, parse, log_file, size_bytes)
+                result['file_size_mb'] = round(size_bytes / 1024 / 1024, 1)
+                results.append(result)
+        finally:
+            log_aggregator.json_loads = backend
+    
+    return {
+        'benchmark': 'event_log',
+        'timestamp': datetime.utcnow().isoformat(),
+        'json_backend': log_aggregator.JSON_BACKEND,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Benchmark log parsing and formatting throughput')
+    parser.add_argument('--benchmark', choices=['parsing', 'formatter', 'events'], default='parsing', help='Which benchmark to run')
+    parser.add_argument('--size-mb', type=int, default=1024, help='Size of the synthetic log in MB')
+    parser.add_argument('--log-file', type=str, help='Benchmark an existing log file instead')
+    parser.add_argument('--records', type=int, default=200000, help='Records to format in the formatter and events benchmarks')
+    parser.add_argument('--output', type=str, help='Save results as JSON')
+    
+    args = parser.parse_args()
+    
+    if args.benchmark == 'formatter':
+        report = run_formatter_benchmark(records=args.records)
+    elif args.benchmark == 'events':
+        report = run_event_log_benchmark(records=args.records)
+    else:
+        report = run_log_parsing_benchmark(
+            size_mb=args.size_mb,
+            log_file=Path(args.log_file) if args.log_file else None
+        )
+    
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results saved to {args.output}")
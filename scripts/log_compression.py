@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Log Compression
+Nén rotated log segments (gzip hoặc zstd) và đọc chúng lại transparently
+"""
+
+import gzip
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+try:
+    import zstandard  # Optional zstd backend
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES: Dict[str, str] = {'gzip': '.gz', 'zstd': '.zst'}
+COMPRESSION_LEVELS: Dict[str, int] = {'gzip': 6, 'zstd': 3}
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def check_compression(compression: Optional[str]):
+    """Raise ValueError for an unknown compression or zstd without zstandard installed"""
+    if compression is None:
+        return
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"compression must be one of {', '.join(COMPRESSION_SUFFIXES)}, got {compression!r}")
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+
+
+def compression_of(path: Path) -> Optional[str]:
+    """Compression of a log file from its suffix (None for plain files)"""
+    suffix = Path(path).suffix
+    for compression, compressed_suffix in COMPRESSION_SUFFIXES.items():
+        if suffix == compressed_suffix:
+            return compression
+    return None
+
+
+def open_log_file(path: Path) -> BinaryIO:
+    """Open a log file for binary reading, decompressing .gz/.zst on the fly"""
+    compression = compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError(f"Cannot read {path}: zstandard is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def compress_file(source: Path, dest: Path, compression: str, level: Optional[int] = None):
+    """Compress source into dest (written to a temp file, then renamed) và remove source"""
+    check_compression(compression)
+    level = COMPRESSION_LEVELS[compression] if level is None else level
+    tmp_file = Path(f'{dest}.tmp')
+    
+    with open(source, 'rb') as src:
+        if compression == 'gzip':
+            with gzip.open(tmp_file, 'wb', compresslevel=level) as out:
+                shutil.copyfileobj(src, out, COPY_BUFFER_SIZE)
+        else:
+            with open(tmp_file, 'wb') as raw:
+                zstandard.ZstdCompressor(level=level).copy_stream(src, raw)
+    
+    stat = os.stat(source)
+    os.utime(tmp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # retention ages by mtime
+    os.replace(tmp_file, dest)
+    os.unlink(source)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Log Store
+Incremental ingest của structured log files vào indexed SQLite store
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Any, Iterable, Iterator
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+from log_compression import COPY_BUFFER_SIZE, compression_of, open_log_file
+
+FINGERPRINT_BYTES = 256  # head of a file, to detect inode reuse
+INGEST_BATCH_SIZE = 5000
+QUERY_BATCH_SIZE = 1000
+
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """Timestamp thành naive UTC ISO string (None when it cannot be parsed)"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat()
+
+
+def skip_bytes(f: BinaryIO, count: int) -> bool:
+    """Read past count bytes of a stream that may not seek (False if it ends first)"""
+    while count > 0:
+        chunk = f.read(min(count, COPY_BUFFER_SIZE))
+        if not chunk:
+            return False
+        count -= len(chunk)
+    return True
+
+
+def iter_raw_lines(f: BinaryIO) -> Iterator[bytes]:
+    """Lines (with newline) of a stream read in chunks; decompressing readers may not support readline"""
+    tail = b''
+    while True:
+        chunk = f.read(COPY_BUFFER_SIZE)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    if tail:
+        yield tail
+
+
+def entry_field(entry: Dict[str, Any], name: str) -> Any:
+    """Field của log entry, top-level or nested in extra_fields"""
+    if name in entry:
+        return entry[name]
+    extra = entry.get('extra_fields')
+    return extra.get(name) if isinstance(extra, dict) else None
+
+
+class LogStore:
+    """Indexed on-disk store of parsed log entries
+    
+    Each physical file is tracked by (device, inode) with the byte offset
+    ingested so far, so appended lines are parsed once and rotated files
+    (renamed, same inode) are not re-read. A compressed segment (.gz/.zst)
+    is closed: it is ingested once, và when it holds the content of a
+    tracked plain segment (same head, at least its ingested bytes) it takes
+    over that record, so compressing service.log.1 into service.log.1.gz
+    neither re-reads nor duplicates its entries. Entries are indexed by
+    timestamp, level, phase, event and correlation_id.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS log_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                offset INTEGER NOT NULL DEFAULT 0,
+                fingerprint TEXT,
+                UNIQUE (device, inode)
+            );
+            CREATE TABLE IF NOT EXISTS log_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER NOT NULL,
+                timestamp TEXT,
+                level TEXT,
+                phase INTEGER,
+                event TEXT,
+                correlation_id TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_log_entries_timestamp ON log_entries (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_log_entries_level ON log_entries (level, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_log_entries_phase ON log_entries (phase, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_log_entries_event ON log_entries (event, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_log_entries_correlation ON log_entries (correlation_id, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_log_entries_file ON log_entries (file_id);
+            """
+        )
+        self._conn.commit()
+    
+    def _fingerprint(self, log_file: Path) -> str:
+        """Head of the file's content (decompressed for .gz/.zst)"""
+        head = b''
+        with open_log_file(log_file) as f:
+            while len(head) < FINGERPRINT_BYTES:
+                chunk = f.read(FINGERPRINT_BYTES - len(head))
+                if not chunk:
+                    break
+                head += chunk
+        return head.hex()
+    
+    def _file_record(self, log_file: Path, stat: os.stat_result, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Tracked record for the physical file, reset if its inode was reused or it was truncated
+        
+        None for a compressed file that was already ingested.
+        """
+        compressed = compression_of(log_file) is not None
+        row = self._conn.execute(
+            'SELECT id, offset, fingerprint FROM log_files WHERE device = ? AND inode = ?',
+            (stat.st_dev, stat.st_ino)
+        ).fetchone()
+        
+        if row is not None:
+            file_id, offset, known = row
+            known = known or ''
+            if compressed and fingerprint == known:
+                return None
+            # Appending or renaming never changes the head of a file
+            if not compressed and stat.st_size >= offset and fingerprint.startswith(known):
+                self._conn.execute(
+                    'UPDATE log_files SET path = ?, fingerprint = ? WHERE id = ?',
+                    (str(log_file), fingerprint, file_id)
+                )
+                return {'id': file_id, 'offset': offset}
+            self._drop_files([file_id])
+        
+        if compressed and fingerprint:
+            # Compressed copy of a segment ingested while it was plain (new inode và name)
+            for file_id, offset in self._conn.execute(
+                'SELECT id, offset FROM log_files WHERE fingerprint = ? ORDER BY id DESC',
+                (fingerprint,)
+            ).fetchall():
+                with open_log_file(log_file) as f:
+                    if not skip_bytes(f, offset):
+                        continue
+                self._conn.execute(
+                    'UPDATE log_files SET device = ?, inode = ?, path = ? WHERE id = ?',
+                    (stat.st_dev, stat.st_ino, str(log_file), file_id)
+                )
+                return {'id': file_id, 'offset': offset}
+        
+        cursor = self._conn.execute(
+            'INSERT INTO log_files (device, inode, path, offset, fingerprint) VALUES (?, ?, ?, 0, ?)',
+            (stat.st_dev, stat.st_ino, str(log_file), fingerprint)
+        )
+        return {'id': cursor.lastrowid, 'offset': 0}
+    
+    def _drop_files(self, file_ids: Iterable[int]):
+        ids = [(file_id,) for file_id in file_ids]
+        self._conn.executemany('DELETE FROM log_entries WHERE file_id = ?', ids)
+        self._conn.executemany('DELETE FROM log_files WHERE id = ?', ids)
+    
+    def ingest_file(self, log_file: Path, parse_line: Callable[[bytes], Optional[Dict[str, Any]]]) -> int:
+        """Parse và store lines appended since the last ingest; returns new entry count
+        
+        A trailing line without newline is left for the next ingest.
+        """
+        try:
+            stat = log_file.stat()
+            fingerprint = self._fingerprint(log_file)
+        except OSError:
+            return 0
+        
+        with self._lock:
+            record = self._file_record(log_file, stat, fingerprint)
+            if record is None:
+                return 0
+            offset = record['offset']
+            ingested = 0
+            
+            compressed = compression_of(log_file) is not None
+            if stat.st_size > offset or compressed:
+                rows = []
+                with open_log_file(log_file) as f:
+                    if compressed:
+                        skip_bytes(f, offset)
+                    else:
+                        f.seek(offset)
+                    for raw_line in (iter_raw_lines(f) if compressed else f):
+                        if not raw_line.endswith(b'\n'):
+                            break
+                        offset += len(raw_line)
+                        entry = parse_line(raw_line)
+                        if entry is None:
+                            continue
+                        rows.append(self._row(record['id'], entry))
+                        if len(rows) >= INGEST_BATCH_SIZE:
+                            self._insert(rows)
+                            ingested += len(rows)
+                            rows = []
+                self._insert(rows)
+                ingested += len(rows)
+            
+            self._conn.execute('UPDATE log_files SET offset = ? WHERE id = ?', (offset, record['id']))
+            self._conn.commit()
+        
+        return ingested
+    
+    def _row(self, file_id: int, entry: Dict[str, Any]) -> tuple:
+        phase = entry_field(entry, 'phase')
+        return (
+            file_id,
+            normalize_timestamp(entry.get('timestamp', '')),
+            entry.get('level'),
+            phase if isinstance(phase, int) else None,
+            entry_field(entry, 'event'),
+            entry.get('correlation_id'),
+            json.dumps(entry, default=str)
+        )
+    
+    def _insert(self, rows: List[tuple]):
+        if rows:
+            self._conn.executemany(
+                'INSERT INTO log_entries (file_id, timestamp, level, phase, event, correlation_id, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+    
+    def file_ids(self, log_files: Iterable[Path]) -> List[int]:
+        """Ids of the tracked physical files behind log_files (deduplicated)"""
+        ids = set()
+        with self._lock:
+            for log_file in log_files:
+                try:
+                    stat = log_file.stat()
+                except OSError:
+                    continue
+                row = self._conn.execute(
+                    'SELECT id FROM log_files WHERE device = ? AND inode = ?',
+                    (stat.st_dev, stat.st_ino)
+                ).fetchone()
+                if row is not None:
+                    ids.add(row[0])
+        return sorted(ids)
+    
+    def paths(self, file_ids: Iterable[int]) -> Dict[int, str]:
+        """Last seen path of each tracked file"""
+        ids = list(file_ids)
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, path FROM log_files WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        return dict(rows)
+    
+    def prune(self, keep_ids: Iterable[int]):
+        """Forget files (và their entries) not in keep_ids, e.g. deleted by retention"""
+        keep = set(keep_ids)
+        with self._lock:
+            stale = [row[0] for row in self._conn.execute('SELECT id FROM log_files') if row[0] not in keep]
+            if stale:
+                self._drop_files(stale)
+                self._conn.commit()
+    
+    def iter_query(
+        self,
+        file_ids: List[int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        level: Optional[str] = None,
+        phase: Optional[int] = None,
+        event: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        with_file_id: bool = False
+    ) -> Iterator[Any]:
+        """Stream entries of file_ids ordered by timestamp, using the indexes for every filter
+        
+        Entries without a parseable timestamp are kept by time filters
+        (same as LogAggregator's in-memory filter). with_file_id yields
+        (file_id, entry) pairs.
+        """
+        if not file_ids:
+            return
+        
+        # Unary + keeps SQLite from scanning by file_id instead of the indexed filters
+        conditions = [f"+file_id IN ({','.join('?' * len(file_ids))})"]
+        params: List[Any] = list(file_ids)
+        for column, value in (('level', level), ('phase', phase), ('event', event), ('correlation_id', correlation_id)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        
+        time_conditions = []
+        time_params = []
+        if start is not None:
+            time_conditions.append('timestamp >= ?')
+            time_params.append(normalize_timestamp(start))
+        if end is not None:
+            time_conditions.append('timestamp <= ?')
+            time_params.append(normalize_timestamp(end))
+        if not time_conditions:
+            time_conditions.append('timestamp IS NOT NULL')
+        
+        where = ' AND '.join(conditions)
+        # Entries without timestamp sort first, then a range scan in timestamp order
+        yield from self._iter_rows(
+            f'SELECT file_id, data FROM log_entries WHERE {where} AND timestamp IS NULL ORDER BY id',
+            params,
+            with_file_id
+        )
+        yield from self._iter_rows(
+            f"SELECT file_id, data FROM log_entries WHERE {where} AND {' AND '.join(time_conditions)} "
+            'ORDER BY timestamp, id',
+            params + time_params,
+            with_file_id
+        )
+    
+    def _iter_rows(self, sql: str, params: List[Any], with_file_id: bool) -> Iterator[Any]:
+        """Stream decoded entries in batches, holding the lock only while fetching"""
+        cursor = self._conn.cursor()
+        with self._lock:
+            cursor.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(QUERY_BATCH_SIZE)
+            if not rows:
+                break
+            for file_id, data in rows:
+                yield (file_id, json.loads(data)) if with_file_id else json.loads(data)
+    
+    def query(self, file_ids: List[int], **filters: Any) -> List[Dict[str, Any]]:
+        """All entries matching iter_query as a list"""
+        return list(self.iter_query(file_ids, **filters))
+    
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self._conn.close()
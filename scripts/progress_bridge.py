@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Jest Progress Bridge
+Nhận live per-test-file events từ scripts/jest-progress-reporter.js qua local socket
+"""
+
+import contextvars
+import json
+import socket
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+REPORTER_PATH = scripts_dir / 'jest-progress-reporter.js'
+PORT_ENV_VAR = 'JEST_PROGRESS_PORT'
+
+
+class JestProgressBridge:
+    """Local TCP listener that dispatches Jest reporter events
+    
+    The reporter connects to 127.0.0.1:<port> and sends one JSON object per
+    line. on_event runs on a bridge thread, in the context of the thread
+    that created the bridge (so the correlation ID carries over).
+    """
+    
+    def __init__(self, on_event: Callable[[Dict[str, Any]], None]):
+        self.on_event = on_event
+        self._context = contextvars.copy_context()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen()
+        self._server.settimeout(0.2)
+        self.port = self._server.getsockname()[1]
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+    
+    def __enter__(self) -> 'JestProgressBridge':
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def start(self):
+        """Start accepting reporter connections"""
+        self._accept_thread.start()
+    
+    def env(self) -> Dict[str, str]:
+        """Environment variables for the Jest process"""
+        return {PORT_ENV_VAR: str(self.port)}
+    
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            thread = threading.Thread(
+                target=self._context.copy().run,
+                args=(self._serve_connection, conn),
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def _serve_connection(self, conn: socket.socket):
+        with conn, conn.makefile('r', encoding='utf-8', errors='replace') as stream:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.on_event(event)
+    
+    def close(self, timeout: float = 5.0):
+        """Stop listening và drain connections already accepted"""
+        self._stopped.set()
+        if self._accept_thread.is_alive():
+            self._accept_thread.join(timeout)
+        self._server.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+def reporter_args() -> List[str]:
+    """Jest CLI args keeping the default reporter and adding the bridge reporter"""
+    return ['--reporters', 'default', '--reporters', str(REPORTER_PATH)]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Resource Sampler
+Background sampling CPU, memory, threads và open files của Jest process tree
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+import sys
+
+import psutil
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+SAMPLED_METRICS = ['cpu_percent', 'memory_mb', 'threads', 'open_files', 'processes']
+
+
+def summarize_series(values: List[float]) -> Dict[str, float]:
+    """Peak, p95 và average của một time series"""
+    if not values:
+        return {'peak': 0, 'p95': 0, 'avg': 0}
+    ordered = sorted(values)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        'peak': ordered[-1],
+        'p95': ordered[p95_index],
+        'avg': sum(ordered) / len(ordered)
+    }
+
+
+class ProcessTreeSampler:
+    """Periodically sample a process and all its descendants on a background thread"""
+    
+    def __init__(self, root_pid: int, interval: float = 1.0, max_timeline_points: int = 200):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.max_timeline_points = max_timeline_points
+        self.samples: List[Dict[str, float]] = []
+        self._processes: Dict[int, psutil.Process] = {}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._start_time: Optional[float] = None
+    
+    def start(self):
+        """Start sampling"""
+        self._start_time = time.time()
+        self._thread.start()
+    
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling và return summary"""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self.summary()
+    
+    def _tree(self) -> List[psutil.Process]:
+        """Current process tree, reusing Process objects so cpu_percent has a baseline"""
+        try:
+            root = self._processes.get(self.root_pid) or psutil.Process(self.root_pid)
+            tree = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return []
+        
+        current = {}
+        for proc in tree:
+            known = self._processes.get(proc.pid)
+            current[proc.pid] = known if known is not None else proc
+        self._processes = current
+        return list(current.values())
+    
+    def sample(self) -> Optional[Dict[str, float]]:
+        """Take one sample across the process tree"""
+        totals = {metric: 0.0 for metric in SAMPLED_METRICS}
+        
+        for proc in self._tree():
+            try:
+                with proc.oneshot():
+                    totals['cpu_percent'] += proc.cpu_percent(interval=None)
+                    totals['memory_mb'] += proc.memory_info().rss / 1024 / 1024
+                    totals['threads'] += proc.num_threads()
+                    totals['processes'] += 1
+                try:
+                    totals['open_files'] += len(proc.open_files())
+                except psutil.AccessDenied:
+                    pass
+            except psutil.Error:
+                # Process exited between listing and sampling
+                continue
+        
+        if not totals['processes']:
+            return None
+        
+        totals['elapsed'] = time.time() - self._start_time
+        self.samples.append(totals)
+        return totals
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Summarize collected samples (timeline is downsampled)"""
+        step = max(1, -(-len(self.samples) // self.max_timeline_points))
+        summary: Dict[str, Any] = {
+            'interval': self.interval,
+            'sample_count': len(self.samples),
+            'timeline': self.samples[::step]
+        }
+        for metric in SAMPLED_METRICS:
+            summary[metric] = summarize_series([s[metric] for s in self.samples])
+        return summary
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test Result Cache
+Cache PASSED test file results theo content hash (test file, transitive imports, global config)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import sys
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+from impact_analyzer import DependencyGraph, GLOBAL_FILES
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024  # 20MB of stored results
+
+
+class ContentHasher:
+    """Content hash per test file over everything that can change its outcome"""
+    
+    def __init__(self, project_root: Path, graph: Optional[DependencyGraph] = None):
+        self.project_root = Path(project_root)
+        self.graph = graph or DependencyGraph(self.project_root)
+        self._file_digests: Dict[str, str] = {}
+        self._global_files: Optional[List[str]] = None
+    
+    def file_digest(self, rel_path: str) -> str:
+        """sha256 of one file's content (memoized for the lifetime of the hasher)"""
+        if rel_path not in self._file_digests:
+            try:
+                digest = hashlib.sha256((self.project_root / rel_path).read_bytes()).hexdigest()
+            except OSError:
+                digest = 'missing'
+            self._file_digests[rel_path] = digest
+        return self._file_digests[rel_path]
+    
+    def global_files(self) -> List[str]:
+        """Package manifests, Jest/TypeScript config and the Jest setup file with its imports"""
+        if self._global_files is None:
+            if not self.graph.imports:
+                self.graph.build()
+            files = set(GLOBAL_FILES)
+            for global_file in GLOBAL_FILES:
+                files |= self.graph.transitive_dependencies(global_file)
+            self._global_files = sorted(files)
+        return self._global_files
+    
+    def hash_test_file(self, test_file: str) -> str:
+        """Content hash of a test file, its transitive imports and the global files"""
+        if not self.graph.imports:
+            self.graph.build()
+        
+        inputs = {test_file, *self.graph.transitive_dependencies(test_file), *self.global_files()}
+        hasher = hashlib.sha256()
+        for rel_path in sorted(inputs):
+            hasher.update(f'{rel_path}\0{self.file_digest(rel_path)}\n'.encode('utf-8'))
+        return hasher.hexdigest()
+
+
+class ResultCache:
+    """Persistent cache of PASSED test file results keyed by content hash
+    
+    Total stored result size is bounded by max_bytes; least recently used
+    entries are evicted first.
+    """
+    
+    def __init__(self, db_path: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS test_results (
+                test_file TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                run_id TEXT,
+                created_at TEXT NOT NULL,
+                last_used_at TEXT NOT NULL,
+                PRIMARY KEY (test_file, content_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_test_results_last_used ON test_results (last_used_at)'
+        )
+        self._conn.commit()
+    
+    def lookup(self, hashes: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Cached results for test files whose content hash matches {test_file: content_hash}"""
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for test_file, content_hash in hashes.items():
+                row = self._conn.execute(
+                    'SELECT result, run_id FROM test_results WHERE test_file = ? AND content_hash = ?',
+                    (test_file, content_hash)
+                ).fetchone()
+                if row is not None:
+                    found[test_file] = {**json.loads(row[0]), 'cached_run_id': row[1]}
+            
+            if found:
+                now = datetime.utcnow().isoformat()
+                self._conn.executemany(
+                    'UPDATE test_results SET last_used_at = ? WHERE test_file = ? AND content_hash = ?',
+                    [(now, test_file, hashes[test_file]) for test_file in found]
+                )
+                self._conn.commit()
+        
+        return found
+    
+    def store(self, entries: Iterable[Tuple[str, str, Dict[str, Any]]], run_id: Optional[str] = None):
+        """Store (test_file, content_hash, result) entries; only PASSED results are kept"""
+        now = datetime.utcnow().isoformat()
+        rows = []
+        for test_file, content_hash, result in entries:
+            if result.get('status') != 'PASSED':
+                continue
+            payload = json.dumps(result, default=str)
+            rows.append((test_file, content_hash, payload, len(payload), run_id, now, now))
+        if not rows:
+            return
+        
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO test_results '
+                '(test_file, content_hash, result, size, run_id, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM test_results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        evict = []
+        for test_file, content_hash, size in self._conn.execute(
+            'SELECT test_file, content_hash, size FROM test_results ORDER BY last_used_at, created_at'
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            evict.append((test_file, content_hash))
+            total -= size
+        self._conn.executemany(
+            'DELETE FROM test_results WHERE test_file = ? AND content_hash = ?',
+            evict
+        )
+    
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self._conn.close()
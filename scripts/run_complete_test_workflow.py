@@ -6,9 +6,11 @@ Integrate tất cả components: test execution, logging, bug analysis, và repo
 
 import sys
 import argparse
+import subprocess
 from pathlib import Path
 from datetime import datetime
 import json
+from typing import Optional
 
 # Add scripts directory to path
 scripts_dir = Path(__file__).parent
@@ -25,7 +27,21 @@ def run_complete_workflow(
     phases: list,
     fail_fast: bool = False,
     generate_reports: bool = True,
-    log_dir: str = './logs/test_execution'
+    log_dir: str = './logs/test_execution',
+    workers: int = 1,
+    dedupe: bool = True,
+    stream_output: bool = False,
+    live_progress: bool = False,
+    changed_since: Optional[str] = None,
+    shards: int = 1,
+    shard_index: Optional[int] = None,
+    use_cache: bool = True,
+    async_logging: bool = False,
+    fast_log_format: bool = False,
+    compact_events: bool = False,
+    log_compression: str = None,
+    log_rollover_interval: int = None,
+    retries: int = 0
 ) -> dict:
     """Run complete test workflow"""
     print("="*80)
@@ -37,93 +53,144 @@ def run_complete_workflow(
     print("Step 1: Setting up logging...")
     logger = setup_test_logging(
         log_dir=str(project_root / log_dir),
-        service_name='test_workflow'
+        service_name='test_workflow',
+        async_logging=async_logging,
+        fast_format=fast_log_format,
+        compact_events=compact_events,
+        compression=log_compression,
+        rollover_interval=log_rollover_interval
     )
     logger.get_logger().info("Starting complete test workflow")
     
-    # Step 2: Execute tests
-    print("\nStep 2: Executing tests...")
-    executor = EnhancedTestExecutor(project_root, logger)
-    test_results = executor.run_all_phases(phases, fail_fast=fail_fast)
-    
-    # Save test results
-    results_file = project_root / 'reports' / 'test_results' / 'test_execution_results.json'
-    results_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(results_file, 'w') as f:
-        json.dump(test_results, f, indent=2, default=str)
-    
-    print(f"Test execution completed. Results saved to {results_file}")
-    
-    # Step 3: Analyze bugs
-    print("\nStep 3: Analyzing bugs...")
     try:
-        bug_report = analyze_test_results(str(results_file))
+        # Step 2: Execute tests
+        print("\nStep 2: Executing tests...")
+        executor = EnhancedTestExecutor(
+            project_root,
+            logger,
+            workers=workers,
+            stream_output=stream_output,
+            live_progress=live_progress,
+            shards=shards,
+            shard_index=shard_index,
+            use_cache=use_cache,
+            retries=retries
+        )
+        selected_files = None
+        if changed_since:
+            try:
+                selected_files = executor.select_impacted_tests(changed_since)
+            except subprocess.CalledProcessError as e:
+                message = (e.stderr or '').strip() or f'git exited with status {e.returncode}'
+                print(f"Error: invalid --changed-since range {changed_since!r}: {message}", file=sys.stderr)
+                logger.get_logger().error(f"Test impact analysis failed for {changed_since}: {message}")
+                return {
+                    'test_results': None,
+                    'bug_report': None,
+                    'log_summary': None,
+                    'success': False
+                }
+            if selected_files is None:
+                print(f"Changes since {changed_since} affect all tests")
+            else:
+                print(f"Changes since {changed_since} affect {len(selected_files)} test files")
+        test_results = executor.run_all_phases(
+            phases,
+            fail_fast=fail_fast,
+            dedupe=dedupe,
+            selected_files=selected_files
+        )
         
-        # Save bug report
-        bug_report_file = project_root / 'reports' / 'bug_analysis' / 'bug_report.json'
-        bug_report_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(bug_report_file, 'w') as f:
-            json.dump(bug_report, f, indent=2, default=str)
+        # Save test results
+        results_file = project_root / 'reports' / 'test_results' / 'test_execution_results.json'
+        results_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(results_file, 'w') as f:
+            json.dump(test_results, f, indent=2, default=str)
         
-        print(f"Bug analysis completed. Report saved to {bug_report_file}")
-        print(f"Total bugs found: {bug_report.get('total_bugs', 0)}")
-    except Exception as e:
-        print(f"Error analyzing bugs: {e}")
-        bug_report = None
-        bug_report_file = None
-    
-    # Step 4: Aggregate logs
-    print("\nStep 4: Aggregating logs...")
-    try:
-        log_summary = aggregate_logs(
-            log_dir=str(project_root / log_dir),
-            output_file=str(project_root / 'reports' / 'log_analysis' / 'log_summary.json')
-        )
-        log_summary_file = project_root / 'reports' / 'log_analysis' / 'log_summary.json'
-        print(f"Log aggregation completed. Summary saved to {log_summary_file}")
-    except Exception as e:
-        print(f"Error aggregating logs: {e}")
-        log_summary = None
-        log_summary_file = None
-    
-    # Step 5: Generate comprehensive reports
-    if generate_reports:
-        print("\nStep 5: Generating comprehensive reports...")
+        print(f"Test execution completed. Results saved to {results_file}")
+        
+        # Step 3: Analyze bugs
+        print("\nStep 3: Analyzing bugs...")
         try:
-            generator = ComprehensiveReportGenerator(project_root)
-            generator.generate_report(
-                test_results_file=str(results_file),
-                bug_report_file=str(bug_report_file) if bug_report_file else None,
-                log_summary_file=str(log_summary_file) if log_summary_file else None
+            bug_report = analyze_test_results(
+                str(results_file),
+                str(project_root),
+                str(project_root / 'reports' / 'test_history' / 'bugs.db')
             )
-            print("Comprehensive reports generated successfully")
+            
+            # Save bug report
+            bug_report_file = project_root / 'reports' / 'bug_analysis' / 'bug_report.json'
+            bug_report_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(bug_report_file, 'w') as f:
+                json.dump(bug_report, f, indent=2, default=str)
+            
+            print(f"Bug analysis completed. Report saved to {bug_report_file}")
+            print(f"Total bugs found: {bug_report.get('total_bugs', 0)} "
+                  f"({bug_report.get('total_occurrences', 0)} failures, {bug_report.get('flaky_bugs', 0)} flaky)")
+            if bug_report.get('history_summary'):
+                history = bug_report['history_summary']
+                print(f"New: {history['new']}, recurring: {history['recurring']}, regressed: {history['regressed']}")
         except Exception as e:
-            print(f"Error generating reports: {e}")
-    
-    # Summary
-    print("\n" + "="*80)
-    print("WORKFLOW SUMMARY")
-    print("="*80)
-    print(f"Total Phases: {test_results['summary']['total']}")
-    print(f"Passed: {test_results['summary']['passed']}")
-    print(f"Failed: {test_results['summary']['failed']}")
-    print(f"Total Tests: {test_results['summary'].get('total_tests', 0)}")
-    if bug_report:
-        print(f"Total Bugs: {bug_report.get('total_bugs', 0)}")
-        severity = bug_report.get('severity_distribution', {})
-        print(f"  - Critical: {severity.get('critical', 0)}")
-        print(f"  - High: {severity.get('high', 0)}")
-        print(f"  - Medium: {severity.get('medium', 0)}")
-        print(f"  - Low: {severity.get('low', 0)}")
-    print(f"Duration: {test_results['summary'].get('duration', 0):.2f}s")
-    print("="*80)
-    
-    return {
-        'test_results': test_results,
-        'bug_report': bug_report,
-        'log_summary': log_summary,
-        'success': test_results['summary']['failed'] == 0
-    }
+            print(f"Error analyzing bugs: {e}")
+            bug_report = None
+            bug_report_file = None
+        
+        # Step 4: Aggregate logs
+        print("\nStep 4: Aggregating logs...")
+        logger.flush()
+        try:
+            log_summary = aggregate_logs(
+                log_dir=str(project_root / log_dir),
+                output_file=str(project_root / 'reports' / 'log_analysis' / 'log_summary.json')
+            )
+            log_summary_file = project_root / 'reports' / 'log_analysis' / 'log_summary.json'
+            print(f"Log aggregation completed. Summary saved to {log_summary_file}")
+        except Exception as e:
+            print(f"Error aggregating logs: {e}")
+            log_summary = None
+            log_summary_file = None
+        
+        # Step 5: Generate comprehensive reports
+        if generate_reports:
+            print("\nStep 5: Generating comprehensive reports...")
+            try:
+                generator = ComprehensiveReportGenerator(project_root)
+                generator.generate_report(
+                    test_results_file=str(results_file),
+                    bug_report_file=str(bug_report_file) if bug_report_file else None,
+                    log_summary_file=str(log_summary_file) if log_summary_file else None
+                )
+                print("Comprehensive reports generated successfully")
+            except Exception as e:
+                print(f"Error generating reports: {e}")
+        
+        # Summary
+        print("\n" + "="*80)
+        print("WORKFLOW SUMMARY")
+        print("="*80)
+        print(f"Total Phases: {test_results['summary']['total']}")
+        print(f"Passed: {test_results['summary']['passed']}")
+        print(f"Failed: {test_results['summary']['failed']}")
+        print(f"Total Tests: {test_results['summary'].get('total_tests', 0)}")
+        if bug_report:
+            print(f"Total Bugs: {bug_report.get('total_bugs', 0)}")
+            severity = bug_report.get('severity_distribution', {})
+            print(f"  - Critical: {severity.get('critical', 0)}")
+            print(f"  - High: {severity.get('high', 0)}")
+            print(f"  - Medium: {severity.get('medium', 0)}")
+            print(f"  - Low: {severity.get('low', 0)}")
+        print(f"Duration: {test_results['summary'].get('duration', 0):.2f}s")
+        print("="*80)
+        
+        return {
+            'test_results': test_results,
+            'bug_report': bug_report,
+            'log_summary': log_summary,
+            'success': test_results['summary']['failed'] == 0
+        }
+    finally:
+        # Write what is still queued và close the log files, also on errors
+        logger.close()
 
 
 def main():
@@ -132,6 +199,20 @@ def main():
     parser.add_argument('--all', action='store_true', help='Run all phases')
     parser.add_argument('--phase', type=int, help='Run specific phase only')
     parser.add_argument('--fail-fast', action='store_true', help='Stop on first failure')
+    parser.add_argument('--workers', type=int, default=1, help='Number of phases to run in parallel')
+    parser.add_argument('--shards', type=int, default=1, help='Split each phase into N duration-balanced shards')
+    parser.add_argument('--shard-index', type=int, help='Run only this shard (0-based), e.g. one CI matrix job')
+    parser.add_argument('--no-cache', action='store_true', help='Run every test file, ignoring cached passing results')
+    parser.add_argument('--no-dedupe', action='store_true', help='Run each phase by pattern, even if phases overlap')
+    parser.add_argument('--retries', type=int, default=0, help='Re-run failed test files alone up to N times to detect flaky tests')
+    parser.add_argument('--stream-output', action='store_true', help='Stream Jest output to phase log files, keep only a tail in results')
+    parser.add_argument('--live-progress', action='store_true', help='Stream per-test-file results from Jest while a phase runs')
+    parser.add_argument('--changed-since', type=str, help='Only run test files affected by this git diff range (e.g. origin/main...HEAD)')
+    parser.add_argument('--async-logging', action='store_true', help='Write logs from a background thread instead of the test loop')
+    parser.add_argument('--fast-log-format', action='store_true', help='Serialize structured logs once per record, with orjson when installed')
+    parser.add_argument('--compact-events', action='store_true', help='Write test_result events to a compact binary .events log instead of JSON')
+    parser.add_argument('--log-compression', choices=['gzip', 'zstd'], help='Compress rotated log files in the background')
+    parser.add_argument('--log-rollover-interval', type=int, help='Also rotate log files every N seconds (e.g. 3600)')
     parser.add_argument('--no-reports', action='store_true', help='Skip report generation')
     parser.add_argument('--log-dir', type=str, default='./logs/test_execution', help='Log directory')
     
@@ -169,7 +250,21 @@ def main():
             phases=phases,
             fail_fast=args.fail_fast,
             generate_reports=not args.no_reports,
-            log_dir=args.log_dir
+            log_dir=args.log_dir,
+            workers=args.workers,
+            dedupe=not args.no_dedupe,
+            stream_output=args.stream_output,
+            live_progress=args.live_progress,
+            changed_since=args.changed_since,
+            shards=args.shards,
+            shard_index=args.shard_index,
+            use_cache=not args.no_cache,
+            async_logging=args.async_logging,
+            fast_log_format=args.fast_log_format,
+            compact_events=args.compact_events,
+            log_compression=args.log_compression,
+            log_rollover_interval=args.log_rollover_interval,
+            retries=args.retries
         )
         
         sys.exit(0 if result['success'] else 1)
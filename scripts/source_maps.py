@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Source Maps
+Map stack frames trong compiled output (dist/*.js, transpiled ts-jest code) về original src/*.ts positions
+"""
+
+import base64
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import unquote
+
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+COMPILED_SUFFIXES = ('.js', '.cjs', '.mjs', '.jsx')
+SOURCE_MAPPING_URL = '# sourceMappingURL='
+SOURCE_MAP_CACHE_SIZE = 128
+BASE64_DIGITS = {char: value for value, char in enumerate(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+)}
+
+
+def decode_vlq(segment: str) -> List[int]:
+    """Values của one base64 VLQ mappings segment (ValueError on a bad digit)"""
+    values = []
+    value = shift = 0
+    for char in segment:
+        digit = BASE64_DIGITS.get(char)
+        if digit is None:
+            raise ValueError(f"Invalid base64 VLQ digit {char!r} in {segment!r}")
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            values.append(-(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    if shift:
+        raise ValueError(f"Truncated base64 VLQ segment {segment!r}")
+    return values
+
+
+def decode_mappings(mappings: str) -> List[Tuple[List[int], List[Optional[Tuple[int, int, int]]]]]:
+    """Per generated line: segment columns và (source, line, column) of each, all 0-based
+    
+    Segments without a source (unmapped ranges) map to None.
+    """
+    lines = []
+    source = original_line = original_column = 0  # relative across the whole mappings
+    for line in mappings.split(';'):
+        columns: List[int] = []
+        originals: List[Optional[Tuple[int, int, int]]] = []
+        column = 0  # relative within the line
+        for segment in line.split(','):
+            if not segment:
+                continue
+            values = decode_vlq(segment)
+            column += values[0]
+            columns.append(column)
+            if len(values) >= 4:
+                source += values[1]
+                original_line += values[2]
+                original_column += values[3]
+                originals.append((source, original_line, original_column))
+            else:
+                originals.append(None)
+        lines.append((columns, originals))
+    return lines
+
+
+class SourceMap:
+    """Decoded source map (v3) của one compiled file"""
+    
+    def __init__(self, data: Dict[str, Any], map_dir: Path):
+        if data.get('version') != 3 or 'mappings' not in data:
+            raise ValueError("Only non-indexed version 3 source maps are supported")
+        source_root = data.get('sourceRoot') or ''
+        self.sources = [
+            sys.intern(os.path.normpath(map_dir / source_root / source.replace('file://', '', 1)))
+            for source in data.get('sources', [])
+        ]
+        self.lines = decode_mappings(data['mappings'])
+    
+    def original_position(self, line: int, column: int) -> Optional[Tuple[str, int, int]]:
+        """(source file, line, column) của a 1-based generated position, None if unmapped"""
+        if not 0 < line <= len(self.lines):
+            return None
+        columns, originals = self.lines[line - 1]
+        index = bisect_right(columns, column - 1) - 1
+        if index < 0 or originals[index] is None:
+            return None
+        source, original_line, original_column = originals[index]
+        if source >= len(self.sources):
+            return None
+        return self.sources[source], original_line + 1, original_column + 1
+
+
+class SourceMapResolver:
+    """Resolve frames trong compiled JS về their original sources
+    
+    A compiled file's map is its sibling <file>.map, else the file's
+    sourceMappingURL comment (a path or an inline data: URL). Decoded maps
+    (và files without one) are kept in an LRU cache of cache_size entries
+    keyed by path và mtime, so a rebuilt file is decoded again và frames
+    of unchanged files cost a stat và a binary search.
+    """
+    
+    def __init__(self, project_root: Optional[Path] = None, cache_size: int = SOURCE_MAP_CACHE_SIZE):
+        if cache_size < 1:
+            raise ValueError(f"cache_size must be >= 1, got {cache_size}")
+        self.project_root = Path(project_root) if project_root else Path.cwd()
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[str, int], Optional[SourceMap]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def resolve_frame(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """Frame at its original position (the compiled one kept as 'generated'), else frame unchanged"""
+        file_path = frame.get('file', '')
+        if 'line' not in frame or not file_path.endswith(COMPILED_SUFFIXES):
+            return frame
+        
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.project_root / path
+        source_map = self.source_map(path)
+        if source_map is None:
+            return frame
+        position = source_map.original_position(frame['line'], frame.get('column', 1))
+        if position is None:
+            return frame
+        
+        source, line, column = position
+        if not Path(file_path).is_absolute():
+            source = sys.intern(os.path.relpath(source, self.project_root))
+        resolved = dict(frame)
+        resolved.update({
+            'file': source,
+            'line': line,
+            'column': column,
+            'generated': {'file': file_path, 'line': frame['line'], 'column': frame.get('column')}
+        })
+        return resolved
+    
+    def source_map(self, path: Path) -> Optional[SourceMap]:
+        """Cached decoded source map của a compiled file (None without a usable one)"""
+        try:
+            key = (str(path), path.stat().st_mtime_ns)
+        except OSError:
+            return None
+        
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        self.misses += 1
+        source_map = self.load_source_map(path)
+        self._cache[key] = source_map
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return source_map
+    
+    def load_source_map(self, path: Path) -> Optional[SourceMap]:
+        """Load và decode the source map của a compiled file"""
+        try:
+            map_file = Path(f'{path}.map')
+            if map_file.exists():
+                return SourceMap(json.loads(map_file.read_text(encoding='utf-8')), map_file.parent)
+            
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                code = f.read()
+            start = code.rfind(SOURCE_MAPPING_URL)
+            if start < 0:
+                return None
+            url = code[start + len(SOURCE_MAPPING_URL):].split(None, 1)[0]
+            if url.startswith('data:'):
+                header, _, payload = url.partition(',')
+                text = base64.b64decode(payload).decode('utf-8') if header.endswith(';base64') else unquote(payload)
+                return SourceMap(json.loads(text), path.parent)
+            map_file = path.parent / unquote(url)
+            return SourceMap(json.loads(map_file.read_text(encoding='utf-8')), map_file.parent)
+        except (OSError, ValueError, IndexError, AttributeError, TypeError):
+            return None  # no usable map: frames of this file stay as printed
@@ -4,19 +4,43 @@ Enhanced Test Logger với Structured Logging
 Supports log rotation, retention, và correlation IDs
 """
 
+import copy
 import logging
 import logging.handlers
 import os
 import json
+import queue
 import sys
+import threading
+import time
+import traceback
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Tuple, Union
 from contextvars import ContextVar
 
+# Add scripts directory to path
+scripts_dir = Path(__file__).parent
+sys.path.insert(0, str(scripts_dir))
+
+from event_log import EventWriter
+from log_compression import COMPRESSION_SUFFIXES, check_compression, compress_file
+
+try:
+    import orjson  # Optional fast JSON backend
+except ImportError:
+    orjson = None
+
 # Correlation ID context variable
 correlation_id: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
 
+# Async logging: records waiting for the writer thread, and records written per flush
+DEFAULT_QUEUE_SIZE = 10000
+WRITE_BATCH_SIZE = 256
+OVERFLOW_POLICIES = ('drop_new', 'drop_oldest', 'block')
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
 
 class CorrelationIDFilter(logging.Filter):
     """Filter to add correlation ID to log records"""
@@ -26,12 +50,69 @@ class CorrelationIDFilter(logging.Filter):
         return True
 
 
+class TestResultFilter(logging.Filter):
+    """Pass only test_result events (test_results=True) or everything else"""
+    
+    def __init__(self, test_results: bool):
+        super().__init__()
+        self.test_results = test_results
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return is_test_result(record) == self.test_results
+
+
+def record_micros(created: float) -> int:
+    """record.created as integer microseconds, rounded like datetime.utcfromtimestamp"""
+    second = int(created)
+    return second * 1000000 + round((created - second) * 1e6)
+
+
+def is_test_result(record: logging.LogRecord) -> bool:
+    """Whether record is a TestLogger.log_test_result event"""
+    extra = getattr(record, 'extra_fields', None)
+    return isinstance(extra, dict) and extra.get('event') == 'test_result'
+
+
+def orjson_dumps(obj: Any) -> str:
+    """orjson encoder accepting non-string keys like json.dumps"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def default_encoder() -> Callable[[Any], Union[str, bytes]]:
+    """Fastest available JSON encoder (orjson when installed)"""
+    return orjson_dumps if orjson is not None else json.dumps
+
+
 class StructuredFormatter(logging.Formatter):
-    """JSON formatter for structured logging"""
+    """JSON formatter for structured logging
+    
+    fast=True is the high-throughput mode: the timestamp text is built from
+    record.created with its seconds part cached, entries are serialized by
+    encoder (default_encoder(), i.e. orjson when installed), and the result
+    is kept on the record so the combined and error handlers (and
+    RotatingFileHandler's rollover check) share one serialization. Output
+    parses to the same entry as the default mode.
+    """
+    
+    def __init__(
+        self,
+        *args: Any,
+        fast: bool = False,
+        encoder: Optional[Callable[[Any], Union[str, bytes]]] = None,
+        **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.fast = fast
+        self.encoder = encoder or (default_encoder() if fast else json.dumps)
+        self._second: Tuple[int, str] = (0, datetime.utcfromtimestamp(0).isoformat())
     
     def format(self, record: logging.LogRecord) -> str:
+        if self.fast:
+            return self._format_fast(record)
+        
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
+            # Creation time of the record, not format time (formatting may happen later on a writer thread)
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -41,19 +122,224 @@ class StructuredFormatter(logging.Formatter):
             'line': record.lineno,
         }
         
-        # Add exception info if present
-        if record.exc_info:
-            log_data['exception'] = self.formatException(record.exc_info)
+        # Add exception info if present (exc_text only, once QueueLogHandler prepared the record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data['exception'] = record.exc_text
         
         # Add extra fields
         if hasattr(record, 'extra_fields'):
             log_data.update(record.extra_fields)
         
-        return json.dumps(log_data)
+        return self._encode(log_data)
+    
+    def _encode(self, obj: Any) -> str:
+        encoded = self.encoder(obj)
+        return encoded.decode('utf-8') if isinstance(encoded, bytes) else encoded
+    
+    def _timestamp(self, created: float) -> str:
+        """Same text as datetime.utcfromtimestamp(created).isoformat()"""
+        second, micros = divmod(record_micros(created), 1000000)
+        cached_second, text = self._second  # one tuple, safe to share between threads
+        if second != cached_second:
+            text = datetime.utcfromtimestamp(second).isoformat()
+            self._second = (second, text)
+        return f'{text}.{micros:06d}' if micros else text
+    
+    def _format_fast(self, record: logging.LogRecord) -> str:
+        cached = record.__dict__.get('_structured_json')
+        if cached is not None and cached[0] is self:
+            return cached[1]
+        
+        text = self._encode({'timestamp': self._timestamp(record.created), **self.fields(record)})
+        record._structured_json = (self, text)
+        return text
+    
+    def fields(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Entry fields except the record's timestamp (extra fields may still set one)"""
+        log_data = {
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', 'N/A'),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data['exception'] = record.exc_text
+        extra = getattr(record, 'extra_fields', None)
+        if extra:
+            log_data.update(extra)
+        return log_data
+
+
+class RetentionJanitor:
+    """Background retention policy for the rotating handlers of one log directory
+    
+    The directory is scanned once, on the janitor thread, into an index of
+    file sizes và mtimes; after that a rollover only re-stats the rotated
+    handler's own files. Each sweep removes a handler's <stem>.* files older
+    than its retention_days, then the oldest ones until the managed files fit
+    in the smallest max_total_bytes. Files a handler is writing are never
+    removed. Registering a handler only queues a sweep. Rotated segments of
+    handlers with compression are compressed here too.
+    """
+    
+    _janitors: Dict[Path, 'RetentionJanitor'] = {}
+    _janitors_lock = threading.Lock()
+    
+    def __init__(self, log_dir: Path):
+        self.log_dir = Path(log_dir)
+        self.handlers: List['RotatingFileHandlerWithRetention'] = []
+        self.files: Dict[str, Tuple[float, int]] = {}  # name -> (mtime, size)
+        self.scanned = False
+        self._lock = threading.Lock()
+        self._tasks: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def for_directory(cls, log_dir: Path) -> 'RetentionJanitor':
+        """Shared janitor of a log directory"""
+        log_dir = Path(log_dir).resolve()
+        with cls._janitors_lock:
+            janitor = cls._janitors.get(log_dir)
+            if janitor is None:
+                janitor = cls._janitors[log_dir] = cls(log_dir)
+            return janitor
+    
+    def register(self, handler: 'RotatingFileHandlerWithRetention'):
+        """Manage handler's files và queue a first sweep"""
+        with self._lock:
+            self.handlers.append(handler)
+        self.notify(handler)
+    
+    def unregister(self, handler: 'RotatingFileHandlerWithRetention'):
+        with self._lock:
+            if handler in self.handlers:
+                self.handlers.remove(handler)
+    
+    def notify(self, handler: 'RotatingFileHandlerWithRetention'):
+        """Queue a sweep after handler's files changed (e.g. on rollover)"""
+        self._submit(handler, None)
+    
+    def compress(self, handler: 'RotatingFileHandlerWithRetention', source: str, dest: str):
+        """Queue compressing a rotated segment of handler, then a sweep"""
+        self._submit(handler, (source, dest))
+    
+    def _submit(self, handler: 'RotatingFileHandlerWithRetention', segment: Optional[Tuple[str, str]]):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-retention-janitor', daemon=True)
+                self._thread.start()
+        self._tasks.put((handler, segment))
+    
+    def wait(self):
+        """Block until every queued sweep và compression is done"""
+        self._tasks.join()
+    
+    def _run(self):
+        while True:
+            handler, segment = self._tasks.get()
+            try:
+                if segment is not None:
+                    try:
+                        compress_file(Path(segment[0]), Path(segment[1]), handler.compression)
+                    finally:
+                        handler.compressed.set()
+                self.sweep(handler)
+            except Exception:
+                # Like logging.Handler.handleError: report, never kill the janitor
+                if logging.raiseExceptions:
+                    sys.stderr.write(f"--- Log retention error ({handler.baseFilename}) ---\n")
+                    traceback.print_exc(file=sys.stderr)
+            finally:
+                self._tasks.task_done()
+    
+    def sweep(self, handler: Optional['RotatingFileHandlerWithRetention'] = None):
+        """Update the index (scan once, then only handler's files) và apply retention"""
+        with self._lock:
+            handlers = list(self.handlers)
+        if not self.scanned:
+            self._scan()
+        elif handler is not None:
+            self._refresh(handler.rotated_names())
+        self._refresh([Path(h.baseFilename).name for h in handlers])
+        self._enforce(handlers)
+    
+    def _scan(self):
+        try:
+            with os.scandir(self.log_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        self.files[entry.name] = (stat.st_mtime, stat.st_size)
+        except OSError:
+            return
+        self.scanned = True
+    
+    def _refresh(self, names: List[str]):
+        for name in names:
+            try:
+                stat = (self.log_dir / name).stat()
+            except OSError:
+                self.files.pop(name, None)
+                continue
+            self.files[name] = (stat.st_mtime, stat.st_size)
+    
+    def _remove(self, name: str):
+        try:
+            (self.log_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return
+        self.files.pop(name, None)
+    
+    def _enforce(self, handlers: List['RotatingFileHandlerWithRetention']):
+        if not handlers:
+            return
+        active = {Path(h.baseFilename).name for h in handlers}
+        prefixes = {h: Path(h.baseFilename).stem + '.' for h in handlers}
+        now = datetime.now().timestamp()
+        
+        for handler, prefix in prefixes.items():
+            cutoff_time = now - handler.retention_days * SECONDS_PER_DAY
+            for name, (mtime, _) in list(self.files.items()):
+                if name.startswith(prefix) and name not in active and mtime < cutoff_time:
+                    self._remove(name)
+        
+        budgets = [h.max_total_bytes for h in handlers if h.max_total_bytes is not None]
+        if not budgets:
+            return
+        managed = [
+            (mtime, size, name) for name, (mtime, size) in self.files.items()
+            if any(name.startswith(prefix) for prefix in prefixes.values())
+        ]
+        total = sum(size for _, size, _ in managed)
+        for _, size, name in sorted(managed):
+            if total <= min(budgets):
+                break
+            if name in active:
+                continue
+            self._remove(name)
+            total -= size
 
 
 class RotatingFileHandlerWithRetention(logging.handlers.RotatingFileHandler):
-    """Rotating file handler with retention policy"""
+    """Rotating file handler with retention policy
+    
+    Retention (age và optional max_total_bytes for the directory) runs on
+    the directory's RetentionJanitor thread, at startup và on every rollover.
+    Besides max_bytes, rollover_interval (seconds, aligned to the epoch so
+    3600 rolls on the hour) rolls over a non-empty file when the interval
+    ends. With compression ('gzip' or 'zstd'), the rotated file is renamed
+    to service.log.1 and compressed to service.log.1.gz by the janitor;
+    older backups are kept compressed.
+    """
     
     def __init__(
         self,
@@ -61,30 +347,351 @@ class RotatingFileHandlerWithRetention(logging.handlers.RotatingFileHandler):
         max_bytes: int = 10 * 1024 * 1024,  # 10MB
         backup_count: int = 5,
         retention_days: int = 30,
+        max_total_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        rollover_interval: Optional[int] = None,
         **kwargs
     ):
+        check_compression(compression)
         super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, **kwargs)
         self.retention_days = retention_days
-        self._cleanup_old_logs()
+        self.max_total_bytes = max_total_bytes
+        self.compression = compression
+        self.compressed = threading.Event()  # cleared while a rotated segment is being compressed
+        self.compressed.set()
+        if compression is not None:
+            self.namer = self._compressed_name
+            self.rotator = self._rotate_compressed
+        self.rollover_interval = rollover_interval
+        self.rollover_at = self._next_rollover_at()
+        self.janitor = RetentionJanitor.for_directory(Path(self.baseFilename).parent)
+        self.janitor.register(self)
     
-    def _cleanup_old_logs(self):
-        """Remove log files older than retention period"""
-        if not os.path.exists(self.baseFilename):
-            return
+    def _compressed_name(self, name: str) -> str:
+        return name + COMPRESSION_SUFFIXES[self.compression]
+    
+    def _rotate_compressed(self, source: str, dest: str):
+        # Only a rename on the logging thread; the janitor compresses it
+        plain = dest[:-len(COMPRESSION_SUFFIXES[self.compression])]
+        if os.path.exists(plain):
+            self._keep_uncompressed(plain)
+        if os.path.exists(source):
+            os.replace(source, plain)
+            self.compressed.clear()
+            self.janitor.compress(self, plain, dest)
+    
+    def _keep_uncompressed(self, plain: str):
+        """Move a segment whose compression failed out of the way of the next rotation
         
-        log_dir = Path(self.baseFilename).parent
-        cutoff_time = datetime.now().timestamp() - (self.retention_days * 24 * 60 * 60)
+        It goes to the first free backup slot (service.log.2, ...; still read
+        by log_aggregator và managed by retention), else aside with a unique
+        suffix, so the rename onto service.log.1 never destroys it.
+        """
+        for index in range(2, self.backupCount + 1):
+            slot = f'{self.baseFilename}.{index}'
+            if not os.path.exists(slot) and not os.path.exists(self._compressed_name(slot)):
+                os.replace(plain, slot)
+                return
+        os.replace(plain, f'{plain}.uncompressed-{time.time_ns()}')
+    
+    def _next_rollover_at(self) -> Optional[float]:
+        if not self.rollover_interval:
+            return None
+        return (int(time.time() // self.rollover_interval) + 1) * self.rollover_interval
+    
+    def interval_due(self) -> bool:
+        """Whether the rollover interval ended with data in the current file"""
+        return (
+            self.rollover_at is not None
+            and time.time() >= self.rollover_at
+            and self.stream is not None
+            and self.stream.tell() > 0
+        )
+    
+    def rollover_due(self, length: int) -> bool:
+        """Whether writing length more bytes to the open stream needs a rollover first"""
+        return self.interval_due() or (self.maxBytes > 0 and self.stream.tell() + length >= self.maxBytes)
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return self.interval_due() or super().shouldRollover(record)
+    
+    def rotated_names(self) -> List[str]:
+        """Names of this handler's file và its rotations"""
+        name = Path(self.baseFilename).name
+        names = [name]
+        for index in range(1, self.backupCount + 1):
+            names.append(f'{name}.{index}')
+            if self.compression is not None:
+                names.append(self._compressed_name(f'{name}.{index}'))
+        return names
+    
+    def doRollover(self):
+        # The previous segment must be compressed before the backups shift
+        self.compressed.wait()
+        super().doRollover()
+        self.rollover_at = self._next_rollover_at()
+        self.janitor.notify(self)
+    
+    def close(self):
+        self.janitor.unregister(self)
+        super().close()
+    
+    def emit_batch(self, records: List[logging.LogRecord]):
+        """Write records with a single flush, checking rollover per record"""
+        self.acquire()
+        try:
+            for record in records:
+                try:
+                    msg = self.format(record) + self.terminator
+                    if self.stream is None:
+                        self.stream = self._open()
+                    if self.rollover_due(len(msg)):
+                        self.doRollover()
+                        if self.stream is None:
+                            self.stream = self._open()
+                    self.stream.write(msg)
+                except Exception:
+                    self.handleError(record)
+            self.flush()
+        finally:
+            self.release()
+
+
+class CompactEventHandler(RotatingFileHandlerWithRetention):
+    """Rotating handler writing compact binary event records (see event_log)
+    
+    Each file (re)opened starts a new segment, so every file decodes on its
+    own. Entries have the same fields as StructuredFormatter's JSON.
+    """
+    
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        retention_days: int = 30,
+        max_total_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        rollover_interval: Optional[int] = None
+    ):
+        super().__init__(
+            filename,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            retention_days=retention_days,
+            max_total_bytes=max_total_bytes,
+            compression=compression,
+            rollover_interval=rollover_interval,
+            delay=True
+        )
+        self.mode = 'ab'
+        self.encoding = None
+        self.errors = None
+        self.writer = EventWriter()
+        self.setFormatter(StructuredFormatter())
+    
+    def _open(self):
+        stream = open(self.baseFilename, self.mode)
+        stream.write(self.writer.segment_header())
+        return stream
+    
+    def _encode(self, record: logging.LogRecord) -> bytes:
+        return self.writer.encode(record_micros(record.created), self.formatter.fields(record))
+    
+    def _write(self, record: logging.LogRecord):
+        if self.stream is None:
+            self.stream = self._open()
+        data = self._encode(record)
+        if self.rollover_due(len(data)):
+            self.doRollover()
+            self.stream = self._open()
+            # String và shape ids restart in the new segment
+            data = self._encode(record)
+        self.stream.write(data)
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._write(record)
+            self.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def emit_batch(self, records: List[logging.LogRecord]):
+        """Write records with a single flush"""
+        self.acquire()
+        try:
+            for record in records:
+                try:
+                    self._write(record)
+                except Exception:
+                    self.handleError(record)
+            self.flush()
+        finally:
+            self.release()
+
+
+def write_batch(handler: logging.Handler, records: List[logging.LogRecord]):
+    """Write the records that pass handler's level and filters, flushing once"""
+    records = [r for r in records if r.levelno >= handler.level and handler.filter(r)]
+    if not records:
+        return
+    if isinstance(handler, RotatingFileHandlerWithRetention):
+        handler.emit_batch(records)
+    elif isinstance(handler, logging.StreamHandler):
+        handler.acquire()
+        try:
+            for record in records:
+                try:
+                    handler.stream.write(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            handler.flush()
+        finally:
+            handler.release()
+    else:
+        for record in records:
+            handler.handle(record)
+
+
+class QueueLogHandler(logging.Handler):
+    """Hand records to a background writer thread that formats, batches và writes them
+    
+    The caller only merges the message arguments and enqueues the record, so
+    formatting, disk writes and rotation never run on the caller's thread.
+    Filters added to this handler (e.g. CorrelationIDFilter) still run on the
+    caller's thread. When the bounded queue is full, overflow decides:
+    'drop_new' drops the record, 'drop_oldest' drops the oldest queued one,
+    'block' waits for space. Objects passed in extra are serialized later by
+    the writer, so they must not be mutated after logging.
+    """
+    
+    _STOP = object()
+    
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: str = 'drop_new',
+        batch_size: int = WRITE_BATCH_SIZE
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, got {overflow!r}")
+        super().__init__()
+        self.handlers = handlers
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name='test-logger-writer', daemon=True)
+        self._writer.start()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge message arguments và format the traceback now, as QueueHandler.prepare does
         
-        for log_file in log_dir.glob(f'{Path(self.baseFilename).stem}.*'):
+        Arguments may change before the writer runs, and a queued exc_info
+        would keep the traceback's frames (and their locals) alive. Works on
+        a copy, so other handlers of the record still see its exc_info.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def emit(self, record: logging.LogRecord):
+        if self._closed:
+            return
+        try:
+            self._enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+    
+    def _enqueue(self, item: Any):
+        if self.overflow == 'block':
+            self.queue.put(item)
+            return
+        while True:
             try:
-                if log_file.stat().st_mtime < cutoff_time:
-                    log_file.unlink()
-            except Exception:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.overflow == 'drop_new':
+                    self.dropped += 1
+                    return
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
                 pass
+    
+    def _run(self):
+        """Writer loop: take a batch of queued records, write it to every handler"""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = any(item is self._STOP for item in batch)
+            records = [item for item in batch if item is not self._STOP]
+            for handler in self.handlers:
+                try:
+                    write_batch(handler, records)
+                except Exception:
+                    pass
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+    
+    def flush(self):
+        """Wait until every queued record is written"""
+        if self._writer.is_alive():
+            self.queue.join()
+    
+    def close(self):
+        """Write the remaining records, stop the writer và close the handlers"""
+        if not self._closed:
+            self._closed = True
+            if self._writer.is_alive():
+                self.queue.put(self._STOP)
+                self._writer.join()
+            if self.dropped:
+                warning = logging.makeLogRecord({
+                    'name': 'test_logger',
+                    'levelno': logging.WARNING,
+                    'levelname': 'WARNING',
+                    'msg': f"Async logging dropped {self.dropped} records (queue full)",
+                    'correlation_id': 'N/A'
+                })
+                for handler in self.handlers:
+                    write_batch(handler, [warning])
+            for handler in self.handlers:
+                handler.close()
+        super().close()
 
 
 class TestLogger:
-    """Enhanced test logger với structured logging"""
+    """Enhanced test logger với structured logging
+    
+    With async_logging, records go through a bounded queue to a background
+    writer thread (see QueueLogHandler); call flush() before reading the
+    log files and close() when done. fast_format selects the
+    high-throughput StructuredFormatter mode. With compact_events,
+    test_result events go to <service>.events in the compact binary format
+    (see CompactEventHandler) instead of the combined JSON log; the error
+    log still gets failed tests as JSON. Old logs are removed in the
+    background (see RetentionJanitor) after retention_days, or oldest first
+    beyond max_total_bytes. compression và rollover_interval configure
+    every file handler (see RotatingFileHandlerWithRetention).
+    """
     
     def __init__(
         self,
@@ -93,7 +700,15 @@ class TestLogger:
         service_name: str = 'test_executor',
         max_bytes: int = 10 * 1024 * 1024,
         backup_count: int = 5,
-        retention_days: int = 30
+        retention_days: int = 30,
+        max_total_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        rollover_interval: Optional[int] = None,
+        async_logging: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: str = 'drop_new',
+        fast_format: bool = False,
+        compact_events: bool = False
     ):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -102,10 +717,13 @@ class TestLogger:
         # Setup logger
         self.logger = logging.getLogger(service_name)
         self.logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+        for handler in self.logger.handlers:
+            handler.close()
         self.logger.handlers.clear()
+        self.queue_handler: Optional[QueueLogHandler] = None
         
         # Create formatters
-        json_formatter = StructuredFormatter()
+        json_formatter = StructuredFormatter(fast=fast_format)
         console_formatter = logging.Formatter(
             '%(asctime)s [%(levelname)s] [%(correlation_id)s] %(name)s: %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
@@ -118,8 +736,6 @@ class TestLogger:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.DEBUG)
         console_handler.setFormatter(console_formatter)
-        console_handler.addFilter(correlation_filter)
-        self.logger.addHandler(console_handler)
         
         # File handlers with rotation
         combined_handler = RotatingFileHandlerWithRetention(
@@ -127,11 +743,13 @@ class TestLogger:
             max_bytes=max_bytes,
             backup_count=backup_count,
             retention_days=retention_days,
+            max_total_bytes=max_total_bytes,
+            compression=compression,
+            rollover_interval=rollover_interval,
+            encoding='utf-8',
         )
         combined_handler.setLevel(logging.DEBUG)
         combined_handler.setFormatter(json_formatter)
-        combined_handler.addFilter(correlation_filter)
-        self.logger.addHandler(combined_handler)
         
         # Error log file
         error_handler = RotatingFileHandlerWithRetention(
@@ -139,11 +757,38 @@ class TestLogger:
             max_bytes=max_bytes,
             backup_count=backup_count,
             retention_days=retention_days,
+            max_total_bytes=max_total_bytes,
+            compression=compression,
+            rollover_interval=rollover_interval,
+            encoding='utf-8',
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(json_formatter)
-        error_handler.addFilter(correlation_filter)
-        self.logger.addHandler(error_handler)
+        
+        handlers = [console_handler, combined_handler, error_handler]
+        if compact_events:
+            events_handler = CompactEventHandler(
+                filename=str(self.log_dir / f'{service_name}.events'),
+                max_bytes=max_bytes,
+                backup_count=backup_count,
+                retention_days=retention_days,
+                max_total_bytes=max_total_bytes,
+                compression=compression,
+                rollover_interval=rollover_interval
+            )
+            events_handler.setLevel(logging.DEBUG)
+            events_handler.addFilter(TestResultFilter(True))
+            combined_handler.addFilter(TestResultFilter(False))
+            handlers.append(events_handler)
+        if async_logging:
+            # Correlation IDs live in the caller's context, so filter before enqueueing
+            self.queue_handler = QueueLogHandler(handlers, queue_size=queue_size, overflow=overflow)
+            self.queue_handler.addFilter(correlation_filter)
+            self.logger.addHandler(self.queue_handler)
+        else:
+            for handler in handlers:
+                handler.addFilter(correlation_filter)
+                self.logger.addHandler(handler)
     
     def set_correlation_id(self, corr_id: str):
         """Set correlation ID for current context"""
@@ -249,16 +894,40 @@ class TestLogger:
     def get_logger(self) -> logging.Logger:
         """Get the underlying logger"""
         return self.logger
+    
+    def flush(self):
+        """Make sure everything logged so far is written"""
+        for handler in self.logger.handlers:
+            handler.flush()
+    
+    def close(self):
+        """Flush và close all handlers (stops the async writer), then finish pending compressions"""
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        RetentionJanitor.for_directory(self.log_dir).wait()
 
 
 def setup_test_logging(
     log_dir: str = './logs/test_execution',
     log_level: str = 'INFO',
-    service_name: str = 'test_executor'
+    service_name: str = 'test_executor',
+    async_logging: bool = False,
+    fast_format: bool = False,
+    compact_events: bool = False,
+    max_total_bytes: Optional[int] = None,
+    compression: Optional[str] = None,
+    rollover_interval: Optional[int] = None
 ) -> TestLogger:
     """Setup test logging"""
     return TestLogger(
         log_dir=log_dir,
         log_level=log_level,
-        service_name=service_name
+        service_name=service_name,
+        max_total_bytes=max_total_bytes,
+        compression=compression,
+        rollover_interval=rollover_interval,
+        async_logging=async_logging,
+        fast_format=fast_format,
+        compact_events=compact_events
     )